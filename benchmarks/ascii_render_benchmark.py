@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+验证码终端渲染性能测试
+
+在本地模拟门户生成的验证码图片上，按不同输出宽度比较原先逐像素循环 + 字符串拼接的
+ASCII 转换与 ascii_render 查找表实现的耗时（包括解码、缩放），并校验两者输出一致；
+同时给出真彩色半块字符渲染的耗时。
+
+Usage:
+    python benchmarks/ascii_render_benchmark.py --runs 200 --widths 40 60 80 120 200
+"""
+
+import time
+import argparse
+import warnings
+import statistics
+from io import BytesIO
+
+from PIL import Image
+
+from ysu_net_login.ascii_render import CHAR_SETS, image_to_ascii, image_to_halfblocks
+from ysu_net_login.mock_portal import _captcha_image
+
+
+def legacy_image_to_ascii(image_data, width=60, char_set="standard"):
+    """原 YSULogin._image_to_ascii 的实现"""
+    ascii_chars = CHAR_SETS[char_set]
+    image = Image.open(BytesIO(image_data))
+    orig_width, orig_height = image.size
+    aspect_ratio = orig_height / orig_width
+    height = int(aspect_ratio * width * 0.55)
+    image = image.resize((width, height))
+    image = image.convert('L')
+    pixels = image.getdata()
+
+    ascii_str = ""
+    for i, pixel in enumerate(pixels):
+        char_index = int(pixel * (len(ascii_chars) - 1) / 255)
+        ascii_str += ascii_chars[char_index]
+        if (i + 1) % width == 0:
+            ascii_str += "\n"
+
+    return ascii_str, (orig_width, orig_height), (width, height)
+
+
+def measure(func, image_data, width, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(image_data, width)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare captcha renderers across output widths")
+    parser.add_argument('--runs', type=int, default=200, help='Renders per width and renderer (default: 200)')
+    parser.add_argument('--widths', type=int, nargs='+', default=[40, 60, 80, 120, 200],
+                        help='Output widths in characters (default: 40 60 80 120 200)')
+    args = parser.parse_args()
+
+    # 原实现使用的 Image.getdata 在新版 Pillow 中已弃用
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    image_data = _captcha_image('a7Kq')
+
+    # 两种实现的输出必须逐字符一致
+    for char_set in CHAR_SETS:
+        for width in args.widths:
+            if legacy_image_to_ascii(image_data, width, char_set) != image_to_ascii(image_data, width, char_set):
+                print(f"Output mismatch: char_set={char_set} width={width}")
+                return 1
+
+    print(f"{'width':>6}  {'legacy':>10}  {'lookup':>10}  {'speedup':>8}  {'halfblock':>10}")
+    for width in args.widths:
+        legacy = measure(legacy_image_to_ascii, image_data, width, args.runs)
+        lookup = measure(image_to_ascii, image_data, width, args.runs)
+        blocks = measure(image_to_halfblocks, image_data, width, args.runs)
+        print(f"{width:>6}  {legacy:>8.3f}ms  {lookup:>8.3f}ms  {legacy / lookup:>7.1f}x  {blocks:>8.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
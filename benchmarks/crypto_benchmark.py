@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录加密性能测试
+
+比较原先的实现（每段明文新建 AES 对象、逐字符 random.choice 生成前缀）与 crypto 模块，
+模拟批量为多个账户加密凭据：
+- cas-sso：每个账户一个新的 croypto（与真实登录一致），或所有账户共用一个密钥
+- CAS：AES-CBC 加密密码，64个随机字符前缀和16字符IV
+
+同时校验两种实现的 ECB 输出一致、CBC 输出可以解密回原文。
+
+Usage:
+    python benchmarks/crypto_benchmark.py --accounts 500 --runs 20
+"""
+
+import os
+import time
+import base64
+import random
+import argparse
+import statistics
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+from ysu_net_login import crypto
+
+
+def legacy_aes_encrypt_ecb(key_b64, plaintext):
+    """原 ruijie_client._aes_encrypt_ecb 的实现"""
+    key = base64.b64decode(key_b64)
+    cipher = AES.new(key, AES.MODE_ECB)
+    padded = pad(plaintext.encode('utf-8'), AES.block_size)
+    return base64.b64encode(cipher.encrypt(padded)).decode('utf-8')
+
+
+def legacy_random_string(length):
+    chars = "ABCDEFGHJKMNPQRSTWXYZabcdefhijkmnprstwxyz2345678"
+    return ''.join(random.choice(chars) for _ in range(length))
+
+
+def legacy_encrypt_password(password, salt):
+    """原 YSULogin._encrypt_password 的实现"""
+    prefix = legacy_random_string(64)
+    iv = legacy_random_string(16).encode('utf-8')
+    key = salt.strip().encode('utf-8')
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    encrypted = cipher.encrypt(pad((prefix + password).encode('utf-8'), AES.block_size))
+    return base64.b64encode(encrypted).decode('utf-8')
+
+
+def legacy_sso(key_b64, password):
+    return legacy_aes_encrypt_ecb(key_b64, password), legacy_aes_encrypt_ecb(key_b64, '{}')
+
+
+def fast_sso(key_b64, password):
+    return crypto.aes_ecb_encrypt_many(key_b64, password, '{}')
+
+
+def measure(func, pairs, runs):
+    """返回每个账户的中位耗时（微秒）"""
+    samples = []
+    for _ in range(runs):
+        crypto._ecb_cipher.cache_clear()
+        start = time.perf_counter()
+        for key, password in pairs:
+            func(key, password)
+        samples.append((time.perf_counter() - start) / len(pairs) * 1e6)
+    return statistics.median(samples)
+
+
+def check(accounts):
+    """校验新实现的输出"""
+    for key, password in accounts:
+        if list(legacy_sso(key, password)) != fast_sso(key, password):
+            raise SystemExit(f"ECB output mismatch for key {key}")
+        salt = crypto.random_string(16)
+        encrypted = base64.b64decode(crypto.encrypt_cas_password(password, salt))
+        decrypted = unpad(AES.new(salt.encode(), AES.MODE_CBC, b'\0' * 16).decrypt(encrypted), AES.block_size)
+        # 前16字节受IV影响，随后是前缀剩余的48个字符
+        if decrypted[64:].decode('utf-8') != password or not set(decrypted[16:64].decode()) <= set(crypto.RANDOM_CHARS):
+            raise SystemExit("CBC output does not decrypt to prefix + password")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and cached login encryption")
+    parser.add_argument('--accounts', type=int, default=500, help='Accounts per run (default: 500)')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per scenario (default: 20)')
+    args = parser.parse_args()
+
+    passwords = [base64.b64encode(os.urandom(9)).decode() for _ in range(args.accounts)]
+    distinct = [(base64.b64encode(os.urandom(16)).decode(), p) for p in passwords]
+    shared_key = base64.b64encode(os.urandom(16)).decode()
+    shared = [(shared_key, p) for p in passwords]
+    salts = [(crypto.random_string(16), p) for p in passwords]
+
+    check(distinct[:100])
+
+    scenarios = [
+        ('cas-sso, key per account', legacy_sso, fast_sso, distinct),
+        ('cas-sso, shared key', legacy_sso, fast_sso, shared),
+        ('CAS password (CBC)', lambda s, p: legacy_encrypt_password(p, s),
+         lambda s, p: crypto.encrypt_cas_password(p, s), salts),
+        ('random prefix + IV', lambda s, p: (legacy_random_string(64), legacy_random_string(16)),
+         lambda s, p: crypto.random_string(80), salts),
+    ]
+
+    print(f"{'scenario':<26}  {'legacy':>10}  {'crypto':>10}  {'speedup':>8}   (per account, {args.accounts} accounts)")
+    for name, legacy, fast, pairs in scenarios:
+        legacy_us = measure(legacy, pairs, args.runs)
+        fast_us = measure(fast, pairs, args.runs)
+        print(f"{name:<26}  {legacy_us:>8.1f}us  {fast_us:>8.1f}us  {legacy_us / fast_us:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
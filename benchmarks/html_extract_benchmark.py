@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录页面解析性能测试
+
+在保存的页面样本（benchmarks/fixtures）上比较 BeautifulSoup 完整解析
+与 html_extract 定向提取的耗时，并校验两者提取结果一致。
+
+Usage:
+    python benchmarks/html_extract_benchmark.py --runs 200
+"""
+
+import os
+import time
+import argparse
+import statistics
+
+from bs4 import BeautifulSoup
+
+from ysu_net_login.html_extract import find_text_by_id, find_form_inputs, find_input_value
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def cas_sso_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return (soup.find('p', {'id': 'login-croypto'}).get_text(strip=True),
+            soup.find('p', {'id': 'login-page-flowkey'}).get_text(strip=True))
+
+
+def cas_sso_fast(html):
+    return (find_text_by_id(html, 'login-croypto', 'p'),
+            find_text_by_id(html, 'login-page-flowkey', 'p'))
+
+
+def error_bs4(html):
+    return BeautifulSoup(html, 'html.parser').find(id='errorMessage').get_text(strip=True)
+
+
+def error_fast(html):
+    return find_text_by_id(html, 'errorMessage')
+
+
+def authserver_bs4(html):
+    form = BeautifulSoup(html, 'html.parser').find('form', {'id': 'pwdFromId'})
+    return (form.find('input', {'name': 'lt'}).get('value', ''),
+            form.find('input', {'name': 'execution'}).get('value', ''),
+            form.find('input', {'id': 'pwdEncryptSalt'}).get('value', ''),
+            form.find('input', {'name': 'cllt'}).get('value', 'userNameLogin'),
+            form.find('input', {'name': 'dllt'}).get('value', 'generalLogin'),
+            form.find('input', {'name': '_eventId'}).get('value', 'submit'))
+
+
+def authserver_fast(html):
+    inputs = find_form_inputs(html, 'pwdFromId')
+    return (find_input_value(inputs, name='lt', default=''),
+            find_input_value(inputs, name='execution', default=''),
+            find_input_value(inputs, element_id='pwdEncryptSalt', default=''),
+            find_input_value(inputs, name='cllt', default='userNameLogin'),
+            find_input_value(inputs, name='dllt', default='generalLogin'),
+            find_input_value(inputs, name='_eventId', default='submit'))
+
+
+CASES = [
+    ('cas_sso_login.html', cas_sso_bs4, cas_sso_fast),
+    ('cas_sso_error.html', error_bs4, error_fast),
+    ('authserver_login.html', authserver_bs4, authserver_fast),
+]
+
+
+def bench(func, html, runs):
+    """返回每次调用耗时的中位数（微秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(html)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BeautifulSoup and targeted extraction on saved pages")
+    parser.add_argument('--runs', type=int, default=200, help='Runs per case (default: 200)')
+    args = parser.parse_args()
+
+    print(f"{'fixture':<24}  {'size':>7}  {'bs4':>10}  {'fast':>10}  {'speedup':>8}")
+    for name, slow, fast in CASES:
+        html = read_fixture(name)
+        if slow(html) != fast(html):
+            raise SystemExit(f"{name}: extracted values differ:\n  bs4:  {slow(html)!r}\n  fast: {fast(html)!r}")
+        slow_us = bench(slow, html, args.runs)
+        fast_us = bench(fast, html, args.runs)
+        print(f"{name:<24}  {len(html) // 1024:>5}KB  {slow_us:>8.1f}us  {fast_us:>8.1f}us  {slow_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
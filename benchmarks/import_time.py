@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行冷启动导入耗时测试
+
+使用 `python -X importtime` 测量各子命令需要加载的模块的导入耗时，
+检查 `status` 路径没有加载 BeautifulSoup、Pillow、pycryptodome 等重量级依赖，
+并在超出耗时预算时以非零状态退出，可用于CI中防止启动性能回退。
+
+Usage:
+    python benchmarks/import_time.py --runs 5 --budget-ms 250
+"""
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+# 场景名称 -> 该场景需要导入的模块
+SCENARIOS = {
+    'cli': ['ysu_net_login.ruijie_cli'],
+    'status': ['ysu_net_login.ruijie_cli', 'ysu_net_login.ruijie_client'],
+    'login': ['ysu_net_login.ruijie_cli', 'ysu_net_login.ruijie_client', 'bs4', 'Crypto.Cipher.AES'],
+}
+
+# status 路径不应加载的模块
+FORBIDDEN_FOR_STATUS = ['bs4', 'PIL', 'Crypto', 'ysu_net_login.ysu_login']
+
+
+def measure(modules):
+    """
+    在新的解释器中导入模块
+
+    Returns:
+        tuple: (总导入耗时（毫秒）, 已导入模块名集合)
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        imported.add(name.strip())
+    return total_us / 1000.0, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI cold-start import time")
+    parser.add_argument('--runs', type=int, default=5, help='Runs per scenario (default: 5)')
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help='Maximum median import time for the status path (default: 250)')
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'scenario':<8}  {'median':>9}  {'min':>9}  {'max':>9}")
+    for scenario, modules in SCENARIOS.items():
+        samples = []
+        imported = set()
+        for _ in range(args.runs):
+            elapsed, imported = measure(modules)
+            samples.append(elapsed)
+        median = statistics.median(samples)
+        print(f"{scenario:<8}  {median:>7.1f}ms  {min(samples):>7.1f}ms  {max(samples):>7.1f}ms")
+
+        if scenario == 'status':
+            heavy = sorted(name for name in imported
+                           if any(name == f or name.startswith(f + ".") for f in FORBIDDEN_FOR_STATUS))
+            if heavy:
+                print(f"  FAIL: status path imports heavy modules: {', '.join(heavy)}")
+                failed = True
+            if median > args.budget_ms:
+                print(f"  FAIL: status cold start {median:.1f}ms exceeds budget {args.budget_ms:.1f}ms")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
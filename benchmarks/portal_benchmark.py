@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录流程端到端性能测试
+
+启动本地模拟门户（可配置延迟/抖动），反复执行 RuijieClient 与 YSULogin 的各个命令，
+输出每个流程步骤与每个命令的 p50/p95/p99 耗时以及每个命令发出的HTTP请求数。
+登录的请求数多于 EXPECTED_LOGIN_REQUESTS 时以非零状态退出（另见 tests/test_login_requests.py）。
+
+Usage:
+    python benchmarks/portal_benchmark.py --iterations 50 --latency 0.02 --jitter 0.005
+"""
+
+import io
+import time
+import argparse
+import functools
+import contextlib
+from collections import defaultdict
+
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.ysu_login import YSULogin
+
+
+# RuijieClient 中作为流程步骤计时的方法
+CLIENT_STEPS = [
+    'check_login_status', 'redirect_to_portal', 'cas_sso_login', 'service_selection',
+    'service_login', 'user_online', 'get_account_info', 'offline',
+]
+# YSULogin 中作为流程步骤计时的方法
+YSU_STEPS = ['_fetch_login_page', '_need_captcha', '_encrypt_password']
+# 默认（不查询工作流节点）登录发出的请求数
+EXPECTED_LOGIN_REQUESTS = 10
+
+
+def percentile(samples, pct):
+    """最近秩法计算百分位数"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def instrument(obj, method_names, samples, prefix):
+    """用计时包装器替换实例上的方法，每次调用耗时记录到 samples[prefix.method]"""
+    for name in method_names:
+        method = getattr(obj, name)
+
+        @functools.wraps(method)
+        def wrapper(*args, __method=method, __key=f"{prefix}.{name}", **kwargs):
+            start = time.perf_counter()
+            try:
+                return __method(*args, **kwargs)
+            finally:
+                samples[__key].append(time.perf_counter() - start)
+
+        setattr(obj, name, wrapper)
+
+
+def timed(samples, key, func, *args, **kwargs):
+    """执行并记录一次命令耗时"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    samples[key].append(time.perf_counter() - start)
+    return result
+
+
+def quiet(func):
+    """屏蔽YSULogin的控制台输出"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def run(iterations, server):
+    """运行所有命令，返回 (步骤耗时, 命令耗时, 每个命令的请求数)"""
+    step_samples = defaultdict(list)
+    command_samples = defaultdict(list)
+    request_counts = {}
+
+    def count_requests(command, func):
+        server.state.reset_counts()
+        func()
+        request_counts[command] = sum(server.state.request_counts.values())
+
+    for i in range(iterations):
+        client = RuijieClient(portal_base=server.base_url)
+        instrument(client, CLIENT_STEPS, step_samples, 'RuijieClient')
+
+        timed(command_samples, 'login', client.login, 'bench', 'bench')
+        timed(command_samples, 'status', client.check_login_status)
+        timed(command_samples, 'info', client.call_with_session, client.get_account_info)
+        timed(command_samples, 'logout', client.logout)
+        client.client.close()
+
+        ysu = YSULogin('bench', 'bench', cas_base=server.base_url, display_mode='ascii')
+        instrument(ysu, YSU_STEPS, step_samples, 'YSULogin')
+        timed(command_samples, 'ysu_login', quiet(ysu.login))
+        ysu.close()
+
+    # 单独统计一次各命令的HTTP请求数
+    client = RuijieClient(portal_base=server.base_url)
+    count_requests('login', lambda: client.login('bench', 'bench'))
+    count_requests('status', client.check_login_status)
+    count_requests('info', lambda: client.call_with_session(client.get_account_info))
+    count_requests('logout', client.logout)
+    client.client.close()
+    ysu = YSULogin('bench', 'bench', cas_base=server.base_url, display_mode='ascii')
+    count_requests('ysu_login', quiet(ysu.login))
+    ysu.close()
+
+    return step_samples, command_samples, request_counts
+
+
+def print_table(title, samples, request_counts=None):
+    """输出百分位数表格（毫秒）"""
+    print(f"\n{title}")
+    width = max(len(k) for k in samples) if samples else 10
+    header = f"{'name':<{width}}  {'n':>5}  {'p50':>8}  {'p95':>8}  {'p99':>8}"
+    if request_counts is not None:
+        header += f"  {'requests':>8}"
+    print(header)
+    print("-" * len(header))
+    for key in sorted(samples):
+        values = samples[key]
+        line = (f"{key:<{width}}  {len(values):>5}  {percentile(values, 50) * 1000:>6.1f}ms"
+                f"  {percentile(values, 95) * 1000:>6.1f}ms  {percentile(values, 99) * 1000:>6.1f}ms")
+        if request_counts is not None:
+            line += f"  {request_counts.get(key, '-'):>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login flows against a local mock portal")
+    parser.add_argument('-n', '--iterations', type=int, default=30, help='Iterations per command (default: 30)')
+    parser.add_argument('--latency', type=float, default=0.01, help='Mock portal base latency in seconds (default: 0.01)')
+    parser.add_argument('--jitter', type=float, default=0.002, help='Mock portal latency jitter in seconds (default: 0.002)')
+    args = parser.parse_args()
+
+    with MockPortalServer(latency=args.latency, jitter=args.jitter) as server:
+        print(f"Mock portal at {server.base_url} (latency {args.latency * 1000:.1f}ms ± {args.jitter * 1000:.1f}ms)")
+        step_samples, command_samples, request_counts = run(args.iterations, server)
+
+    print_table("Per flow step", step_samples)
+    print_table("Per command", command_samples, request_counts)
+
+    if request_counts['login'] > EXPECTED_LOGIN_REQUESTS:
+        print(f"\nlogin made {request_counts['login']} requests, expected {EXPECTED_LOGIN_REQUESTS}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
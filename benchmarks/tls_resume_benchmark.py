@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TLS会话恢复性能测试
+
+用临时自签名证书以HTTPS启动本地模拟门户，模拟脚本中反复执行 `status`：
+每次都创建新的 RuijieClient（新的requests会话和连接池，因此必须建立新连接），
+分别在关闭和开启TLS会话复用时测量握手耗时（Span中的tls阶段）与整个请求的耗时。
+
+需要 openssl 命令行工具生成证书。
+
+Usage:
+    python benchmarks/tls_resume_benchmark.py --iterations 200
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from ysu_net_login import transport
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.tracing import Tracer
+
+
+def make_certificate(directory):
+    """生成 127.0.0.1 的自签名证书，返回包含证书和私钥的PEM文件路径"""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+         '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    combined = os.path.join(directory, 'server.pem')
+    with open(combined, 'w') as out:
+        for path in (cert, key):
+            with open(path) as f:
+                out.write(f.read())
+    return cert, combined
+
+
+def run(server, iterations, reuse):
+    """执行 iterations 次状态查询，返回 (握手耗时列表, 请求耗时列表)"""
+    transport.TLS_SESSIONS.clear()
+    transport.TLS_SESSIONS.enabled = reuse
+
+    handshakes = []
+    totals = []
+    for _ in range(iterations):
+        tracer = Tracer()
+        client = RuijieClient(portal_base=server.base_url, tracer=tracer)
+        client.get_online_user_info()
+        client.client.close()
+        for span in tracer.spans:
+            if span.timings.get('tls') is not None:
+                handshakes.append(span.timings['tls'])
+                totals.append(span.total)
+    return handshakes, totals
+
+
+def summarize(label, samples):
+    ms = [s * 1000 for s in samples]
+    ordered = sorted(ms)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"  {label:<10} median {statistics.median(ms):7.3f}ms  p95 {p95:7.3f}ms")
+    return statistics.median(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TLS handshake savings from session resumption")
+    parser.add_argument('--iterations', type=int, default=200, help='Fresh clients per mode (default: 200)')
+    args = parser.parse_args()
+
+    if not shutil.which('openssl'):
+        print("openssl command not found, cannot create a test certificate")
+        return 1
+
+    directory = tempfile.mkdtemp(prefix='ysunetlogin-tls-')
+    try:
+        cert, server_pem = make_certificate(directory)
+        # requests 通过该环境变量信任自签名证书
+        os.environ['REQUESTS_CA_BUNDLE'] = cert
+
+        with MockPortalServer(certfile=server_pem) as server:
+            # 预热：导入、证书加载等一次性开销不计入
+            run(server, 5, True)
+
+            results = {}
+            for label, reuse in (('full', False), ('resumed', True)):
+                handshakes, totals = run(server, args.iterations, reuse)
+                stats = transport.TLS_SESSIONS
+                print(f"{label} handshakes ({stats.resumed} resumed, {stats.full} full):")
+                results[label] = summarize('handshake', handshakes)
+                summarize('request', totals)
+
+        saved = results['full'] - results['resumed']
+        print(f"\nmedian handshake saving: {saved:.3f}ms ({saved / results['full'] * 100:.0f}%)")
+        return 0
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        transport.TLS_SESSIONS.enabled = True
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YSULogin 长时间运行压力测试
+
+在本地模拟门户（要求验证码）上反复执行 CAS 登录，模拟守护进程的两种用法：
+- reuse：一个 YSULogin 对象（with 语句管理生命周期）在同一个会话上重复登录
+- fresh：每次重新登录都创建新的 YSULogin 对象，共用同一个 requests.Session
+
+预热之后用 tracemalloc 比较内存占用，并检查 atexit 处理函数的数量，内存增长超过预算或
+处理函数数量增加时以非零状态退出。验证码由读取模拟门户状态的识别器给出，不需要人工输入。
+
+Usage:
+    python benchmarks/ysu_login_stress.py --cycles 2000 --warmup 100 --budget-kb 256
+"""
+
+import os
+import gc
+import time
+import atexit
+import argparse
+import tracemalloc
+import contextlib
+
+import requests
+
+from ysu_net_login.captcha import CaptchaSolver
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ysu_login import YSULogin
+
+
+class PortalStateSolver(CaptchaSolver):
+    """从模拟门户的服务端状态中读取当前表单的验证码"""
+
+    name = 'mock'
+
+    def __init__(self, state):
+        self.state = state
+        self.client = None
+
+    def solve(self, image_data):
+        with self.state.lock:
+            form = self.state.cas_forms.get(self.client.execution)
+        return form and form['captcha']
+
+
+def run_cycles(mode, server, solver, cycles, devnull):
+    """执行 cycles 次登录，返回失败次数"""
+    failures = 0
+    options = dict(cas_base=server.base_url, display_mode='ascii', captcha_solver=solver, manual_captcha=False)
+    with contextlib.redirect_stdout(devnull):
+        if mode == 'reuse':
+            with YSULogin('stress', 'stress', **options) as client:
+                solver.client = client
+                for _ in range(cycles):
+                    failures += not client.login()
+        else:
+            with requests.Session() as session:
+                for _ in range(cycles):
+                    with YSULogin('stress', 'stress', session=session, **options) as client:
+                        solver.client = client
+                        failures += not client.login()
+    # 模拟门户为每次打开的登录页保存表单，只保留未提交的会拖慢服务端，这里一并清理
+    with server.state.lock:
+        server.state.cas_forms.clear()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress YSULogin re-logins against the mock portal")
+    parser.add_argument('--cycles', type=int, default=2000, help='Measured login cycles per mode (default: 2000)')
+    parser.add_argument('--warmup', type=int, default=100, help='Cycles before the memory baseline (default: 100)')
+    parser.add_argument('--budget-kb', type=float, default=256,
+                        help='Allowed traced memory growth per mode in KiB (default: 256)')
+    parser.add_argument('--modes', nargs='+', choices=['reuse', 'fresh'], default=['reuse', 'fresh'])
+    args = parser.parse_args()
+
+    ok = True
+    with MockPortalServer(need_captcha=True) as server, open(os.devnull, 'w') as devnull:
+        solver = PortalStateSolver(server.state)
+        tracemalloc.start()
+        print(f"{'mode':<6}  {'cycles':>6}  {'failed':>6}  {'per login':>10}  {'memory':>10}  {'atexit':>6}")
+        for mode in args.modes:
+            failures = run_cycles(mode, server, solver, args.warmup, devnull)
+            gc.collect()
+            baseline = tracemalloc.take_snapshot()
+            handlers = atexit._ncallbacks()
+
+            start = time.perf_counter()
+            failures += run_cycles(mode, server, solver, args.cycles, devnull)
+            elapsed = time.perf_counter() - start
+            gc.collect()
+
+            growth = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+            handler_growth = atexit._ncallbacks() - handlers
+            print(f"{mode:<6}  {args.cycles:>6}  {failures:>6}  {elapsed / args.cycles * 1000:>8.2f}ms"
+                  f"  {growth / 1024:>+8.1f}KiB  {handler_growth:>+6d}")
+
+            if failures:
+                print(f"  {failures} logins failed")
+                ok = False
+            if growth > args.budget_kb * 1024:
+                print(f"  memory grew by {growth / 1024:.1f}KiB (budget {args.budget_kb}KiB), top allocations:")
+                for stat in tracemalloc.take_snapshot().compare_to(baseline, 'lineno')[:5]:
+                    print(f"    {stat}")
+                ok = False
+            if handler_growth:
+                print(f"  {handler_growth} atexit handlers were registered")
+                ok = False
+            del baseline
+        tracemalloc.stop()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
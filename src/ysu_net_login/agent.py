@@ -0,0 +1,344 @@
+"""
+常驻代理进程
+
+`ysunetlogin agent` 在后台持有一个常驻的 RuijieClient（保持连接池中的连接、TLS会话和
+会话信息），通过本地Unix套接字提供 status/info/login/logout 调用。命令行工具检测到代理时
+直接转发请求，省去解释器加载requests等依赖和建立连接的开销；代理不存在时回退到进程内执行。
+
+协议：每个连接发送一行JSON请求 {"method": ..., "params": {...}, "fingerprint": ...}，
+代理返回一行JSON响应 {"ok": true, "result": ...} 或 {"ok": false, "error": ..., "error_type": ...}，
+客户端带有Tracer时响应中附带本次请求各步骤的耗时 "timings"。
+fingerprint 为调用方有效客户端配置的指纹（见 Config.client_fingerprint），与代理启动时的配置不同时
+代理拒绝执行（error_type 为 config_mismatch），调用方回退到进程内执行。
+
+本模块的客户端部分只依赖标准库，转发请求时不会加载requests。
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+
+# 单个请求/响应的最大长度
+MAX_MESSAGE_SIZE = 1 << 20
+
+# 连接代理与等待响应的超时（秒），登录可能需要较长时间
+CONNECT_TIMEOUT = 0.5
+CALL_TIMEOUT = 120.0
+
+
+class AgentError(Exception):
+    """代理执行请求时出错（错误信息来自代理进程）"""
+
+    def __init__(self, message, error_type=None):
+        self.error_type = error_type
+        super().__init__(message)
+
+
+class AgentUnavailable(Exception):
+    """代理未运行或通信失败"""
+
+
+def default_socket_path():
+    """获取默认套接字路径，优先使用 $XDG_RUNTIME_DIR"""
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if not runtime_dir:
+        runtime_dir = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(runtime_dir, 'ysunetlogin', 'agent.sock')
+
+
+def _read_message(sock):
+    """读取一行JSON消息"""
+    buf = bytearray()
+    while b'\n' not in buf:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > MAX_MESSAGE_SIZE:
+            raise ValueError("Message too large")
+    line = bytes(buf).split(b'\n', 1)[0]
+    if not line:
+        raise ValueError("Empty message")
+    return json.loads(line.decode('utf-8'))
+
+
+def _send_message(sock, message):
+    """发送一行JSON消息"""
+    sock.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class AgentClient:
+    """代理的客户端"""
+
+    def __init__(self, path=None, timeout=CALL_TIMEOUT, fingerprint=None):
+        """
+        Args:
+            path: 套接字路径，默认见 default_socket_path
+            timeout: 等待响应的超时（秒）
+            fingerprint: 调用方客户端配置的指纹，为None时不检查代理的配置
+        """
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+        self.fingerprint = fingerprint
+        # 最近一次调用中代理返回的步骤耗时
+        self.last_timings = None
+
+    def call(self, method, **params):
+        """
+        调用代理方法
+
+        Returns:
+            代理返回的结果
+
+        Raises:
+            AgentUnavailable: 代理未运行或通信失败
+            AgentError: 代理执行请求时出错
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            raise AgentUnavailable("Unix sockets are not supported on this platform")
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                raise AgentUnavailable(f"Agent not running at {self.path}: {e}") from e
+
+            sock.settimeout(self.timeout)
+            try:
+                message = {'method': method, 'params': params}
+                if self.fingerprint:
+                    message['fingerprint'] = self.fingerprint
+                _send_message(sock, message)
+                response = _read_message(sock)
+            except (OSError, ValueError) as e:
+                raise AgentUnavailable(f"Agent communication failed: {e}") from e
+        finally:
+            sock.close()
+
+        if not isinstance(response, dict):
+            raise AgentUnavailable("Malformed agent response")
+        self.last_timings = response.get('timings')
+        if response.get('ok'):
+            return response.get('result')
+        if response.get('error_type') in ('unknown_method', 'config_mismatch'):
+            # 旧版本的代理不支持该方法，或代理的配置与调用方不同，由调用方回退到进程内执行
+            raise AgentUnavailable(response.get('error'))
+        raise AgentError(response.get('error') or "Agent request failed", response.get('error_type'))
+
+    def is_running(self):
+        """检查代理是否在运行"""
+        try:
+            self.call('ping')
+            return True
+        except (AgentUnavailable, AgentError):
+            return False
+
+
+class ResidentAgent:
+    """
+    常驻代理服务端
+
+    所有请求共用一个 RuijieClient，并用锁串行执行（登录流程会修改客户端的会话状态）。
+    """
+
+    def __init__(self, client, path=None, verbose=False, output=None, flush_metrics=None, fingerprint=None):
+        """
+        Args:
+            client: RuijieClient对象
+            path: 套接字路径，默认见 default_socket_path
+            verbose: 是否输出每个请求的日志
+            output: CommandOutput对象，输出机器可读格式时每个请求输出一行JSON
+            flush_metrics: 每个请求处理后调用的函数，用于写出该请求记录的指标
+            fingerprint: 创建client所用配置的指纹，请求携带的指纹与之不同时拒绝执行
+        """
+        self.client = client
+        self.fingerprint = fingerprint
+        self.path = path or default_socket_path()
+        self.verbose = verbose
+        self.output = output
+        self.flush_metrics = flush_metrics
+        self.started = time.time()
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+        self._methods = {
+            'ping': self._ping,
+            'status': self._status,
+            'info': self._info,
+            'login': self._login,
+            'logout': self._logout,
+            'shutdown': self._shutdown,
+        }
+
+    def _log(self, message, event=None, **fields):
+        """输出日志，机器可读模式下输出一行JSON"""
+        if self.output is not None and self.output.structured:
+            self.output.record(dict({'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'event': event or 'log'},
+                                    message=message, **fields))
+        else:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+    # ---- 方法 ----
+
+    def _ping(self):
+        return {
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started,
+            'requests': self.requests_served,
+            'portal_base': self.client.portal_base,
+            'fingerprint': self.fingerprint,
+        }
+
+    def _status(self):
+        is_logged_in, info = self.client.check_login_status()
+        return {
+            'logged_in': is_logged_in,
+            'info': info if is_logged_in else None,
+            'circuits': self.client.circuits.states(),
+        }
+
+    def _info(self):
+        is_logged_in, user_info = self.client.check_login_status()
+        if not is_logged_in:
+            return {'logged_in': False}
+        account_info, _ = self.client.call_with_session(self.client.get_account_info)
+        return {'logged_in': True, 'user_info': user_info, 'account_info': account_info}
+
+    def _login(self, username, password, service="校园网"):
+        return {'success': bool(self.client.login(username, password, service)), 'service': service}
+
+    def _logout(self):
+        return {'success': bool(self.client.logout())}
+
+    def _shutdown(self):
+        self.stop()
+        return {'stopping': True}
+
+    # ---- 服务 ----
+
+    @staticmethod
+    def _check_params(handler, params):
+        """
+        在执行前按处理函数的签名检查参数，处理函数内部抛出的TypeError不会被当作参数错误
+
+        Returns:
+            str: 参数不匹配的原因，匹配时返回None
+        """
+        import inspect
+
+        if not isinstance(params, dict):
+            return "params must be an object"
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            return str(e)
+        return None
+
+    def handle(self, request):
+        """
+        执行一个请求
+
+        Args:
+            request: 请求字典
+
+        Returns:
+            dict: 响应字典
+        """
+        method = request.get('method') if isinstance(request, dict) else None
+        handler = self._methods.get(method)
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown method: {method}", 'error_type': 'unknown_method'}
+        fingerprint = request.get('fingerprint')
+        if (self.fingerprint and fingerprint and fingerprint != self.fingerprint
+                and method not in ('ping', 'shutdown')):
+            return {'ok': False, 'error': "Agent was started with a different client configuration",
+                    'error_type': 'config_mismatch'}
+
+        params = request.get('params') or {}
+        error = self._check_params(handler, params)
+        if error:
+            return {'ok': False, 'error': f"Invalid parameters: {error}", 'error_type': 'bad_request'}
+
+        tracer = self.client.tracer
+        start = time.perf_counter()
+        with self._lock:
+            if tracer is not None:
+                tracer.clear()
+            try:
+                response = {'ok': True, 'result': handler(**params)}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e), 'error_type': type(e).__name__}
+            if tracer is not None:
+                response['timings'] = tracer.step_totals()
+            if self.flush_metrics:
+                self.flush_metrics()
+        self.requests_served += 1
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if self.verbose or (self.output is not None and self.output.structured):
+            self._log(f"{method}: {'ok' if response['ok'] else response['error']} ({elapsed:.1f}ms)",
+                      'request', method=method, ok=response['ok'], error=response.get('error'),
+                      elapsed_ms=round(elapsed, 3), timings=response.get('timings'))
+        return response
+
+    def _prepare_socket_path(self):
+        """创建私有目录，清理上一次异常退出遗留的套接字文件"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        if os.path.exists(self.path):
+            if AgentClient(self.path).is_running():
+                raise RuntimeError(f"Another agent is already running at {self.path}")
+            os.remove(self.path)
+
+    def serve_forever(self):
+        """监听套接字并处理请求，直到调用stop()"""
+        import socketserver
+
+        agent = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.request.settimeout(CALL_TIMEOUT)
+                try:
+                    request = _read_message(self.request)
+                except (OSError, ValueError) as e:
+                    response = {'ok': False, 'error': f"Bad request: {e}", 'error_type': 'bad_request'}
+                else:
+                    response = agent.handle(request)
+                try:
+                    _send_message(self.request, response)
+                except OSError:
+                    pass
+
+        self._prepare_socket_path()
+        # 套接字仅当前用户可访问（请求中包含密码）
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        self._log(f"Agent listening on {self.path} (pid {os.getpid()})", 'started', path=self.path, pid=os.getpid())
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self._log("Agent stopped", 'stopped')
+
+    def stop(self):
+        """停止服务（不等待，可在信号处理函数和请求处理线程中调用）"""
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
@@ -0,0 +1,138 @@
+"""
+验证码终端渲染
+
+把验证码图片渲染为终端中可显示的文本：
+- ASCII 字符画：灰度缓冲区经 256 项查找表一次 bytes.translate 映射为字符，不逐像素拼接字符串
+- ANSI 半块字符：每个字符单元用上半块 "▀" 显示上下两个像素（前景色为上方像素，背景色为下方像素），
+  24位真彩色，分辨率是字符画的两倍且保留颜色
+
+仅在需要显示验证码时才加载 Pillow。
+"""
+
+from io import BytesIO
+from functools import lru_cache
+
+
+# 不同密度的字符集，从暗到亮
+CHAR_SETS = {
+    'dense': "@%#*+=-:. ",
+    'standard': "@#S%?*+;:,. ",
+    'extended': "$@B%8&WM#*oahkbdpqwmZO0QLCJUYXzcvunxrjft/\\|()1{}[]?-_+~<>i!lI;:,\"^`'. ",
+}
+
+# 字符的高宽比补偿（终端字符约为高2宽1）
+CHAR_ASPECT = 0.55
+
+UPPER_HALF_BLOCK = '▀'
+ANSI_RESET = '\x1b[0m'
+
+
+@lru_cache(maxsize=None)
+def _translate_table(chars):
+    """灰度值 (0-255) 到字符的查找表，映射方式与逐像素计算 int(v * (n - 1) / 255) 相同"""
+    last = len(chars) - 1
+    return bytes(ord(chars[int(value * last / 255)]) for value in range(256))
+
+
+@lru_cache(maxsize=None)
+def _gray_sgr(background):
+    """灰度值到真彩色SGR序列的查找表"""
+    code = 48 if background else 38
+    return tuple(f'\x1b[{code};2;{v};{v};{v}m' for v in range(256))
+
+
+def _open_image(image):
+    """接受图片二进制数据或 PIL.Image 对象"""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        from PIL import Image
+        return Image.open(BytesIO(image))
+    return image
+
+
+def image_to_ascii(image, width=60, char_set="standard"):
+    """
+    将图像转换为 ASCII 字符画
+
+    Args:
+        image: 图片二进制数据或 PIL.Image 对象
+        width: 输出宽度（字符数）
+        char_set: 字符集类型（"dense"、"standard"、"extended"），未知的类型使用 standard
+
+    Returns:
+        tuple: (字符画文本（每行以换行结尾）, 原始尺寸, 输出尺寸)
+    """
+    image = _open_image(image)
+    orig_width, orig_height = image.size
+    height = max(1, int(orig_height / orig_width * width * CHAR_ASPECT))
+
+    gray = image.resize((width, height)).convert('L').tobytes()
+    mapped = gray.translate(_translate_table(CHAR_SETS.get(char_set, CHAR_SETS['standard'])))
+
+    rows = [mapped[start:start + width] for start in range(0, len(mapped), width)]
+    rows.append(b'')
+    return b'\n'.join(rows).decode('ascii'), (orig_width, orig_height), (width, height)
+
+
+def image_to_halfblocks(image, width=60, color=True):
+    """
+    将图像转换为 ANSI 半块字符（24位真彩色）
+
+    相邻字符单元颜色相同时不重复输出转义序列。
+
+    Args:
+        image: 图片二进制数据或 PIL.Image 对象
+        width: 输出宽度（字符数）
+        color: 是否保留颜色，为False时输出灰度
+
+    Returns:
+        tuple: (带ANSI转义序列的文本（每行以换行结尾）, 原始尺寸, 输出尺寸（字符数）)
+    """
+    image = _open_image(image)
+    orig_width, orig_height = image.size
+    # 每个字符单元对应上下两个像素，像素近似为正方形
+    pixel_rows = max(2, int(orig_height / orig_width * width) // 2 * 2)
+    resized = image.resize((width, pixel_rows))
+
+    if color:
+        data = resized.convert('RGB').tobytes()
+        stride = width * 3
+        fg_cache = {}
+        bg_cache = {}
+
+        def cells(top, bottom):
+            for x in range(0, stride, 3):
+                upper, lower = top[x:x + 3], bottom[x:x + 3]
+                fg = fg_cache.get(upper)
+                if fg is None:
+                    fg = fg_cache[upper] = '\x1b[38;2;%d;%d;%dm' % tuple(upper)
+                bg = bg_cache.get(lower)
+                if bg is None:
+                    bg = bg_cache[lower] = '\x1b[48;2;%d;%d;%dm' % tuple(lower)
+                yield fg, bg
+    else:
+        data = resized.convert('L').tobytes()
+        stride = width
+        fg_table = _gray_sgr(False)
+        bg_table = _gray_sgr(True)
+
+        def cells(top, bottom):
+            return zip(map(fg_table.__getitem__, top), map(bg_table.__getitem__, bottom))
+
+    lines = []
+    for y in range(0, pixel_rows, 2):
+        top = data[y * stride:(y + 1) * stride]
+        bottom = data[(y + 1) * stride:(y + 2) * stride]
+        parts = []
+        previous_fg = previous_bg = None
+        for fg, bg in cells(top, bottom):
+            if fg is not previous_fg:
+                parts.append(fg)
+                previous_fg = fg
+            if bg is not previous_bg:
+                parts.append(bg)
+                previous_bg = bg
+            parts.append(UPPER_HALF_BLOCK)
+        parts.append(ANSI_RESET)
+        lines.append(''.join(parts))
+    lines.append('')
+    return '\n'.join(lines), (orig_width, orig_height), (width, pixel_rows // 2)
@@ -0,0 +1,321 @@
+import time
+
+from .crypto import aes_ecb_encrypt_many
+from .ruijie_client import (
+    _unwrap_api_data,
+    _parse_query_params,
+    _build_cas_sso_url,
+    _parse_cas_sso_page,
+    _parse_cas_sso_error,
+    _build_cas_sso_form,
+    _verify_login_result,
+)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - 可选依赖
+    aiohttp = None
+
+
+class AsyncRuijieClient:
+    """
+    燕山大学锐捷V2网络认证客户端（asyncio版本）
+
+    接口与 RuijieClient 保持一致，所有网络方法均为协程，
+    可在同一个事件循环中并发执行大量状态检查。需要安装可选依赖 aiohttp：
+
+        pip install "ysu-net-login[async]"
+    """
+
+    # 认证门户根地址
+    PORTAL_BASE = "https://auth1.ysu.edu.cn"
+
+    def __init__(self, proxies=None, verbose=False, session=None, portal_base=None):
+        """
+        初始化异步锐捷客户端
+
+        Args:
+            proxies: 代理设置字典，格式如 {"http": "...", "https": "..."}，仅支持HTTP代理
+            verbose: 是否输出详细日志
+            session: 外部传入的aiohttp.ClientSession，为None时在首次请求时创建
+            portal_base: 认证门户根地址，默认为PORTAL_BASE
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncRuijieClient requires aiohttp. Install it with: pip install \"ysu-net-login[async]\""
+            )
+
+        self.portal_base = (portal_base or self.PORTAL_BASE).rstrip('/')
+        self.proxies = proxies or {}
+        self.verbose = verbose
+        self.client = session
+        self._owns_session = session is None
+        self.session_info = None
+
+        # aiohttp 每个请求只能指定一个代理，门户均为HTTPS，优先使用https代理
+        self._proxy = self.proxies.get('https') or self.proxies.get('http')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """关闭自行创建的HTTP会话"""
+        if self.client is not None and self._owns_session:
+            await self.client.close()
+            self.client = None
+
+    def _get_session(self):
+        """获取（必要时创建）HTTP会话"""
+        if self.client is None:
+            self.client = aiohttp.ClientSession(
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+                },
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            )
+            self._owns_session = True
+        return self.client
+
+    def _log(self, message):
+        """输出日志信息"""
+        if self.verbose:
+            print(f"[DEBUG] {message}")
+
+    async def _post_json(self, url, payload, json_response=True):
+        """
+        POST JSON请求并解包响应
+
+        Args:
+            url: 请求URL
+            payload: JSON请求体
+            json_response: 是否按门户接口格式解包
+
+        Returns:
+            响应数据
+        """
+        async with self._get_session().post(url, json=payload, proxy=self._proxy) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+
+        if json_response:
+            return _unwrap_api_data(data)
+        return data
+
+    async def get_online_user_info(self, session_id='114514'):
+        """
+        获取当前在线用户信息
+
+        Args:
+            session_id: 会话ID，检查状态时可以使用默认值
+
+        Returns:
+            用户在线信息字典
+        """
+        timestamp = int(time.time() * 1000)
+        url = f"{self.portal_base}/eportal/adaptor/getOnlineUserInfo?sessionId={session_id}&{timestamp}&version=this%20is%20a%20git-commit"
+
+        async with self._get_session().get(url, proxy=self._proxy) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        return _unwrap_api_data(data)
+
+    async def redirect_to_portal(self, redirect_url=None):
+        """
+        重定向到门户网站获取会话信息
+
+        Args:
+            redirect_url: 重定向URL，默认为门户的redirect.jsp
+
+        Returns:
+            包含sessionId等参数的字典
+        """
+        redirect_url = redirect_url or f"{self.portal_base}/eportal/redirect.jsp?mode=history"
+        session = self._get_session()
+        async with session.get(redirect_url, proxy=self._proxy) as resp:
+            text = await resp.text()
+            final_url = str(resp.url)
+
+        # 处理JavaScript重定向
+        if "location.href=" in text:
+            redirect_url_2 = text.split("'")[1].split("'")[0]
+            async with session.get(redirect_url_2, proxy=self._proxy) as resp:
+                final_url = str(resp.url)
+
+        if "portal-main" not in final_url:
+            raise Exception(f"Portal redirection failed. Expected URL to contain 'portal-main', but got: {final_url}")
+
+        return _parse_query_params(final_url)
+
+    async def cas_sso_login(self, username, password, session_info):
+        """
+        通过cas-sso直接登录
+
+        Args:
+            username: 用户名
+            password: 密码
+            session_info: 会话信息字典
+
+        Returns:
+            bool: 登录是否成功
+        """
+        session = self._get_session()
+        cas_sso_url = _build_cas_sso_url(session_info, self.portal_base)
+
+        self._log("Fetching cas-sso login page...")
+        async with session.get(cas_sso_url, proxy=self._proxy) as resp:
+            resp.raise_for_status()
+            html = await resp.text()
+
+        croypto, execution = _parse_cas_sso_page(html)
+        self._log(f"Got croypto: {croypto[:20]}..., execution length: {len(execution)}")
+
+        encrypted_password, encrypted_captcha = aes_ecb_encrypt_many(croypto, password, '{}')
+        form_data = _build_cas_sso_form(username, execution, croypto, encrypted_password, encrypted_captcha)
+
+        self._log("Submitting cas-sso login form...")
+        async with session.post(cas_sso_url + "&accept-language=zh-CN", data=form_data, proxy=self._proxy) as resp:
+            final_url = str(resp.url)
+            status = resp.status
+            html = await resp.text()
+
+        self._log(f"Login response URL: {final_url}")
+
+        if 'auth-success' in final_url or 'ticket=' in final_url:
+            self._log("CAS-SSO login succeeded (got ticket)")
+            return True
+
+        if status == 200:
+            error_message = _parse_cas_sso_error(html)
+            if error_message:
+                raise Exception(f"Login failed: {error_message}")
+
+        raise Exception(f"CAS-SSO login failed, final URL: {final_url}")
+
+    async def service_selection(self, session_info):
+        """获取可用服务列表"""
+        return await self._post_json(
+            f"{self.portal_base}/eportal/network/serviceSelection",
+            {"sessionId": session_info['sessionId']}
+        )
+
+    async def service_login(self, session_info, service="校园网"):
+        """登录到指定服务，返回原始响应"""
+        return await self._post_json(
+            f"{self.portal_base}/eportal/network/serviceLogin",
+            {"sessionId": session_info['sessionId'], "service": service},
+            json_response=False
+        )
+
+    async def user_online(self, session_info):
+        """检查用户是否在线"""
+        return await self._post_json(
+            f"{self.portal_base}/eportal/network/userOnline",
+            {"sessionId": session_info['sessionId']}
+        )
+
+    async def get_account_info(self, session_info):
+        """获取账户信息"""
+        return await self._post_json(
+            f"{self.portal_base}/eportal/operator/getAccountInfo",
+            {"sessionId": session_info['sessionId']}
+        )
+
+    async def offline(self, session_info):
+        """用户登出"""
+        return await self._post_json(
+            f"{self.portal_base}/eportal/network/offline",
+            {"sessionId": session_info['sessionId']}
+        )
+
+    async def check_login_status(self):
+        """
+        检查当前登录状态
+
+        Returns:
+            tuple: (is_logged_in, user_info_or_redirect_url)
+        """
+        try:
+            user_info = await self.get_online_user_info()
+            redirect_url = user_info["portalOnlineUserInfo"].get("redirectUrl")
+
+            if redirect_url:
+                return False, redirect_url
+            return True, user_info
+        except Exception as e:
+            self._log(f"Error checking login status: {e}")
+            return False, None
+
+    async def login(self, username, password, service="校园网"):
+        """
+        执行完整的登录流程
+
+        Args:
+            username: 用户名
+            password: 密码
+            service: 要登录的服务名称
+
+        Returns:
+            bool: 登录是否成功
+        """
+        try:
+            is_logged_in, info = await self.check_login_status()
+            if is_logged_in:
+                self._log("Already logged in")
+                return True
+
+            session_info = await self.redirect_to_portal()
+            self._log(f"Got session info: {session_info}")
+
+            await self.cas_sso_login(username, password, session_info)
+
+            services = await self.service_selection(session_info)
+            self._log(f"Available services: {services}")
+
+            login_result = await self.service_login(session_info, service)
+            self._log(f"Service login result: {login_result}")
+
+            online_status = await self.user_online(session_info)
+            self._log(f"User online status: {online_status}")
+
+            _verify_login_result(login_result, online_status)
+
+            self.session_info = session_info
+            return True
+
+        except Exception as e:
+            if self.verbose:
+                self._log(f"Login failed: {e}")
+            raise e
+
+    async def logout(self):
+        """
+        执行登出操作
+
+        Returns:
+            bool: 登出是否成功
+        """
+        try:
+            is_logged_in, info = await self.check_login_status()
+            if not is_logged_in:
+                self._log("Already logged out")
+                return True
+
+            session_info = self.session_info or await self.redirect_to_portal()
+            self._log(f"Got session info for logout: {session_info}")
+
+            offline_result = await self.offline(session_info)
+            self._log(f"Offline result: {offline_result}")
+
+            final_status = await self.user_online(session_info)
+            self._log(f"Final user status: {final_status}")
+
+            self.session_info = None
+            return True
+
+        except Exception as e:
+            if self.verbose:
+                self._log(f"Logout failed: {e}")
+            raise e
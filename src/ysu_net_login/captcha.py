@@ -0,0 +1,494 @@
+"""
+验证码识别
+
+YSULogin 需要验证码时把图片交给识别器（CaptchaSolver）：
+- TemplateSolver：本地CPU识别，二值化（Otsu阈值）→ 按列投影切分字符 → 归一化为固定大小的点阵 →
+  在已标注样本的字符模板上做 k 近邻（汉明距离）分类；置信度不足时返回None，交给下一个识别器
+- ManualSolver：显示验证码并由用户输入（原有的交互方式）
+- SolverChain：依次尝试多个识别器
+
+训练与评估工具::
+
+    python -m ysu_net_login.captcha generate samples/ -n 500     # 用模拟门户的验证码生成样本
+    python -m ysu_net_login.captcha train samples/ -o model.json
+    python -m ysu_net_login.captcha evaluate holdout/ --model model.json
+
+样本目录中每个图片的文件名即标注：`a7Kq.jpg` 或 `a7Kq_001.png`（下划线之后的部分被忽略）。
+"""
+
+import os
+import json
+import time
+import heapq
+import statistics
+from abc import ABC, abstractmethod
+from io import BytesIO
+from collections import Counter
+
+
+# 字符点阵大小（宽 x 高）
+GLYPH_WIDTH = 12
+GLYPH_HEIGHT = 16
+GLYPH_BITS = GLYPH_WIDTH * GLYPH_HEIGHT
+
+MODEL_VERSION = 1
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+class CaptchaSolver(ABC):
+    """验证码识别器接口"""
+
+    name = 'solver'
+
+    @abstractmethod
+    def solve(self, image_data):
+        """
+        识别验证码
+
+        Args:
+            image_data: 验证码图片二进制数据
+
+        Returns:
+            str: 识别结果，无法识别时返回None
+        """
+
+
+class ManualSolver(CaptchaSolver):
+    """显示验证码并由用户输入"""
+
+    name = 'manual'
+
+    def __init__(self, display=None, prompt="请输入验证码: ", input_func=None):
+        """
+        Args:
+            display: 显示验证码的函数，参数为图片二进制数据
+            prompt: 输入提示
+            input_func: 读取输入的函数（便于测试替换），为None时在输入时使用内置的 input
+        """
+        self.display = display
+        self.prompt = prompt
+        self.input_func = input_func
+
+    def solve(self, image_data):
+        if self.display:
+            self.display(image_data)
+        try:
+            answer = (self.input_func or input)(self.prompt).strip()
+        except (KeyboardInterrupt, EOFError):
+            print("\n验证码输入已取消")
+            raise KeyboardInterrupt("用户取消验证码输入")
+        if not answer:
+            print("警告：验证码为空")
+            return None
+        return answer
+
+
+class SolverChain(CaptchaSolver):
+    """依次尝试多个识别器，返回第一个识别结果"""
+
+    name = 'chain'
+
+    def __init__(self, solvers):
+        """
+        Args:
+            solvers: CaptchaSolver列表
+        """
+        self.solvers = list(solvers)
+        # 最近一次给出结果的识别器
+        self.last_solver = None
+
+    def solve(self, image_data):
+        self.last_solver = None
+        for solver in self.solvers:
+            answer = solver.solve(image_data)
+            if answer:
+                self.last_solver = solver
+                return answer
+        return None
+
+
+# ---- 预处理与切分 ----
+
+def _otsu_threshold(histogram):
+    """按Otsu方法计算二值化阈值"""
+    total = sum(histogram)
+    if not total:
+        return 128
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_threshold, best_variance = 128, -1.0
+    for threshold, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += threshold * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return best_threshold
+
+
+def binarize(image_data):
+    """
+    将验证码图片二值化
+
+    Args:
+        image_data: 图片二进制数据
+
+    Returns:
+        PIL.Image: 模式为 'L' 的图像，前景（字符）为255，背景为0
+    """
+    from PIL import Image
+
+    gray = Image.open(BytesIO(image_data)).convert('L')
+    threshold = _otsu_threshold(gray.histogram())
+    # 深色字符在浅色背景上；前景多于一半时说明是浅色字符，取反
+    binary = gray.point(lambda v: 255 if v <= threshold else 0)
+    if binary.histogram()[255] > gray.width * gray.height // 2:
+        binary = binary.point(lambda v: 255 - v)
+    return binary
+
+
+def _column_runs(binary, min_pixels):
+    """按列投影找出连续的前景列区间 [(x0, x1, 像素数)]"""
+    width, height = binary.size
+    data = binary.tobytes()
+    columns = [0] * width
+    for y in range(height):
+        row = data[y * width:(y + 1) * width]
+        for x in range(width):
+            if row[x]:
+                columns[x] += 1
+
+    runs = []
+    start = None
+    for x, count in enumerate(columns + [0]):
+        if count and start is None:
+            start = x
+        elif not count and start is not None:
+            pixels = sum(columns[start:x])
+            if pixels >= min_pixels:
+                runs.append([start, x, pixels])
+            start = None
+    return runs
+
+
+def segment(binary, length=None, min_pixels=4):
+    """
+    按列投影切分字符
+
+    Args:
+        binary: binarize() 的结果
+        length: 期望的字符数，给出时合并间隔最小的相邻区间或对半拆分最宽的区间直到数量一致
+        min_pixels: 少于该像素数的区间视为噪点
+
+    Returns:
+        list: 每个字符的列区间 (x0, x1)
+    """
+    runs = _column_runs(binary, min_pixels)
+    if length:
+        while len(runs) > length:
+            gaps = [runs[i + 1][0] - runs[i][1] for i in range(len(runs) - 1)]
+            i = gaps.index(min(gaps))
+            runs[i:i + 2] = [[runs[i][0], runs[i + 1][1], runs[i][2] + runs[i + 1][2]]]
+        while runs and len(runs) < length:
+            i = max(range(len(runs)), key=lambda j: runs[j][1] - runs[j][0])
+            x0, x1, pixels = runs[i]
+            if x1 - x0 < 2:
+                break
+            middle = (x0 + x1) // 2
+            runs[i:i + 1] = [[x0, middle, pixels // 2], [middle, x1, pixels - pixels // 2]]
+    return [(x0, x1) for x0, x1, _ in runs]
+
+
+def glyph_bits(binary, x0, x1):
+    """
+    把一个字符区间裁剪到前景的边界并缩放为固定大小的点阵
+
+    Returns:
+        int: GLYPH_BITS 位的位图
+    """
+    from PIL import Image
+
+    column = binary.crop((x0, 0, x1, binary.height))
+    box = column.getbbox()
+    if box:
+        column = column.crop(box)
+    scaled = column.resize((GLYPH_WIDTH, GLYPH_HEIGHT), Image.BILINEAR)
+    return int(scaled.tobytes().translate(_BIT_CHARS), 2)
+
+
+# 灰度值到 '0'/'1' 的映射，缩放后的点阵经一次 translate 转换为整数
+_BIT_CHARS = bytes(48 if value < 96 else 49 for value in range(256))
+
+
+def extract_glyphs(image_data, length=None):
+    """
+    从验证码图片中提取字符点阵
+
+    Args:
+        image_data: 图片二进制数据
+        length: 期望的字符数
+
+    Returns:
+        list: 每个字符的位图（int）
+    """
+    binary = binarize(image_data)
+    return [glyph_bits(binary, x0, x1) for x0, x1 in segment(binary, length)]
+
+
+# ---- 模板分类器 ----
+
+class TemplateSolver(CaptchaSolver):
+    """
+    基于字符模板 k 近邻的本地识别器
+
+    只依赖 Pillow，识别一张验证码在毫秒级完成。
+    """
+
+    name = 'template'
+
+    def __init__(self, templates=None, length=None, k=3, min_confidence=0.5, ignore_case=True):
+        """
+        Args:
+            templates: (位图, 字符) 列表
+            length: 验证码长度，为None时不调整切分结果
+            k: 近邻数
+            min_confidence: 任一字符的置信度低于该值时放弃识别（返回None）
+            ignore_case: 训练时是否把标注统一为小写（门户校验验证码时不区分大小写）
+        """
+        self.templates = list(templates or [])
+        self.length = length
+        self.k = k
+        self.min_confidence = min_confidence
+        self.ignore_case = ignore_case
+        # 最近一次识别中各字符的置信度
+        self.last_confidence = []
+
+    @classmethod
+    def load(cls, path, **options):
+        """从模型文件加载"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MODEL_VERSION or data.get('glyph') != [GLYPH_WIDTH, GLYPH_HEIGHT]:
+            raise ValueError(f"Unsupported captcha model: {path}")
+        templates = [(int(bits, 16), char) for bits, char in data['templates']]
+        options.setdefault('length', data.get('length'))
+        options.setdefault('ignore_case', data.get('ignore_case', True))
+        return cls(templates, **options)
+
+    def save(self, path):
+        """保存模型文件"""
+        data = {
+            'version': MODEL_VERSION,
+            'glyph': [GLYPH_WIDTH, GLYPH_HEIGHT],
+            'length': self.length,
+            'ignore_case': self.ignore_case,
+            'templates': [[format(bits, 'x'), char] for bits, char in self.templates],
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def train(self, samples):
+        """
+        从已标注样本中提取字符模板
+
+        Args:
+            samples: (图片二进制数据, 标注) 的可迭代对象
+
+        Returns:
+            tuple: (使用的样本数, 切分数量与标注长度不一致而跳过的样本数)
+        """
+        samples = list(samples)
+        if self.length is None and samples:
+            self.length = Counter(len(label) for _, label in samples).most_common(1)[0][0]
+
+        used = skipped = 0
+        for image_data, label in samples:
+            if self.ignore_case:
+                label = label.lower()
+            glyphs = extract_glyphs(image_data, len(label))
+            if len(glyphs) != len(label):
+                skipped += 1
+                continue
+            self.templates.extend(zip(glyphs, label))
+            used += 1
+        return used, skipped
+
+    def classify(self, bits):
+        """
+        分类单个字符
+
+        Returns:
+            tuple: (字符, 置信度)，置信度为 k 近邻中投票给该字符的比例乘以最近距离的相似度
+        """
+        if not self.templates:
+            return None, 0.0
+        nearest = heapq.nsmallest(self.k, ((_popcount(bits ^ template), char) for template, char in self.templates))
+        votes = Counter(char for _, char in nearest)
+        char, count = votes.most_common(1)[0]
+        distance = min(d for d, c in nearest if c == char)
+        return char, count / len(nearest) * (1 - distance / GLYPH_BITS)
+
+    def solve(self, image_data):
+        try:
+            glyphs = extract_glyphs(image_data, self.length)
+        except (OSError, ValueError):
+            return None
+        if not glyphs or (self.length and len(glyphs) != self.length):
+            return None
+
+        answer = []
+        self.last_confidence = []
+        for bits in glyphs:
+            char, confidence = self.classify(bits)
+            self.last_confidence.append(confidence)
+            if char is None or confidence < self.min_confidence:
+                return None
+            answer.append(char)
+        return ''.join(answer)
+
+
+# ---- 样本与评估 ----
+
+def load_samples(directory):
+    """
+    加载已标注的验证码样本
+
+    Args:
+        directory: 样本目录，文件名（下划线或扩展名之前的部分）为标注
+
+    Returns:
+        list: (图片二进制数据, 标注) 列表
+    """
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        label = stem.split('_', 1)[0]
+        if not label:
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            samples.append((f.read(), label))
+    return samples
+
+
+def evaluate(solver, samples, ignore_case=True):
+    """
+    评估识别器的准确率与耗时
+
+    Args:
+        solver: CaptchaSolver对象
+        samples: (图片二进制数据, 标注) 列表
+        ignore_case: 比较时是否忽略大小写
+
+    Returns:
+        dict: total、correct、rejected（未给出结果）、accuracy、char_accuracy、median_ms、p95_ms
+    """
+    correct = rejected = chars_correct = chars_total = 0
+    latencies = []
+    for image_data, label in samples:
+        start = time.perf_counter()
+        answer = solver.solve(image_data)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        chars_total += len(label)
+        if answer is None:
+            rejected += 1
+            continue
+        if ignore_case:
+            answer, label = answer.lower(), label.lower()
+        correct += answer == label
+        chars_correct += sum(a == b for a, b in zip(answer, label))
+
+    ordered = sorted(latencies)
+    return {
+        'total': len(samples),
+        'correct': correct,
+        'rejected': rejected,
+        'accuracy': correct / len(samples) if samples else 0.0,
+        'char_accuracy': chars_correct / chars_total if chars_total else 0.0,
+        'median_ms': statistics.median(ordered) if ordered else 0.0,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0,
+    }
+
+
+def main():
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Train and evaluate the local captcha solver")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Write labeled captchas rendered like the mock portal')
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('-n', '--count', type=int, default=500)
+    generate_parser.add_argument('--seed', type=int, help='Random seed for reproducible samples')
+
+    train_parser = subparsers.add_parser('train', help='Build a template model from labeled captchas')
+    train_parser.add_argument('directory')
+    train_parser.add_argument('-o', '--output', required=True, help='Model file to write')
+    train_parser.add_argument('--case-sensitive', action='store_true', help='Keep label case')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='Measure accuracy and latency on labeled captchas')
+    evaluate_parser.add_argument('directory')
+    evaluate_parser.add_argument('--model', required=True, help='Model file')
+    evaluate_parser.add_argument('--min-confidence', type=float, default=0.5)
+    evaluate_parser.add_argument('-k', type=int, default=3, help='Number of neighbours (default: 3)')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        from .mock_portal import _captcha_image, _random_token
+
+        if args.seed is not None:
+            random.seed(args.seed)
+        os.makedirs(args.directory, exist_ok=True)
+        for i in range(args.count):
+            text = _random_token(4)
+            with open(os.path.join(args.directory, f"{text}_{i:05d}.jpg"), 'wb') as f:
+                f.write(_captcha_image(text))
+        print(f"Wrote {args.count} captchas to {args.directory}")
+        return 0
+
+    samples = load_samples(args.directory)
+    if not samples:
+        print(f"No labeled captcha images found in {args.directory}")
+        return 1
+
+    if args.command == 'train':
+        solver = TemplateSolver(ignore_case=not args.case_sensitive)
+        start = time.perf_counter()
+        used, skipped = solver.train(samples)
+        solver.save(args.output)
+        print(f"Trained on {used} captchas ({skipped} skipped, segmentation mismatch), "
+              f"{len(solver.templates)} templates, length {solver.length}, {time.perf_counter() - start:.2f}s")
+        print(f"Model written to {args.output}")
+        return 0
+
+    solver = TemplateSolver.load(args.model, k=args.k, min_confidence=args.min_confidence)
+    result = evaluate(solver, samples, ignore_case=solver.ignore_case)
+    print(f"captchas:       {result['total']}")
+    print(f"accuracy:       {result['accuracy'] * 100:.1f}% ({result['correct']} correct, "
+          f"{result['rejected']} rejected)")
+    print(f"char accuracy:  {result['char_accuracy'] * 100:.1f}%")
+    print(f"latency:        median {result['median_ms']:.2f}ms  p95 {result['p95_ms']:.2f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
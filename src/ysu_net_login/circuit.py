@@ -0,0 +1,228 @@
+"""
+门户请求熔断器
+
+按主机（auth1.ysu.edu.cn、cer.ysu.edu.cn 等）统计连续失败次数：
+连续失败达到阈值后熔断器打开，之后的请求不再发出而是立即抛出 CircuitOpenError；
+冷却时间过后进入半开状态，只放行一个探测请求，成功则恢复，失败则重新打开。
+状态可以持久化到缓存目录，使频繁运行的命令（如cron中的status/login）共享同一熔断状态，
+门户故障期间不会每次都重新探测。
+"""
+
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 默认连续失败阈值与冷却时间（秒）
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时请求被拒绝"""
+
+    def __init__(self, host, failures, retry_after):
+        """
+        Args:
+            host: 主机名
+            failures: 连续失败次数
+            retry_after: 距离下一次允许探测的秒数
+        """
+        self.host = host
+        self.failures = failures
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit open for {host} after {failures} consecutive failures, "
+            f"next probe in {retry_after:.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """单个主机的熔断器（线程安全）"""
+
+    def __init__(self, host, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 on_change=None):
+        """
+        Args:
+            host: 主机名
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 打开后进入半开状态前的冷却时间（秒）
+            on_change: 状态变化时的回调，参数为熔断器对象
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        # 半开状态下探测请求的截止时间，探测进程异常退出时到期后允许新的探测
+        self.probe_until = None
+        self._lock = threading.Lock()
+
+    def _notify(self):
+        if self.on_change:
+            self.on_change(self)
+
+    def retry_after(self, now=None):
+        """距离下一次允许探测的秒数"""
+        if self.state == CLOSED:
+            return 0.0
+        now = time.time() if now is None else now
+        until = self.probe_until if self.state == HALF_OPEN else (self.opened_at or now) + self.reset_timeout
+        return max(0.0, (until or now) - now)
+
+    def before_call(self):
+        """
+        请求前检查是否放行，不放行时抛出 CircuitOpenError
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.time()
+            if self.state == OPEN and now - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(self.host, self.failures, self.retry_after(now))
+            if self.state == HALF_OPEN and self.probe_until and now < self.probe_until:
+                raise CircuitOpenError(self.host, self.failures, self.retry_after(now))
+            # 冷却结束（或上一个探测已超时），放行一个探测请求
+            self.state = HALF_OPEN
+            self.probe_until = now + self.reset_timeout
+        self._notify()
+
+    def record_success(self):
+        """记录一次成功的请求"""
+        with self._lock:
+            if self.state == CLOSED and self.failures == 0:
+                return
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.probe_until = None
+        self._notify()
+
+    def record_failure(self):
+        """记录一次失败的请求"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+                self.probe_until = None
+        self._notify()
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened_at': self.opened_at,
+            'probe_until': self.probe_until,
+        }
+
+    def restore(self, data):
+        """从持久化的状态恢复"""
+        if data.get('state') not in (CLOSED, OPEN, HALF_OPEN):
+            return
+        self.state = data['state']
+        self.failures = int(data.get('failures') or 0)
+        self.opened_at = data.get('opened_at')
+        self.probe_until = data.get('probe_until')
+        if self.state == OPEN and self.opened_at is None:
+            self.opened_at = time.time()
+
+
+class CircuitBreakers:
+    """按主机管理熔断器，可选地持久化到文件"""
+
+    def __init__(self, path=None, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        """
+        Args:
+            path: 状态文件路径，为None时只在内存中保存
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 冷却时间（秒）
+        """
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._saved = self._load()
+
+    @staticmethod
+    def default_path():
+        """获取默认状态文件路径"""
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache_home, 'ysunetlogin', 'circuit.json')
+
+    def _load(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, breaker):
+        """
+        写入一个主机的状态：持锁重新读取文件后只替换该主机的条目，
+        同时运行的其他进程（CLI、常驻代理、批量登录）写入的其他主机状态不会被覆盖
+        """
+        if not self.path:
+            return
+        state = breaker.to_dict()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            with open(f"{self.path}.lock", 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                data = self._load()
+                data[breaker.host] = state
+                tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+        except OSError:
+            data = {breaker.host: state}
+        with self._lock:
+            self._saved.update(data)
+
+    def get(self, host):
+        """获取主机对应的熔断器，不存在时创建"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, self.failure_threshold, self.reset_timeout, on_change=self._save)
+                saved = self._saved.get(host)
+                if isinstance(saved, dict):
+                    breaker.restore(saved)
+                self._breakers[host] = breaker
+            return breaker
+
+    def states(self):
+        """
+        获取所有已知主机的熔断器状态
+
+        Returns:
+            list: (主机名, 状态, 连续失败次数, 距离下一次探测的秒数) 列表
+        """
+        with self._lock:
+            hosts = sorted(set(self._breakers) | set(self._saved))
+        result = []
+        for host in hosts:
+            breaker = self.get(host)
+            result.append((host, breaker.state, breaker.failures, breaker.retry_after()))
+        return result
@@ -1,6 +1,11 @@
 import os
 import sys
+import json
+import time
+import unicodedata
 from typing import Optional, Dict, Any
+from .session_cache import SessionCache
+from .config_files import ConfigFileError
 
 
 class Config:
@@ -18,21 +23,102 @@ class Config:
         "4": "中国移动"
     }
     
-    def __init__(self):
+    def __init__(self, config_file=None):
+        """
+        Args:
+            config_file: 额外的配置文件（--config），为None时使用 RUIJIE_CONFIG
+        
+        Raises:
+            ConfigFileError: 配置文件无法解析或包含无效的值
+        """
         self.username = None
         self.password = None
         self.proxies = {}
         self.verbose = False
+        self.debug_nodes = False
         self.service = "校园网"
         self.list_services = False
+        self.session_cache_path = SessionCache.default_path()
+        self.portal_base = None
+        self.tracer = None
+        self.output = CommandOutput()
+        self.connect_timeout = None
+        self.timeout = None
+        self.retries = None
+        self.circuit_state_path = None  # None表示默认路径
+        self.use_agent = True
+        self.agent_socket = None  # None表示默认路径
+        self.metrics_enabled = True
+        self.metrics_path = None  # None表示默认路径
+        self.metrics_textfile = None
+        self.vault_path = None  # None表示默认路径
+        self._vault = None
+        self.accounts = []  # 配置文件中的 [[accounts]]
+        self.dns_cache_enabled = True
+        self.dns_cache_path = None  # None表示默认路径
+        self.dns_ttl = None
+        self.dns_pins = {}  # 主机 -> IP列表
+        self._resolver = None
+        self.fleet_concurrency = None
+        self.config_files = []
+        self.config_cached = False
         
-        # 从环境变量加载配置
+        # 依次从配置文件、环境变量加载配置（命令行参数由 update_from_args 覆盖）
+        self._load_from_files(config_file or os.getenv('RUIJIE_CONFIG') or None)
         self._load_from_env()
     
+    def _load_from_files(self, explicit=None):
+        """从分层配置文件加载配置（见 config_files）"""
+        from . import config_files
+        
+        snapshot = config_files.load(explicit)
+        self.config_files = snapshot.files
+        self.config_cached = snapshot.cached
+        settings = snapshot.settings
+        for warning in snapshot.warnings:
+            print(f"Warning: {warning}")
+        
+        if settings.get('services'):
+            # 实例属性覆盖类属性，只影响本配置对象
+            self.SERVICE_MAPPING = dict(Config.SERVICE_MAPPING,
+                                        **{k.lower(): v for k, v in settings['services'].items()})
+        for key in ('username', 'password', 'portal_base', 'verbose', 'debug_nodes', 'timeout',
+                    'connect_timeout', 'retries', 'agent_socket', 'metrics_textfile', 'accounts'):
+            if key in settings:
+                setattr(self, key, settings[key])
+        if 'service' in settings:
+            self.service = resolve_service_name(settings['service'], self)
+        if 'proxies' in settings:
+            self.proxies = dict(settings['proxies'])
+        if 'session_cache' in settings:
+            session_cache = settings['session_cache']
+            self.session_cache_path = (session_cache if isinstance(session_cache, str)
+                                       else SessionCache.default_path() if session_cache else None)
+        if 'agent' in settings:
+            self.use_agent = settings['agent']
+        if 'metrics' in settings:
+            metrics = settings['metrics']
+            self.metrics_enabled = metrics is not False
+            if isinstance(metrics, str):
+                self.metrics_path = metrics
+        if 'vault' in settings:
+            self.vault_path = settings['vault']
+        if 'concurrency' in settings:
+            self.fleet_concurrency = settings['concurrency']
+        if 'dns_cache' in settings:
+            dns_cache = settings['dns_cache']
+            self.dns_cache_enabled = dns_cache is not False
+            if isinstance(dns_cache, str):
+                self.dns_cache_path = dns_cache
+        if 'dns_ttl' in settings:
+            self.dns_ttl = settings['dns_ttl']
+        if 'dns_pins' in settings:
+            self.dns_pins = dict(settings['dns_pins'])
+    
     def _load_from_env(self):
-        """从环境变量加载配置"""
-        self.username = os.getenv('RUIJIE_USERNAME')
-        self.password = os.getenv('RUIJIE_PASSWORD')
+        """从环境变量加载配置（只覆盖设置了的环境变量对应的配置项）"""
+        self.username = os.getenv('RUIJIE_USERNAME') or self.username
+        self.password = os.getenv('RUIJIE_PASSWORD') or self.password
         
         # 代理配置
         http_proxy = os.getenv('RUIJIE_HTTP_PROXY') or os.getenv('HTTP_PROXY')
@@ -46,10 +132,71 @@ class Config:
                 self.proxies['https'] = https_proxy
         
         # 详细输出
-        self.verbose = os.getenv('RUIJIE_VERBOSE', '').lower() in ('1', 'true', 'yes')
+        if os.getenv('RUIJIE_VERBOSE'):
+            self.verbose = os.getenv('RUIJIE_VERBOSE').lower() in ('1', 'true', 'yes')
+        
+        # 工作流节点诊断
+        if os.getenv('RUIJIE_DEBUG_NODES'):
+            self.debug_nodes = os.getenv('RUIJIE_DEBUG_NODES').lower() in ('1', 'true', 'yes')
         
         # 服务名称
-        self.service = os.getenv('RUIJIE_SERVICE', '校园网')
+        self.service = os.getenv('RUIJIE_SERVICE') or self.service
+        
+        # 认证门户地址（可指向本地模拟门户）
+        self.portal_base = os.getenv('RUIJIE_PORTAL_BASE') or self.portal_base
+        
+        # 会话缓存
+        session_cache = os.getenv('RUIJIE_SESSION_CACHE', '')
+        if session_cache.lower() in ('0', 'false', 'no'):
+            self.session_cache_path = None
+        elif session_cache:
+            self.session_cache_path = session_cache
+        
+        # 常驻代理
+        if os.getenv('RUIJIE_AGENT'):
+            self.use_agent = os.getenv('RUIJIE_AGENT').lower() not in ('0', 'false', 'no')
+        self.agent_socket = os.getenv('RUIJIE_AGENT_SOCKET') or self.agent_socket
+        
+        # 指标状态文件与 node_exporter textfile
+        metrics = os.getenv('RUIJIE_METRICS', '')
+        if metrics.lower() in ('0', 'false', 'no'):
+            self.metrics_enabled = False
+        elif metrics.lower() in ('1', 'true', 'yes'):
+            self.metrics_enabled = True
+        elif metrics:
+            self.metrics_enabled = True
+            self.metrics_path = metrics
+        self.metrics_textfile = os.getenv('RUIJIE_METRICS_TEXTFILE') or self.metrics_textfile
+        
+        # 加密凭据库
+        self.vault_path = os.getenv('RUIJIE_VAULT') or self.vault_path
+        
+        # DNS缓存与固定地址（RUIJIE_DNS_PINS 形如 "auth1.ysu.edu.cn=10.0.0.1 cer.ysu.edu.cn=10.0.0.2,10.0.0.3"）
+        dns_cache = os.getenv('RUIJIE_DNS_CACHE', '')
+        if dns_cache.lower() in ('0', 'false', 'no'):
+            self.dns_cache_enabled = False
+        elif dns_cache.lower() in ('1', 'true', 'yes'):
+            self.dns_cache_enabled = True
+        elif dns_cache:
+            self.dns_cache_enabled = True
+            self.dns_cache_path = dns_cache
+        dns_pins = os.getenv('RUIJIE_DNS_PINS', '').replace(';', ' ').split()
+        if dns_pins:
+            from .dns_cache import parse_pins
+            try:
+                parse_pins(dns_pins)
+            except ValueError as e:
+                raise ConfigFileError(f"RUIJIE_DNS_PINS: {e}")
+            self.dns_pins.update(pin.split('=', 1) for pin in dns_pins)
+        
+        # 超时与重试（未设置时使用 retry.RetryPolicy 的默认值）
+        for attr, name, convert in (('connect_timeout', 'RUIJIE_CONNECT_TIMEOUT', float),
+                                    ('timeout', 'RUIJIE_TIMEOUT', float),
+                                    ('retries', 'RUIJIE_RETRIES', int),
+                                    ('dns_ttl', 'RUIJIE_DNS_TTL', float)):
+            value = _env_number(name, convert)
+            if value is not None:
+                setattr(self, attr, value)
     
     def update_from_args(self, args):
         """从命令行参数更新配置"""
@@ -61,6 +208,27 @@ class Config:
             self.verbose = args.verbose
         if hasattr(args, 'service') and args.service:
             self.service = args.service
+        if hasattr(args, 'debug_nodes') and args.debug_nodes:
+            self.debug_nodes = True
+        if hasattr(args, 'no_session_cache') and args.no_session_cache:
+            self.session_cache_path = None
+        if getattr(args, 'no_agent', False):
+            self.use_agent = False
+        if getattr(args, 'socket', None):
+            self.agent_socket = args.socket
+        if getattr(args, 'connect_timeout', None) is not None:
+            self.connect_timeout = args.connect_timeout
+        if getattr(args, 'timeout', None) is not None:
+            self.timeout = args.timeout
+        if getattr(args, 'retries', None) is not None:
+            self.retries = args.retries
+        if getattr(args, 'vault', None):
+            self.vault_path = args.vault
+        if getattr(args, 'no_dns_cache', False):
+            self.dns_cache_enabled = False
+        for pin in getattr(args, 'resolve', None) or []:
+            host, ips = pin.split('=', 1)
+            self.dns_pins[host] = ips
         
         # 代理配置
         if hasattr(args, 'proxy') and args.proxy:
@@ -70,8 +238,57 @@ class Config:
                 'https': proxy_url
             }
     
+    def get_vault(self):
+        """获取凭据库（CredentialVault对象，同一配置对象只创建一次）"""
+        if self._vault is None:
+            from .vault import CredentialVault
+            self._vault = CredentialVault(self.vault_path)
+        return self._vault
+    
+    def unlock_vault(self):
+        """
+        解锁凭据库（已解锁时直接返回），口令来自 RUIJIE_VAULT_PASSPHRASE 或终端输入
+        
+        Returns:
+            CredentialVault对象
+        """
+        from .vault import get_passphrase
+        vault = self.get_vault()
+        if not vault.unlocked:
+            vault.unlock(get_passphrase())
+        return vault
+    
+    def load_password_from_vault(self):
+        """
+        未提供密码时从凭据库读取：未指定用户名且凭据库中只有一个账户时使用该账户
+        
+        Returns:
+            bool: 是否从凭据库取得了密码
+        """
+        if self.password:
+            return False
+        vault = self.get_vault()
+        if not vault.exists():
+            return False
+        if not self.username:
+            usernames = vault.usernames()
+            if len(usernames) != 1:
+                return False
+            self.username = usernames[0]
+        if self.username not in vault:
+            return False
+        self.password = self.unlock_vault().get(self.username)
+        return bool(self.password)
+    
     def get_credentials_interactive(self):
-        """交互式获取用户凭据"""
+        """获取用户凭据：先查找凭据库，仍缺少时交互式输入"""
+        from .vault import VaultError
+        try:
+            self.load_password_from_vault()
+        except VaultError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        
         if not self.username:
             try:
                 self.username = input("Username: ").strip()
@@ -91,48 +308,177 @@ class Config:
         """验证凭据是否完整"""
         return bool(self.username and self.password)
     
+    def get_resolver(self):
+        """
+        获取门户主机的DNS缓存（DNSCache对象，同一配置对象只创建一次）
+        
+        Returns:
+            DNSCache对象，禁用了DNS缓存且没有固定地址时返回None
+        """
+        if self._resolver is None and (self.dns_cache_enabled or self.dns_pins):
+            from .dns_cache import DNSCache
+            self._resolver = DNSCache(
+                (self.dns_cache_path or None) if self.dns_cache_enabled else False,
+                ttl=self.dns_ttl or DNSCache.DEFAULT_TTL,
+                pins={host: ips.split(',') if isinstance(ips, str) else ips for host, ips in self.dns_pins.items()},
+            )
+        return self._resolver
+    
+    def client_fingerprint(self):
+        """
+        计算影响客户端行为的有效配置的指纹（不导入requests）
+        
+        常驻代理以启动时的配置创建客户端，命令行的有效配置（配置文件、环境变量、命令行参数）
+        与之不同时，请求不能交给代理执行。
+        
+        Returns:
+            str: 十六进制指纹
+        """
+        import hashlib
+        settings = {
+            'portal_base': self.portal_base,
+            'proxies': self.proxies,
+            'debug_nodes': self.debug_nodes,
+            'session_cache': self.session_cache_path,
+            'circuit_state': self.circuit_state_path,
+            'retry': [self.connect_timeout, self.timeout, self.retries],
+            'dns': [self.dns_cache_enabled, self.dns_cache_path, self.dns_ttl,
+                    {host: ips.split(',') if isinstance(ips, str) else list(ips)
+                     for host, ips in self.dns_pins.items()}],
+        }
+        data = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+    
+    def get_retry_config(self):
+        """获取请求超时与重试配置（RetryConfig对象）"""
+        from .retry import RetryConfig
+        return RetryConfig.from_settings(self.connect_timeout, self.timeout, self.retries)
+    
+    def get_circuit_breakers(self):
+        """获取按主机的熔断器（状态保存在缓存目录，多次运行之间共享）"""
+        from .circuit import CircuitBreakers
+        return CircuitBreakers(self.circuit_state_path or CircuitBreakers.default_path())
+    
+    def get_metrics_store(self):
+        """获取指标状态文件（MetricsStore对象）"""
+        from .metrics import MetricsStore
+        return MetricsStore(self.metrics_path)
+    
+    def flush_metrics(self):
+        """把本进程记录的指标累加到状态文件，设置了textfile时同时写出.prom文件"""
+        # 指标由客户端记录，未创建过客户端（如由常驻代理执行）时metrics模块未加载，无需写入
+        metrics = sys.modules.get(f'{__package__}.metrics')
+        if metrics is None or not self.metrics_enabled or metrics.REGISTRY.empty:
+            return
+        try:
+            total = self.get_metrics_store().flush(metrics.REGISTRY)
+            if self.metrics_textfile:
+                metrics.write_textfile(total, self.metrics_textfile)
+        except OSError as e:
+            if self.verbose:
+                print(f"[DEBUG] Failed to write metrics: {e}")
+    
     def get_client_config(self):
         """获取客户端配置"""
+        from .login_flow import create_checkpoint_store, default_checkpoint_path
+
         return {
             'proxies': self.proxies,
-            'verbose': self.verbose
+            'verbose': self.verbose,
+            'debug_nodes': self.debug_nodes,
+            'portal_base': self.portal_base,
+            'tracer': self.tracer,
+            'retry': self.get_retry_config(),
+            'circuits': self.get_circuit_breakers(),
+            'resolver': self.get_resolver(),
+            'session_cache': SessionCache(self.session_cache_path) if self.session_cache_path else None,
+            'checkpoint_store': (create_checkpoint_store(default_checkpoint_path(self.session_cache_path))
+                                 if self.session_cache_path else None),
         }
 
 
-def get_error_message(exception):
+def _env_number(name, convert):
+    """读取数值型环境变量，未设置或无法解析时返回None"""
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        return convert(value)
+    except ValueError:
+        print(f"Warning: Ignoring invalid {name}={value!r}")
+        return None
+
+
+def classify_error(exception):
     """
-    将异常转换为用户友好的错误消息
+    对异常分类（get_error_message 按该分类选择错误消息，指标按该分类统计失败原因）
     
     Args:
         exception: 异常对象
         
     Returns:
-        str: 用户友好的错误消息
+        str: circuit_open、network、authentication、server、portal、cas、captcha 或 other
     """
+    from .circuit import CircuitOpenError
+    
+    # 熔断器打开，请求未发出
+    if isinstance(exception, CircuitOpenError):
+        return 'circuit_open'
+    
     error_msg = str(exception).lower()
     
     # 网络相关错误
     if 'connection' in error_msg or 'timeout' in error_msg:
-        return "Network connection failed. Please check your internet connection."
+        return 'network'
     
     # 认证相关错误
     if 'authentication failed' in error_msg or 'cas' in error_msg:
-        return f"Authentication failed. Detail: {error_msg}"
+        return 'authentication'
     
     # API相关错误
     if 'api error' in error_msg:
-        return f"Server error: {exception}"
+        return 'server'
     
     # 门户重定向错误
     if 'portal redirection failed' in error_msg:
-        return "Portal access failed. You may not be connected to the campus network."
+        return 'portal'
     
     # CAS重定向错误
     if 'cas redirection failed' in error_msg:
-        return "CAS authentication failed. Please try again."
+        return 'cas'
     
     # 验证码相关错误
     if 'captcha' in error_msg or '验证码' in error_msg:
+        return 'captcha'
+    
+    return 'other'
+
+
+def get_error_message(exception):
+    """
+    将异常转换为用户友好的错误消息
+    
+    Args:
+        exception: 异常对象
+        
+    Returns:
+        str: 用户友好的错误消息
+    """
+    reason = classify_error(exception)
+    
+    if reason == 'circuit_open':
+        return f"Portal temporarily unavailable: {exception}"
+    if reason == 'network':
+        return "Network connection failed. Please check your internet connection."
+    if reason == 'authentication':
+        return f"Authentication failed. Detail: {str(exception).lower()}"
+    if reason == 'server':
+        return f"Server error: {exception}"
+    if reason == 'portal':
+        return "Portal access failed. You may not be connected to the campus network."
+    if reason == 'cas':
+        return "CAS authentication failed. Please try again."
+    if reason == 'captcha':
         return "Captcha verification failed. Please try again."
     
     # 默认错误消息
@@ -171,6 +517,27 @@ def print_status_info(user_info):
         print("Status information unavailable")
 
 
+def print_circuit_states(states, show_closed=False):
+    """
+    打印门户各主机的熔断器状态
+    
+    Args:
+        states: CircuitBreakers.states() 的返回值
+        show_closed: 是否也打印正常（关闭）的熔断器
+    """
+    from .circuit import CLOSED, OPEN
+    
+    for host, state, failures, retry_after in states:
+        if state == CLOSED:
+            if failures:
+                print(f"Portal {host}: degraded, {failures} consecutive failures")
+            elif show_closed:
+                print(f"Portal {host}: healthy")
+            continue
+        label = "circuit open" if state == OPEN else "circuit half-open (probing)"
+        print(f"Portal {host}: {label}, {failures} consecutive failures, next probe in {retry_after:.0f}s")
+
+
 def print_account_info(account_info):
     """
     打印账户信息
@@ -298,12 +665,13 @@ def resolve_service_name(service_input, config):
     return service_input
 
 
-def interactive_service_selection(services_data):
+def interactive_service_selection(services_data, config):
     """
     交互式服务选择
     
     Args:
         services_data: 服务数据
+        config: 配置对象（提供服务别名和默认服务）
         
     Returns:
         str: 选择的服务名称
@@ -340,9 +708,186 @@ def interactive_service_selection(services_data):
                     return service.get('name') or service.get('serviceName') or service.get('service') or str(service)
         
         # 使用resolve_service_name处理其他输入
-        config = Config()  # 临时配置对象
         return resolve_service_name(choice, config)
         
     except (KeyboardInterrupt, EOFError):
-        print("\nSelection cancelled, using default service: 校园网")
-        return "校园网"
+        print(f"\nSelection cancelled, using default service: {config.service}")
+        return config.service
+
+
+def _display_width(text):
+    """计算字符串在终端中的显示宽度（中文字符占两列）"""
+    return sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in text)
+
+
+def _pad(text, width):
+    """按显示宽度左对齐填充字符串"""
+    return text + " " * max(0, width - _display_width(text))
+
+
+def print_fleet_summary(results, wall_time=None):
+    """
+    打印批量登录结果汇总表
+    
+    Args:
+        results: FleetResult列表
+        wall_time: 总耗时（秒）
+    """
+    if not results:
+        print("No accounts to process")
+        return
+    
+    name_width = max(_display_width("Account"), max(_display_width(r.account.name) for r in results))
+    service_width = max(_display_width("Service"), max(_display_width(r.account.service) for r in results))
+    
+    print(f"{_pad('Account', name_width)}  {_pad('Service', service_width)}  {'Latency':>9}  Result")
+    for r in results:
+        outcome = "OK" if r.success else f"FAILED: {get_error_message(r.error) if r.error else 'Login failed'}"
+        print(f"{_pad(r.account.name, name_width)}  {_pad(r.account.service, service_width)}  {r.elapsed:>8.2f}s  {outcome}")
+    
+    succeeded = sum(1 for r in results if r.success)
+    summary = f"\n{succeeded}/{len(results)} accounts logged in"
+    if wall_time is not None:
+        summary += f" in {wall_time:.2f}s (sum of latencies {sum(r.elapsed for r in results):.2f}s)"
+    print(summary)
+
+
+def print_batch_status(results, wall_time=None):
+    """
+    打印批量状态查询结果表
+
+    Args:
+        results: StatusResult列表
+        wall_time: 总耗时（秒）
+    """
+    if not results:
+        print("No hosts to probe")
+        return
+
+    rows = []
+    for r in results:
+        info = r.to_dict()
+        if r.error:
+            state = f"ERROR: {info['error']}"
+        elif r.logged_in:
+            state = "Online"
+        else:
+            state = "Offline"
+        rows.append((r.target.name, state, info['username'] or "", info['service'] or "", info['ip'] or "", r.elapsed))
+
+    host_width = max(_display_width("Host"), max(_display_width(row[0]) for row in rows))
+    user_width = max(_display_width("User"), max(_display_width(row[2]) for row in rows))
+    service_width = max(_display_width("Service"), max(_display_width(row[3]) for row in rows))
+    ip_width = max(_display_width("IP"), max(_display_width(row[4]) for row in rows))
+
+    print(f"{_pad('Host', host_width)}  {_pad('User', user_width)}  {_pad('Service', service_width)}  "
+          f"{_pad('IP', ip_width)}  {'Latency':>9}  Status")
+    for name, state, username, service, ip, elapsed in rows:
+        print(f"{_pad(name, host_width)}  {_pad(username, user_width)}  {_pad(service, service_width)}  "
+              f"{_pad(ip, ip_width)}  {elapsed:>8.2f}s  {state}")
+
+    online = sum(1 for r in results if r.logged_in)
+    errors = sum(1 for r in results if r.error)
+    summary = f"\n{online}/{len(results)} hosts online"
+    if errors:
+        summary += f", {errors} unreachable"
+    if wall_time is not None:
+        serial = sum(r.elapsed for r in results)
+        summary += f" in {wall_time:.2f}s (serial {serial:.2f}s"
+        if wall_time > 0:
+            summary += f", {serial / wall_time:.1f}x"
+        summary += ")"
+    print(summary)
+
+
+def print_vault_accounts(usernames, path):
+    """
+    打印凭据库中的账户
+
+    Args:
+        usernames: 用户名列表
+        path: 凭据库文件路径
+    """
+    if not usernames:
+        print(f"No accounts in {path}")
+        return
+    for username in usernames:
+        print(username)
+    print(f"\n{len(usernames)} account(s) in {path}")
+
+
+# --output 支持的格式
+OUTPUT_FORMATS = ('text', 'json', 'ndjson')
+
+
+class CommandOutput:
+    """
+    命令结果的机器可读输出
+
+    text 模式下不输出任何内容（由各 print_* 函数输出文本）；json 模式把命令结果输出为一个
+    格式化的JSON文档，ndjson 模式每条记录输出一行。批量登录的每个账户、守护进程的每个事件
+    作为单独的记录逐行输出。
+    """
+
+    def __init__(self, fmt='text', tracer=None):
+        """
+        Args:
+            fmt: 输出格式，见 OUTPUT_FORMATS
+            tracer: Tracer对象，用于在结果中附带各步骤耗时
+        """
+        self.format = fmt or 'text'
+        self.tracer = tracer
+        # 由常驻代理执行时，代理返回的步骤耗时
+        self.timings = None
+        self.start = time.perf_counter()
+
+    @property
+    def structured(self):
+        """是否输出机器可读格式"""
+        return self.format != 'text'
+
+    def step_timings(self):
+        """获取各步骤的请求数与耗时"""
+        if self.timings is not None:
+            return self.timings
+        if self.tracer is not None:
+            return self.tracer.step_totals()
+        return {}
+
+    def record(self, record):
+        """输出一行记录（流式输出，json与ndjson模式相同）"""
+        print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+    def result(self, command, result=None, error=None):
+        """
+        输出命令的最终结果
+
+        Args:
+            command: 命令名称
+            result: 结果数据
+            error: 失败时的异常对象或错误消息
+        """
+        document = {'command': command, 'ok': error is None}
+        if error is None:
+            document['result'] = result
+        else:
+            document['error'] = get_error_message(error) if isinstance(error, Exception) else str(error)
+            if isinstance(error, Exception):
+                document['error_type'] = type(error).__name__
+            if result is not None:
+                document['result'] = result
+        document['timings'] = self.step_timings()
+        document['elapsed_ms'] = round((time.perf_counter() - self.start) * 1000, 3)
+
+        if self.format == 'json':
+            print(json.dumps(document, ensure_ascii=False, indent=2, default=str))
+        else:
+            self.record(document)
+
+
+def circuit_states_to_dicts(states):
+    """将 CircuitBreakers.states() 的结果转换为字典列表"""
+    return [
+        {'host': host, 'state': state, 'failures': failures, 'retry_after': round(retry_after, 3)}
+        for host, state, failures, retry_after in states
+    ]
@@ -0,0 +1,391 @@
+"""
+分层配置文件
+
+按以下顺序合并 TOML 配置文件，后面的覆盖前面的；环境变量和命令行参数再覆盖合并结果：
+1. 系统：/etc/ysunetlogin/config.toml
+2. 用户：$XDG_CONFIG_HOME/ysunetlogin/config.toml
+3. 项目：当前目录或最近的上级目录中的 ysunetlogin.toml（向上查找到用户主目录或仓库根目录为止，
+   只使用属于当前用户、其他用户不可写的文件——否则可写 /tmp 等公共目录的用户可以把 portal_base
+   指向自己的主机以获取密码）
+4. RUIJIE_CONFIG 或 --config 指定的文件
+
+示例::
+
+    service = "campus"
+    proxy = "socks5://127.0.0.1:1080"     # 或 [proxies] http/https
+    timeout = 8
+    retries = 3
+
+    [services]                             # 额外的服务别名
+    lab = "校园网"
+
+    [dns_pins]                             # 固定门户主机的地址，不做DNS查询
+    "auth1.ysu.edu.cn" = ["10.0.0.1", "10.0.0.2"]
+
+    [[accounts]]                           # fleet login 未指定账户文件时使用
+    username = "1145141919810"
+
+合并并校验后的结果保存为快照（$XDG_CACHE_HOME/ysunetlogin/config-snapshot.json），
+以各文件的路径、mtime 与大小为键；文件未变化时直接读取快照，不再导入 TOML 解析器、逐个解析和校验。
+含有密码的配置不写入快照。
+"""
+
+import os
+import json
+import stat
+
+
+SNAPSHOT_VERSION = 1
+
+SYSTEM_CONFIG = '/etc/ysunetlogin/config.toml'
+PROJECT_CONFIG_NAME = 'ysunetlogin.toml'
+
+_NUMBER = (int, float)
+
+# 配置项 -> 允许的类型
+SCHEMA = {
+    'username': str,
+    'password': str,
+    'service': str,
+    'portal_base': str,
+    'verbose': bool,
+    'debug_nodes': bool,
+    'proxy': str,
+    'proxies': dict,
+    'timeout': _NUMBER,
+    'connect_timeout': _NUMBER,
+    'retries': int,
+    'session_cache': (str, bool),
+    'agent': bool,
+    'agent_socket': str,
+    'metrics': (str, bool),
+    'metrics_textfile': str,
+    'vault': str,
+    'concurrency': int,
+    'services': dict,
+    'accounts': list,
+    'dns_cache': (str, bool),
+    'dns_ttl': _NUMBER,
+    'dns_pins': dict,
+}
+
+# [[accounts]] 表中每个账户的配置项（配置文件与 fleet login 的账户文件共用）；TOML 中未加引号的学号为整数
+ACCOUNT_SCHEMA = {
+    'username': (str, int),
+    'password': str,
+    'service': str,
+    'proxy': str,
+    'name': str,
+}
+
+# fleet login 账户文件的配置项（见 fleet.load_accounts）
+ACCOUNTS_FILE_SCHEMA = {
+    'concurrency': int,
+    'service': str,
+    'accounts': list,
+}
+
+# 路径类配置项，展开 ~
+PATH_KEYS = ('session_cache', 'agent_socket', 'metrics', 'metrics_textfile', 'vault', 'dns_cache')
+
+
+class ConfigFileError(ValueError):
+    """配置文件无法解析或包含无效的值"""
+
+
+def user_config_path():
+    """用户配置文件路径"""
+    config_home = os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(config_home, 'ysunetlogin', 'config.toml')
+
+
+def _trusted(st):
+    """文件属于当前用户且其他用户不可写"""
+    getuid = getattr(os, 'getuid', None)  # Windows 上没有
+    return getuid is None or (st.st_uid == getuid() and not st.st_mode & stat.S_IWOTH)
+
+
+def find_project_config(start=None, warnings=None):
+    """
+    从 start（默认当前目录）向上查找最近的 ysunetlogin.toml
+
+    查找到用户主目录或仓库根目录（含 .git 的目录）为止；不受信任的文件被跳过。
+
+    Args:
+        start: 开始查找的目录
+        warnings: 收集警告消息的列表，为None时不收集
+
+    Returns:
+        str: 文件路径，没有时返回None
+    """
+    directory = os.path.abspath(start or os.getcwd())
+    home = os.path.abspath(os.path.expanduser('~'))
+    while True:
+        path = os.path.join(directory, PROJECT_CONFIG_NAME)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is not None and stat.S_ISREG(st.st_mode):
+            if _trusted(st):
+                return path
+            if warnings is not None:
+                warnings.append(f"Ignoring {path}: not owned by the current user or writable by others")
+        if directory == home or os.path.exists(os.path.join(directory, '.git')):
+            return None
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def default_snapshot_path():
+    """配置快照文件路径"""
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'ysunetlogin', 'config-snapshot.json')
+
+
+def config_layers(explicit=None, warnings=None):
+    """
+    获取存在的配置文件及其状态，按合并顺序排列
+
+    Args:
+        explicit: 额外指定的配置文件（必须存在）
+        warnings: 收集警告消息的列表，为None时不收集
+
+    Returns:
+        list: [路径, st_mtime_ns, st_size] 列表，同时作为快照的键
+    """
+    candidates = [SYSTEM_CONFIG, user_config_path(), find_project_config(warnings=warnings)]
+    layers = []
+    seen = set()
+    for path in candidates:
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if path not in seen:
+            seen.add(path)
+            layers.append([path, st.st_mtime_ns, st.st_size])
+
+    if explicit:
+        path = os.path.abspath(explicit)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise ConfigFileError(f"Cannot read config file {explicit}: {e.strerror}")
+        if path in seen:
+            layers = [layer for layer in layers if layer[0] != path]
+        layers.append([path, st.st_mtime_ns, st.st_size])
+    return layers
+
+
+def _type_name(expected):
+    types = expected if isinstance(expected, tuple) else (expected,)
+    names = {int: 'an integer', float: 'a number', str: 'a string', bool: 'true/false', dict: 'a table',
+             list: 'an array of tables'}
+    return ' or '.join(dict.fromkeys(names[t] for t in types))
+
+
+def _check_type(value, expected):
+    types = expected if isinstance(expected, tuple) else (expected,)
+    # TOML 的 true/false 不能当作数字
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def validate(data, path, warnings=None, schema=SCHEMA):
+    """
+    校验一个配置文件的内容
+
+    Args:
+        data: 解析得到的字典
+        path: 文件路径（用于错误消息）
+        warnings: 收集警告消息的列表，为None时不收集
+        schema: 配置项到允许类型的字典，默认为配置文件的 SCHEMA
+
+    Returns:
+        dict: 只包含已知配置项的字典，proxy 已展开为 proxies，路径中的 ~ 已展开
+
+    Raises:
+        ConfigFileError: 值的类型不正确
+    """
+    settings = {}
+    for key, value in data.items():
+        expected = schema.get(key)
+        if expected is None:
+            if warnings is not None:
+                warnings.append(f"Ignoring unknown option '{key}' in {path}")
+            continue
+        if not _check_type(value, expected):
+            raise ConfigFileError(f"{path}: '{key}' must be {_type_name(expected)}")
+        settings[key] = value
+
+    for key in PATH_KEYS:
+        if isinstance(settings.get(key), str):
+            settings[key] = os.path.expanduser(settings[key])
+
+    proxy = settings.pop('proxy', None)
+    if proxy:
+        settings['proxies'] = dict({'http': proxy, 'https': proxy}, **settings.get('proxies', {}))
+    for table in ('proxies', 'services'):
+        for name, value in settings.get(table, {}).items():
+            if not isinstance(value, str):
+                raise ConfigFileError(f"{path}: '{table}.{name}' must be a string")
+    for key in ('timeout', 'connect_timeout', 'dns_ttl'):
+        if key in settings and settings[key] <= 0:
+            raise ConfigFileError(f"{path}: '{key}' must be positive")
+    if settings.get('retries', 0) < 0:
+        raise ConfigFileError(f"{path}: 'retries' must not be negative")
+    if settings.get('concurrency', 1) < 1:
+        raise ConfigFileError(f"{path}: 'concurrency' must be at least 1")
+
+    if settings.get('dns_pins'):
+        from .dns_cache import parse_pins
+        pins = settings['dns_pins']
+        for host, ips in pins.items():
+            if isinstance(ips, str):
+                pins[host] = ips = [ips]
+            if not isinstance(ips, list) or not all(isinstance(ip, str) for ip in ips):
+                raise ConfigFileError(f"{path}: 'dns_pins.{host}' must be an IP address or an array of them")
+        try:
+            parse_pins(pins)
+        except ValueError as e:
+            raise ConfigFileError(f"{path}: {e}")
+
+    for index, entry in enumerate(settings.get('accounts', []), 1):
+        if not isinstance(entry, dict) or not entry.get('username'):
+            raise ConfigFileError(f"{path}: account #{index} has no username")
+        unknown = set(entry) - set(ACCOUNT_SCHEMA)
+        if unknown:
+            raise ConfigFileError(f"{path}: account #{index} has unknown keys: {', '.join(sorted(unknown))}")
+        for key, value in entry.items():
+            expected = ACCOUNT_SCHEMA[key]
+            if not _check_type(value, expected):
+                raise ConfigFileError(f"{path}: account #{index} '{key}' must be {_type_name(expected)}")
+        entry['username'] = str(entry['username'])
+    return settings
+
+
+def merge(layers):
+    """
+    合并各层配置：proxies 与 services 按键合并，其他配置项（包括 accounts）整体覆盖
+
+    Args:
+        layers: validate() 结果的列表，按优先级从低到高
+
+    Returns:
+        dict: 合并后的配置
+    """
+    merged = {}
+    for settings in layers:
+        for key, value in settings.items():
+            if key in ('proxies', 'services'):
+                merged[key] = dict(merged.get(key, {}), **value)
+            else:
+                merged[key] = value
+    return merged
+
+
+def parse_file(path, warnings=None, schema=SCHEMA):
+    """解析并校验一个配置文件（schema 见 validate）"""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+
+    try:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    except OSError as e:
+        raise ConfigFileError(f"Cannot read config file {path}: {e.strerror}")
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigFileError(f"Invalid TOML in {path}: {e}")
+    return validate(data, path, warnings, schema)
+
+
+def _has_secrets(settings):
+    return 'password' in settings or any(entry.get('password') for entry in settings.get('accounts', []))
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+
+def _write_snapshot(path, key, settings, warnings):
+    directory = os.path.dirname(path)
+    try:
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'key': key, 'settings': settings, 'warnings': warnings}, f,
+                      ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # 快照只是缓存，写入失败时下次重新解析
+        pass
+
+
+class ConfigSnapshot:
+    """合并后的配置及其来源"""
+
+    def __init__(self, settings, files, cached, warnings=None):
+        """
+        Args:
+            settings: 合并后的配置字典
+            files: 参与合并的文件路径列表
+            cached: 是否直接读取了快照
+            warnings: 校验时的警告消息（与配置一起保存在快照中）
+        """
+        self.settings = settings
+        self.files = files
+        self.cached = cached
+        self.warnings = warnings or []
+
+
+def load(explicit=None, snapshot_path=None):
+    """
+    加载并合并配置文件，文件未变化时使用快照
+
+    Args:
+        explicit: RUIJIE_CONFIG 或 --config 指定的文件
+        snapshot_path: 快照文件路径，为None时使用默认路径，为False时不使用快照
+
+    Returns:
+        ConfigSnapshot对象
+
+    Raises:
+        ConfigFileError: 配置文件无法读取、解析或校验失败
+    """
+    layer_warnings = []
+    layers = config_layers(explicit, layer_warnings)
+    files = [layer[0] for layer in layers]
+    if not layers:
+        return ConfigSnapshot({}, files, cached=False, warnings=layer_warnings)
+
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path()
+    if snapshot_path:
+        snapshot = _read_snapshot(snapshot_path)
+        if snapshot is not None and snapshot.get('key') == layers:
+            return ConfigSnapshot(snapshot['settings'], files, cached=True,
+                                  warnings=layer_warnings + (snapshot.get('warnings') or []))
+
+    warnings = []
+    settings = merge([parse_file(path, warnings) for path in files])
+    if snapshot_path and not _has_secrets(settings):
+        _write_snapshot(snapshot_path, layers, settings, warnings)
+    return ConfigSnapshot(settings, files, cached=False, warnings=layer_warnings + warnings)
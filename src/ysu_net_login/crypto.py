@@ -0,0 +1,122 @@
+"""
+登录使用的加密
+
+- cas-sso（RuijieClient）：以页面下发的 croypto 为密钥的 AES-ECB-PKCS7，密码和验证码载荷
+  使用同一个密钥，按密钥缓存密码对象，两段明文在一次 encrypt 调用中加密
+- CAS（YSULogin）：以页面下发的 salt 为密钥的 AES-CBC-PKCS7，明文前加64个随机字符，IV为16个随机字符，
+  与统一身份认证页面的 JS 逻辑一致；随机字符一次从 secrets 取得
+
+pycryptodome 仅在第一次加密时导入，不影响 status 等命令的启动。
+"""
+
+import base64
+import secrets
+from functools import lru_cache
+
+
+# 统一身份认证页面 JS 使用的随机字符集（去掉了易混淆的字符）
+RANDOM_CHARS = "ABCDEFGHJKMNPQRSTWXYZabcdefhijkmnprstwxyz2345678"
+
+# 随机字节到字符集的映射：只使用 [0, 240) 的字节（240 为48的倍数），其余字节丢弃以保证均匀分布
+_RANDOM_LIMIT = 256 - 256 % len(RANDOM_CHARS)
+_RANDOM_TABLE = bytes(ord(RANDOM_CHARS[b % len(RANDOM_CHARS)]) if b < _RANDOM_LIMIT else 0 for b in range(256))
+_RANDOM_REJECT = bytes(range(_RANDOM_LIMIT, 256))
+
+BLOCK_SIZE = 16
+
+
+def random_string(length):
+    """
+    生成由 RANDOM_CHARS 组成的随机字符串（密码学安全的随机源）
+
+    Args:
+        length: 字符数
+
+    Returns:
+        str: 随机字符串
+    """
+    result = b''
+    while len(result) < length:
+        # 约6%的字节被丢弃，多取一些以便通常一次即可
+        chunk = secrets.token_bytes(length - len(result) + 8)
+        result += chunk.translate(_RANDOM_TABLE, _RANDOM_REJECT)
+    return result[:length].decode('ascii')
+
+
+def _pad(data):
+    """PKCS7填充"""
+    padding = BLOCK_SIZE - len(data) % BLOCK_SIZE
+    return data + bytes((padding,)) * padding
+
+
+@lru_cache(maxsize=64)
+def _ecb_cipher(key_b64):
+    """
+    按Base64编码的密钥缓存的AES-ECB密码对象
+
+    ECB模式没有链式状态，同一个对象可以重复（及在多个线程中）使用。
+    """
+    from Crypto.Cipher import AES
+
+    return AES.new(base64.b64decode(key_b64), AES.MODE_ECB)
+
+
+def aes_ecb_encrypt_many(key_b64, *plaintexts):
+    """
+    AES-ECB-PKCS7加密多段明文
+
+    ECB各分组独立加密，把各段填充后的数据拼接起来一次加密，结果与逐段加密相同。
+
+    Args:
+        key_b64: Base64编码的AES密钥（cas-sso页面的croypto）
+        *plaintexts: 明文字符串
+
+    Returns:
+        list: 每段明文的Base64编码密文
+    """
+    padded = [_pad(text.encode('utf-8')) for text in plaintexts]
+    encrypted = _ecb_cipher(key_b64).encrypt(b''.join(padded))
+
+    results = []
+    offset = 0
+    for block in padded:
+        results.append(base64.b64encode(encrypted[offset:offset + len(block)]).decode('ascii'))
+        offset += len(block)
+    return results
+
+
+def aes_ecb_encrypt(key_b64, plaintext):
+    """
+    AES-ECB-PKCS7加密
+
+    Args:
+        key_b64: Base64编码的AES密钥
+        plaintext: 明文字符串
+
+    Returns:
+        str: Base64编码的密文
+    """
+    return aes_ecb_encrypt_many(key_b64, plaintext)[0]
+
+
+def encrypt_cas_password(password, salt):
+    """
+    按统一身份认证页面的方式加密密码：AES-CBC-PKCS7(64个随机字符 + 密码)，IV为16个随机字符
+
+    CBC密码对象带有链式状态，且每次IV不同，不能缓存复用。
+
+    Args:
+        password: 密码
+        salt: 登录页面下发的 pwdEncryptSalt（用作AES密钥）
+
+    Returns:
+        str: Base64编码的密文
+    """
+    from Crypto.Cipher import AES
+
+    # 前缀和IV一次生成
+    randomness = random_string(64 + BLOCK_SIZE)
+    prefix, iv = randomness[:64], randomness[64:].encode('ascii')
+    cipher = AES.new(salt.strip().encode('utf-8'), AES.MODE_CBC, iv)
+    encrypted = cipher.encrypt(_pad((prefix + password).encode('utf-8')))
+    return base64.b64encode(encrypted).decode('ascii')
@@ -0,0 +1,141 @@
+import time
+import threading
+
+from .config import get_error_message
+
+
+class KeepAliveDaemon:
+    """
+    保活守护进程
+
+    持有一个常驻的 RuijieClient，按自适应间隔轮询在线状态：
+    状态稳定时逐步放宽轮询间隔，掉线或出错后收紧到最小间隔，
+    检测到掉线时立即重新登录。
+    """
+
+    def __init__(self, client, username, password, service="校园网",
+                 min_interval=5.0, max_interval=300.0, backoff_factor=2.0,
+                 login_retry_max=60.0, output=None, flush_metrics=None):
+        """
+        初始化守护进程
+
+        Args:
+            client: RuijieClient对象
+            username: 用户名
+            password: 密码
+            service: 要登录的服务名称
+            min_interval: 最小轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+            backoff_factor: 状态稳定时轮询间隔的增长倍数
+            login_retry_max: 连续登录失败时重试间隔的上限（秒）
+            output: CommandOutput对象，输出机器可读格式时每个事件输出一行JSON
+            flush_metrics: 每次检查后调用的函数，用于写出本周期记录的指标
+        """
+        self.client = client
+        self.username = username
+        self.password = password
+        self.service = service
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff_factor = backoff_factor
+        self.login_retry_max = max(login_retry_max, min_interval)
+        self.output = output
+        self.flush_metrics = flush_metrics
+
+        self.interval = min_interval
+        self.consecutive_failures = 0
+        self.last_online = None
+        self._stop_event = threading.Event()
+
+    def _log(self, message):
+        """输出带时间戳的日志"""
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+    def _event(self, event, message, **fields):
+        """
+        输出事件：文本模式下为日志行，机器可读模式下为一行JSON
+
+        Args:
+            event: 事件类型
+            message: 日志消息
+            **fields: 附加字段
+        """
+        if self.output is not None and self.output.structured:
+            self.output.record(dict({'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'event': event},
+                                    message=message, **fields))
+        else:
+            self._log(message)
+
+    def _relax(self):
+        """状态稳定，放宽轮询间隔"""
+        self.consecutive_failures = 0
+        self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+    def _tighten(self):
+        """出现异常，收紧轮询间隔；连续登录失败时按指数退避，避免频繁重试"""
+        self.consecutive_failures += 1
+        backoff = self.min_interval * (self.backoff_factor ** (self.consecutive_failures - 1))
+        self.interval = min(backoff, self.login_retry_max)
+
+    def check_once(self):
+        """
+        执行一次状态检查，掉线时立即重新登录
+
+        Returns:
+            bool: 本次检查结束时是否在线
+        """
+        is_logged_in, info = self.client.check_login_status()
+
+        if is_logged_in:
+            if self.last_online is not True:
+                self._event('online', "Online")
+            self.last_online = True
+            self._relax()
+            return True
+
+        if info is None:
+            # 无法获取状态（门户不可达等），不盲目登录
+            self._event('probe_failed', "Status probe failed, portal unreachable")
+            self.last_online = None
+            self._tighten()
+            return False
+
+        self._event('offline', "Offline detected, logging in...")
+        self.last_online = False
+        try:
+            start = time.perf_counter()
+            self.client.login(self.username, self.password, self.service)
+            elapsed = time.perf_counter() - start
+            self._event('login_ok', f"Login successful to service: {self.service} ({elapsed:.2f}s)",
+                        service=self.service, elapsed=round(elapsed, 3))
+            self.last_online = True
+            self.consecutive_failures = 0
+            self.interval = self.min_interval
+            return True
+        except Exception as e:
+            self._event('login_failed', f"Login failed: {get_error_message(e)}",
+                        error=get_error_message(e), error_type=type(e).__name__)
+            self._tighten()
+            return False
+
+    def run(self):
+        """运行守护循环，直到调用stop()"""
+        self._event('started', f"Keep-alive daemon started (interval {self.min_interval:g}-{self.max_interval:g}s)",
+                    min_interval=self.min_interval, max_interval=self.max_interval)
+        while not self._stop_event.is_set():
+            try:
+                self.check_once()
+            except Exception as e:
+                self._event('error', f"Unexpected error: {e}", error=str(e))
+                self._tighten()
+            if self.flush_metrics:
+                self.flush_metrics()
+
+            if self.client.verbose:
+                self.client._log(f"Next check in {self.interval:.1f}s")
+            self._stop_event.wait(self.interval)
+        self._event('stopped', "Keep-alive daemon stopped")
+
+    def stop(self):
+        """停止守护循环"""
+        self._stop_event.set()
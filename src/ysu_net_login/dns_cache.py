@@ -0,0 +1,256 @@
+"""
+门户主机的DNS缓存与固定地址
+
+认证前的DNS解析有时很慢，或被认证门户本身劫持。DNSCache 在传输层（transport）中代替直接调用
+getaddrinfo：
+- 固定地址（pins）：主机 -> IP列表，直接使用，不做DNS查询（类似 curl --resolve）
+- 持久缓存：解析结果连同过期时间保存到缓存目录，多次运行之间共享；有效期内不再查询
+- 过期的条目仍保留：重新解析失败，或在 stale_timeout 内没有完成时使用过期的地址，
+  后台的解析完成后更新缓存
+
+系统的 getaddrinfo 不返回记录的TTL，有效期使用统一的 ttl。
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+
+def parse_pins(entries):
+    """
+    解析固定地址
+
+    Args:
+        entries: 字典 {主机: IP或IP列表}，或 "HOST=IP[,IP...]" 字符串的列表
+
+    Returns:
+        dict: 小写主机名 -> [(地址族, IP), ...]
+
+    Raises:
+        ValueError: 格式错误或IP地址无效
+    """
+    if isinstance(entries, dict):
+        items = entries.items()
+    else:
+        items = []
+        for entry in entries:
+            host, sep, ips = entry.partition('=')
+            if not sep:
+                raise ValueError(f"Invalid DNS pin '{entry}', expected HOST=IP[,IP...]")
+            items.append((host, ips.split(',')))
+
+    pins = {}
+    for host, ips in items:
+        host = host.strip().lower()
+        if isinstance(ips, str):
+            ips = [ips]
+        addresses = []
+        for ip in ips:
+            ip = ip.strip().strip('[]')
+            if ip:
+                addresses.append((_address_family(ip), ip))
+        if not host or not addresses:
+            raise ValueError(f"Invalid DNS pin for '{host}': no addresses")
+        pins[host] = addresses
+    return pins
+
+
+def _address_family(ip):
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, ip)
+            return family
+        except OSError:
+            pass
+    raise ValueError(f"Invalid IP address '{ip}'")
+
+
+def _is_ip_literal(host):
+    try:
+        _address_family(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _to_addrinfo(addresses, port, family):
+    """把 [(地址族, IP)] 转换为 getaddrinfo 格式的列表，按 family 过滤"""
+    result = []
+    for af, ip in addresses:
+        if family not in (socket.AF_UNSPEC, af):
+            continue
+        sa = (ip, port) if af == socket.AF_INET else (ip, port, 0, 0)
+        result.append((af, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', sa))
+    return result
+
+
+class DNSCache:
+    """
+    持久化的DNS缓存，支持按主机固定地址
+
+    可被多个线程、客户端对象共享。
+    """
+
+    # 默认有效期（秒）
+    DEFAULT_TTL = 10 * 60
+    # 过期条目最长保留时间（秒），超过后不再用于解析失败时的回退
+    MAX_STALE = 7 * 24 * 60 * 60
+    # 存在过期条目时，等待重新解析的最长时间（秒）
+    DEFAULT_STALE_TIMEOUT = 1.0
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, pins=None, stale_timeout=DEFAULT_STALE_TIMEOUT):
+        """
+        Args:
+            path: 缓存文件路径，为None时使用默认路径，为False时只缓存在内存中
+            ttl: 解析结果的有效期（秒）
+            pins: 固定地址，格式见 parse_pins()
+            stale_timeout: 存在过期条目时等待重新解析的秒数，超时后先使用过期的地址
+        """
+        self.path = self.default_path() if path is None else path
+        self.ttl = ttl
+        self.pins = parse_pins(pins) if pins else {}
+        self.stale_timeout = stale_timeout
+        # 主机 -> {'addresses': [[地址族, IP], ...], 'expires_at': 时间戳}
+        self._entries = None
+        self._refreshing = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_path():
+        """获取默认缓存文件路径"""
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache_home, 'ysunetlogin', 'dns.json')
+
+    def _load(self):
+        """首次使用时读取缓存文件（调用方持有锁）"""
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if not self.path:
+            return self._entries
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self._entries
+
+        now = time.time()
+        for host, entry in (data.get('hosts') or {}).items() if isinstance(data, dict) else ():
+            try:
+                if entry['expires_at'] + self.MAX_STALE > now and entry['addresses']:
+                    self._entries[host] = {
+                        'addresses': [(int(af), str(ip)) for af, ip in entry['addresses']],
+                        'expires_at': float(entry['expires_at']),
+                    }
+            except (KeyError, TypeError, ValueError):
+                continue
+        return self._entries
+
+    def _save(self):
+        """写入缓存文件（调用方持有锁），写入失败时只保留在内存中"""
+        if not self.path:
+            return
+        data = {'hosts': {host: {'addresses': entry['addresses'], 'expires_at': entry['expires_at']}
+                          for host, entry in self._entries.items()}}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _lookup(self, host, port):
+        """查询DNS并更新缓存，返回 [(地址族, IP), ...]"""
+        infos = socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        addresses = []
+        for af, _, _, _, sa in infos:
+            if af in (socket.AF_INET, socket.AF_INET6) and (af, sa[0]) not in addresses:
+                addresses.append((af, sa[0]))
+        if addresses:
+            with self._lock:
+                self._load()[host] = {'addresses': addresses, 'expires_at': time.time() + self.ttl}
+                self._save()
+        return addresses
+
+    def _refresh(self, host, port):
+        """
+        在后台线程中重新解析（同一主机只有一个），返回线程结束时设置的事件和结果
+        """
+        with self._lock:
+            pending = self._refreshing.get(host)
+            if pending is not None:
+                return pending
+            pending = {'done': threading.Event(), 'addresses': None, 'error': None}
+            self._refreshing[host] = pending
+
+        def run():
+            try:
+                pending['addresses'] = self._lookup(host, port)
+            except OSError as e:
+                pending['error'] = e
+            finally:
+                with self._lock:
+                    self._refreshing.pop(host, None)
+                pending['done'].set()
+
+        threading.Thread(target=run, name=f'dns-refresh-{host}', daemon=True).start()
+        return pending
+
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        """
+        解析主机地址
+
+        Args:
+            host: 主机名
+            port: 端口
+            family: 允许的地址族（socket.AF_UNSPEC 或 socket.AF_INET）
+
+        Returns:
+            tuple: (getaddrinfo 格式的地址列表, 来源)，来源为 'pin'、'cache'、'dns'、'stale' 或 'literal'
+
+        Raises:
+            socket.gaierror: 解析失败且没有可用的缓存地址
+        """
+        key = host.lower()
+        pinned = self.pins.get(key)
+        if pinned:
+            return _to_addrinfo(pinned, port, family), 'pin'
+        if _is_ip_literal(host):
+            return socket.getaddrinfo(host, port, family, socket.SOCK_STREAM), 'literal'
+
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is not None and entry['expires_at'] > time.time():
+            return _to_addrinfo(entry['addresses'], port, family), 'cache'
+
+        if entry is None:
+            addresses, source = self._lookup(key, port), 'dns'
+        else:
+            # 有过期的地址：重新解析太慢或失败时先使用它
+            pending = self._refresh(key, port)
+            if pending['done'].wait(self.stale_timeout) and pending['addresses']:
+                addresses, source = pending['addresses'], 'dns'
+            else:
+                addresses, source = entry['addresses'], 'stale'
+
+        result = _to_addrinfo(addresses, port, family)
+        if not result:
+            raise socket.gaierror(socket.EAI_NONAME, f"No usable address for {host}")
+        return result, source
+
+    def clear(self):
+        """清空缓存的解析结果（固定地址不受影响）"""
+        with self._lock:
+            self._entries = {}
+            if self.path:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
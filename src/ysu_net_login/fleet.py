@@ -0,0 +1,334 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .config import get_error_message
+from .config_files import ACCOUNTS_FILE_SCHEMA, parse_file
+from .ruijie_client import RuijieClient
+
+
+# 默认并发上限
+DEFAULT_CONCURRENCY = 4
+
+# 批量查询状态只发一个轻量请求，默认并发更高
+DEFAULT_STATUS_CONCURRENCY = 32
+
+
+class FleetAccount:
+    """批量登录中的单个账户"""
+
+    def __init__(self, username, password=None, service="校园网", proxy=None, name=None):
+        """
+        初始化账户
+
+        Args:
+            username: 用户名
+            password: 密码
+            service: 要登录的服务名称
+            proxy: 该账户使用的代理URL（如通过代理登录实验室机器）
+            name: 显示名称，默认为用户名
+        """
+        self.username = username
+        self.password = password
+        self.service = service
+        self.proxy = proxy
+        self.name = name or username
+
+    def get_proxies(self):
+        """获取该账户的代理设置字典"""
+        if not self.proxy:
+            return {}
+        return {'http': self.proxy, 'https': self.proxy}
+
+
+class FleetResult:
+    """单个账户的登录结果"""
+
+    def __init__(self, account, success, elapsed, error=None):
+        """
+        Args:
+            account: FleetAccount对象
+            success: 是否登录成功
+            elapsed: 耗时（秒）
+            error: 失败时的异常对象
+        """
+        self.account = account
+        self.success = success
+        self.elapsed = elapsed
+        self.error = error
+
+    def to_dict(self):
+        """转换为可序列化为JSON的字典"""
+        return {
+            'name': self.account.name,
+            'username': self.account.username,
+            'service': self.account.service,
+            'success': self.success,
+            'elapsed': round(self.elapsed, 3),
+            'error': get_error_message(self.error) if self.error else None,
+        }
+
+
+def load_accounts(path, service_resolver=None, warnings=None):
+    """
+    从TOML文件加载账户列表
+
+    文件格式::
+
+        concurrency = 8          # 可选，并发上限
+        service = "campus"       # 可选，默认服务
+
+        [[accounts]]
+        username = "1145141919810"
+        password = "mypassword"  # 可选，未配置时从凭据库读取（见 fill_passwords）
+        service = "unicom"       # 可选，覆盖默认服务
+        proxy = "socks5://10.0.0.2:1080"  # 可选
+
+    按 config_files.ACCOUNTS_FILE_SCHEMA 校验，账户表与配置文件中的 [[accounts]] 规则相同。
+
+    Args:
+        path: TOML文件路径
+        service_resolver: 服务名称解析函数（用于支持英文别名），为None时原样使用
+        warnings: 收集警告消息（如未知的配置项）的列表，为None时不收集
+
+    Returns:
+        tuple: (账户列表, 文件中的并发上限或None)
+
+    Raises:
+        ConfigFileError: 文件无法解析或包含无效的值
+    """
+    data = parse_file(path, warnings, schema=ACCOUNTS_FILE_SCHEMA)
+    accounts = parse_accounts(data.get('accounts', []), data.get('service', "校园网"), service_resolver)
+    return accounts, data.get('concurrency')
+
+
+def parse_accounts(entries, default_service="校园网", service_resolver=None):
+    """
+    由 [[accounts]] 表创建账户列表（账户文件与配置文件共用）
+
+    Args:
+        entries: 已经 config_files.validate 校验的账户字典列表
+        default_service: 未指定服务的账户使用的服务
+        service_resolver: 服务名称解析函数，为None时原样使用
+
+    Returns:
+        list: FleetAccount列表
+    """
+    resolve = service_resolver or (lambda name: name)
+    accounts = []
+    for entry in entries:
+        accounts.append(FleetAccount(
+            username=entry['username'],
+            password=entry.get('password'),
+            service=resolve(entry.get('service', default_service)),
+            proxy=entry.get('proxy'),
+            name=entry.get('name'),
+        ))
+    return accounts
+
+
+def fill_passwords(accounts, vault):
+    """
+    为未配置密码的账户从已解锁的凭据库中填入密码
+
+    Args:
+        accounts: FleetAccount列表
+        vault: 已解锁的CredentialVault对象
+
+    Returns:
+        int: 填入密码的账户数
+    """
+    filled = 0
+    for account in accounts:
+        if not account.password:
+            account.password = vault.get(account.username)
+            filled += bool(account.password)
+    return filled
+
+
+def _login_account(account, portal_base=None, verbose=False, tracer=None, retry=None, resolver=None):
+    """使用独立的客户端会话登录单个账户"""
+    start = time.perf_counter()
+    try:
+        client = RuijieClient(proxies=account.get_proxies(), verbose=verbose, portal_base=portal_base,
+                              tracer=tracer, retry=retry, resolver=resolver)
+        try:
+            if not account.password:
+                raise ValueError(f"No password configured for {account.username}")
+            success = client.login(account.username, account.password, account.service)
+        finally:
+            client.client.close()
+        return FleetResult(account, success, time.perf_counter() - start)
+    except Exception as e:
+        return FleetResult(account, False, time.perf_counter() - start, error=e)
+
+
+def run_fleet_login(accounts, concurrency=DEFAULT_CONCURRENCY, portal_base=None, verbose=False, tracer=None,
+                    retry=None, resolver=None):
+    """
+    并发登录多个账户，每个账户使用独立的客户端会话
+
+    Args:
+        accounts: FleetAccount列表
+        concurrency: 最大并发数
+        portal_base: 认证门户根地址
+        verbose: 是否输出详细日志
+        tracer: Tracer对象，所有账户的请求记录到同一个追踪器
+        retry: RetryConfig对象，各账户共用的超时与重试策略
+        resolver: DNSCache对象，各账户共用，门户主机只解析一次
+
+    Returns:
+        list: 与accounts顺序一致的FleetResult列表
+    """
+    if not accounts:
+        return []
+
+    max_workers = max(1, min(concurrency or DEFAULT_CONCURRENCY, len(accounts)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet') as executor:
+        return list(executor.map(
+            lambda account: _login_account(account, portal_base, verbose, tracer, retry, resolver), accounts))
+
+
+class StatusTarget:
+    """批量状态查询中的一台机器"""
+
+    def __init__(self, name, proxy=None, source_address=None):
+        """
+        Args:
+            name: 机器名称
+            proxy: 经由该机器访问门户的代理URL（如机器上的SOCKS代理）
+            source_address: 代表该机器的本地源IP地址（门户按来源IP识别在线用户）
+        """
+        self.name = name
+        self.proxy = proxy
+        self.source_address = source_address
+
+    def get_proxies(self):
+        """获取该机器的代理设置字典"""
+        if not self.proxy:
+            return {}
+        return {'http': self.proxy, 'https': self.proxy}
+
+
+class StatusResult:
+    """单台机器的状态查询结果"""
+
+    def __init__(self, target, logged_in, elapsed, user_info=None, error=None):
+        """
+        Args:
+            target: StatusTarget对象
+            logged_in: 是否在线，查询失败时为None
+            elapsed: 耗时（秒）
+            user_info: 在线时的用户信息字典
+            error: 查询失败时的异常对象
+        """
+        self.target = target
+        self.logged_in = logged_in
+        self.elapsed = elapsed
+        self.user_info = user_info
+        self.error = error
+
+    @property
+    def portal_info(self):
+        return (self.user_info or {}).get('portalOnlineUserInfo') or {}
+
+    def to_dict(self):
+        """转换为可序列化为JSON的字典"""
+        portal_info = self.portal_info
+        return {
+            'host': self.target.name,
+            'logged_in': self.logged_in,
+            'username': portal_info.get('userName') or portal_info.get('userId'),
+            'service': portal_info.get('service'),
+            'ip': portal_info.get('userIp'),
+            'elapsed': round(self.elapsed, 3),
+            'error': get_error_message(self.error) if self.error else None,
+        }
+
+
+def load_status_targets(path):
+    """
+    从文本文件加载要查询的机器列表
+
+    每行一台机器：名称，后面可以跟 proxy=URL 和 source=IP；空行和 # 之后的内容被忽略::
+
+        lab-101  proxy=socks5://10.20.1.101:1080
+        lab-102  source=10.20.1.102
+        lab-103  http://10.20.1.103:3128     # 只给出URL时作为代理
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        list: StatusTarget列表
+    """
+    targets = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            options = {}
+            for field in fields[1:]:
+                key, sep, value = field.partition('=')
+                if not sep and '://' in field:
+                    key, value = 'proxy', field
+                elif key not in ('proxy', 'source') or not value:
+                    raise ValueError(f"{path}:{line_number}: unknown option {field!r}")
+                options[key] = value
+            targets.append(StatusTarget(fields[0], proxy=options.get('proxy'),
+                                        source_address=options.get('source')))
+    return targets
+
+
+def _probe_status(target, portal_base=None, verbose=False, tracer=None, retry=None, resolver=None):
+    """经由机器的代理或源地址查询一次在线状态"""
+    start = time.perf_counter()
+    try:
+        client = RuijieClient(proxies=target.get_proxies(), verbose=verbose, portal_base=portal_base,
+                              tracer=tracer, retry=retry, source_address=target.source_address,
+                              resolver=resolver)
+        try:
+            user_info = client.get_online_user_info()
+        finally:
+            client.client.close()
+        # 与 RuijieClient.check_login_status 一致：返回重定向地址表示未登录
+        logged_in = not user_info["portalOnlineUserInfo"].get("redirectUrl")
+        return StatusResult(target, logged_in, time.perf_counter() - start,
+                            user_info=user_info if logged_in else None)
+    except Exception as e:
+        return StatusResult(target, None, time.perf_counter() - start, error=e)
+
+
+def run_batch_status(targets, concurrency=DEFAULT_STATUS_CONCURRENCY, portal_base=None, verbose=False,
+                     tracer=None, retry=None, on_result=None, resolver=None):
+    """
+    并发查询多台机器的在线状态，每台机器使用独立的客户端会话
+
+    Args:
+        targets: StatusTarget列表
+        concurrency: 最大并发数
+        portal_base: 认证门户根地址
+        verbose: 是否输出详细日志
+        tracer: Tracer对象
+        retry: RetryConfig对象
+        on_result: 每台机器查询完成时（按完成顺序，在调用线程中）调用，参数为StatusResult
+        resolver: DNSCache对象，各机器共用
+
+    Returns:
+        list: 与targets顺序一致的StatusResult列表
+    """
+    if not targets:
+        return []
+
+    max_workers = max(1, min(concurrency or DEFAULT_STATUS_CONCURRENCY, len(targets)))
+    results = [None] * len(targets)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='status') as executor:
+        futures = {
+            executor.submit(_probe_status, target, portal_base, verbose, tracer, retry, resolver): index
+            for index, target in enumerate(targets)
+        }
+        for future in as_completed(futures):
+            result = results[futures[future]] = future.result()
+            if on_result:
+                on_result(result)
+    return results
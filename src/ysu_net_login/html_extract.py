@@ -0,0 +1,121 @@
+"""
+登录页面字段快速提取
+
+登录流程只需要页面中的少数几个字段（cas-sso 的 login-croypto、login-page-flowkey、
+errorMessage，CAS 登录页 pwdFromId 表单中的隐藏输入框等）。这里直接在HTML文本中定位
+目标标签，不构建完整的DOM树；找不到时返回None，由调用方回退到 BeautifulSoup。
+"""
+
+import re
+import html as html_lib
+
+
+# 标签属性：name="value" / name='value' / name=value / name
+_ATTR_RE = re.compile(r'''([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+_INPUT_RE = re.compile(r'<input\b([^>]*)>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_FORM_END_RE = re.compile(r'</form\s*>', re.IGNORECASE)
+
+
+def _parse_attrs(attr_text):
+    """解析开始标签中的属性，返回小写属性名到值的字典"""
+    attrs = {}
+    for match in _ATTR_RE.finditer(attr_text):
+        name = match.group(1).lower()
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4)
+        attrs.setdefault(name, html_lib.unescape(value) if value is not None else '')
+    return attrs
+
+
+def _find_start_tag(html, element_id, tag=None):
+    """
+    定位具有指定id的元素的开始标签
+
+    Returns:
+        tuple: (标签名, 开始标签起始位置, 开始标签结束位置)，找不到时返回None
+    """
+    pattern = re.compile(
+        r'<(%s)\b[^>]*?\sid\s*=\s*(["\']?)%s\2[\s/>]' % (re.escape(tag) if tag else r'[a-zA-Z][a-zA-Z0-9]*',
+                                                       re.escape(element_id)),
+        re.IGNORECASE
+    )
+    match = pattern.search(html)
+    if not match:
+        return None
+    end = html.find('>', match.end() - 1)
+    if end == -1:
+        return None
+    return match.group(1).lower(), match.start(), end + 1
+
+
+def find_text_by_id(html, element_id, tag=None):
+    """
+    获取具有指定id的元素的文本内容（去除内部标签和空白）
+
+    Args:
+        html: HTML文本
+        element_id: 元素id
+        tag: 标签名，为None时匹配任意标签
+
+    Returns:
+        str: 文本内容，找不到元素时返回None
+    """
+    found = _find_start_tag(html, element_id, tag)
+    if not found:
+        return None
+    tag_name, _, content_start = found
+
+    # 同名标签不会嵌套（p/span/div中的错误信息），取第一个结束标签即可
+    close = re.compile(r'</%s\s*>' % re.escape(tag_name), re.IGNORECASE).search(html, content_start)
+    if not close:
+        return None
+
+    # 与 BeautifulSoup 的 get_text(strip=True) 一致：逐段去除空白后拼接
+    pieces = _TAG_RE.split(html[content_start:close.start()])
+    return ''.join(html_lib.unescape(piece).strip() for piece in pieces)
+
+
+def find_form_inputs(html, form_id):
+    """
+    获取指定表单中所有input标签的属性
+
+    Args:
+        html: HTML文本
+        form_id: 表单id
+
+    Returns:
+        list: 每个input的属性字典，找不到表单时返回None
+    """
+    found = _find_start_tag(html, form_id, 'form')
+    if not found:
+        return None
+    _, _, form_start = found
+
+    close = _FORM_END_RE.search(html, form_start)
+    form_end = close.start() if close else len(html)
+
+    return [_parse_attrs(match.group(1)) for match in _INPUT_RE.finditer(html, form_start, form_end)]
+
+
+def find_input_value(inputs, name=None, element_id=None, default=None):
+    """
+    在input列表中按name或id查找value
+
+    Args:
+        inputs: find_form_inputs 的返回值
+        name: input的name属性
+        element_id: input的id属性
+        default: input存在但没有value属性时的默认值
+
+    Returns:
+        str: value，找不到input时返回None
+    """
+    for attrs in inputs:
+        if (name is not None and attrs.get('name') == name) or \
+                (element_id is not None and attrs.get('id') == element_id):
+            return attrs.get('value', default)
+    return None
@@ -0,0 +1,259 @@
+"""
+可断点续登的登录流程
+
+登录流程被拆分为显式的步骤（门户重定向 → cas-sso → 服务选择 → 服务登录 → 验证），
+每完成一步都会记录检查点（当前步骤、session_info、服务登录结果以及Cookie）。
+某一步因网络原因失败时检查点保留在该步骤，下一次登录从失败处继续，
+不必重新走一遍耗时的门户重定向和CAS认证。
+"""
+
+import os
+
+import requests
+
+from .circuit import CircuitOpenError
+from .session_cache import SessionCache
+
+
+# 登录步骤，按执行顺序排列
+PORTAL = 'portal'
+CAS_SSO = 'cas_sso'
+SERVICE_SELECTION = 'service_selection'
+SERVICE_LOGIN = 'service_login'
+VERIFY = 'verify'
+DONE = 'done'
+
+STEPS = (PORTAL, CAS_SSO, SERVICE_SELECTION, SERVICE_LOGIN, VERIFY, DONE)
+
+# 检查点有效期（秒），门户会话在认证中途闲置过久会失效
+CHECKPOINT_TTL = 5 * 60
+
+
+def default_checkpoint_path(session_cache_path=None):
+    """
+    获取检查点文件路径，与会话缓存放在同一目录
+
+    Args:
+        session_cache_path: 会话缓存文件路径，为None时使用默认路径
+    """
+    directory = os.path.dirname(session_cache_path or SessionCache.default_path())
+    return os.path.join(directory, 'login_checkpoint.json')
+
+
+def create_checkpoint_store(path=None):
+    """
+    创建检查点存储，检查点沿用会话缓存的文件格式（session_info + Cookie + 附加数据）
+
+    Args:
+        path: 检查点文件路径，默认见 default_checkpoint_path
+    """
+    return SessionCache(path or default_checkpoint_path(), ttl=CHECKPOINT_TTL)
+
+
+class LoginCheckpoint:
+    """登录进度检查点"""
+
+    def __init__(self, username, service, step=PORTAL, session_info=None, login_result=None):
+        """
+        Args:
+            username: 用户名
+            service: 要登录的服务名称
+            step: 下一个要执行的步骤
+            session_info: 门户会话信息
+            login_result: serviceLogin响应（服务登录完成后才有）
+        """
+        self.username = username
+        self.service = service
+        self.step = step
+        self.session_info = session_info
+        self.login_result = login_result
+
+    def matches(self, username, service):
+        """检查点是否属于同一账户和服务"""
+        return self.username == username and self.service == service
+
+    def to_dict(self):
+        return {
+            'username': self.username,
+            'service': self.service,
+            'step': self.step,
+            'login_result': self.login_result,
+        }
+
+    @classmethod
+    def from_dict(cls, data, session_info):
+        step = data.get('step')
+        if step not in STEPS:
+            return None
+        return cls(data.get('username'), data.get('service'), step,
+                   session_info=session_info, login_result=data.get('login_result'))
+
+
+class LoginFlow:
+    """
+    登录状态机
+
+    网络错误（连接失败、超时、HTTP错误状态）视为可恢复错误，检查点停留在失败的步骤；
+    其他错误（认证失败、接口拒绝等）清除检查点。从检查点恢复后若某一步被接口拒绝，
+    说明保存的门户会话已失效，自动从头重新登录一次。
+    """
+
+    def __init__(self, client, username, password, service="校园网", checkpoint=None, store=None):
+        """
+        Args:
+            client: RuijieClient对象
+            username: 用户名
+            password: 密码
+            service: 要登录的服务名称
+            checkpoint: 上一次未完成登录的检查点
+            store: 检查点存储（SessionCache对象），为None时只在内存中保留检查点
+        """
+        self.client = client
+        self.username = username
+        self.password = password
+        self.service = service
+        self.store = store
+        self.checkpoint = checkpoint if checkpoint and checkpoint.matches(username, service) else None
+        if self.checkpoint is None:
+            self.checkpoint = self._load_checkpoint()
+
+        self._handlers = {
+            PORTAL: self._step_portal,
+            CAS_SSO: self._step_cas_sso,
+            SERVICE_SELECTION: self._step_service_selection,
+            SERVICE_LOGIN: self._step_service_login,
+            VERIFY: self._step_verify,
+        }
+
+    def _log(self, message):
+        self.client._log(message)
+
+    def _load_checkpoint(self):
+        """从检查点存储恢复未完成的登录，同时恢复认证过程中获得的Cookie"""
+        fresh = LoginCheckpoint(self.username, self.service)
+        if not self.store:
+            return fresh
+
+        saved = self.store.load()
+        if not saved:
+            return fresh
+
+        checkpoint = LoginCheckpoint.from_dict(saved.get('extra') or {}, saved['session_info'])
+        if checkpoint is None or not checkpoint.matches(self.username, self.service):
+            return fresh
+
+        SessionCache.restore_cookies(self.client.client.cookies, saved.get('cookies'))
+        return checkpoint
+
+    def _save_checkpoint(self):
+        """持久化检查点"""
+        if not self.store or not self.checkpoint.session_info:
+            return
+        try:
+            self.store.save(self.checkpoint.session_info, self.client.client.cookies,
+                            extra=self.checkpoint.to_dict())
+        except OSError as e:
+            self._log(f"Failed to save login checkpoint: {e}")
+
+    def _clear_checkpoint(self):
+        """登录结束（成功或不可恢复的失败）后丢弃检查点"""
+        self.checkpoint = LoginCheckpoint(self.username, self.service)
+        if self.store:
+            self.store.clear()
+
+    def _advance(self, step):
+        self.checkpoint.step = step
+        if step != DONE:
+            self._save_checkpoint()
+
+    @property
+    def resumable(self):
+        """是否有可继续的未完成登录"""
+        return self.checkpoint.step not in (PORTAL, DONE)
+
+    # ---- 各步骤 ----
+
+    def _step_portal(self):
+        is_logged_in, info = self.client.check_login_status()
+        if is_logged_in:
+            self._log("Already logged in")
+            self._advance(DONE)
+            return
+
+        session_info = self.client.redirect_to_portal()
+        self._log(f"Got session info: {session_info}")
+        self.checkpoint.session_info = session_info
+        self._advance(CAS_SSO)
+
+    def _step_cas_sso(self):
+        self.client.cas_sso_login(self.username, self.password, self.checkpoint.session_info)
+        self._advance(SERVICE_SELECTION)
+
+    def _step_service_selection(self):
+        services = self.client.service_selection(self.checkpoint.session_info)
+        self._log(f"Available services: {services}")
+        self._advance(SERVICE_LOGIN)
+
+    def _step_service_login(self):
+        login_result = self.client.service_login(self.checkpoint.session_info, self.service)
+        self._log(f"Service login result: {login_result}")
+        self.checkpoint.login_result = login_result
+        self._advance(VERIFY)
+
+    def _step_verify(self):
+        from .ruijie_client import _verify_login_result
+
+        online_status = self.client.user_online(self.checkpoint.session_info)
+        self._log(f"User online status: {online_status}")
+        _verify_login_result(self.checkpoint.login_result, online_status)
+        self.client._save_session(self.checkpoint.session_info)
+        self._advance(DONE)
+
+    def _already_online(self):
+        """
+        恢复到服务登录步骤时，先确认上一次的serviceLogin是否已在服务端生效
+        （请求已送达但响应超时），避免重复提交
+        """
+        try:
+            online_status = self.client.user_online(self.checkpoint.session_info)
+        except (requests.RequestException, CircuitOpenError, ValueError, KeyError):
+            return False
+        return bool(online_status.get('online'))
+
+    # ---- 执行 ----
+
+    def run(self):
+        """
+        从检查点所在步骤开始执行登录流程
+
+        Returns:
+            bool: 登录是否成功
+        """
+        resumed = self.resumable
+        if resumed:
+            self._log(f"Resuming login at step '{self.checkpoint.step}'")
+            if self.checkpoint.step == SERVICE_LOGIN and self._already_online():
+                self._log("Previous service login already took effect")
+                self.client._save_session(self.checkpoint.session_info)
+                self._advance(DONE)
+
+        while self.checkpoint.step != DONE:
+            step = self.checkpoint.step
+            try:
+                self._handlers[step]()
+            except (requests.RequestException, CircuitOpenError) as e:
+                # 网络错误或熔断器打开：门户会话仍然有效，保留检查点
+                self._log(f"Login step '{step}' failed, checkpoint kept for resume: {e}")
+                raise
+            except Exception as e:
+                if resumed and step in (CAS_SSO, SERVICE_SELECTION, SERVICE_LOGIN):
+                    # 保存的门户会话已失效，从头重新登录一次
+                    self._log(f"Resumed step '{step}' rejected ({e}), restarting login")
+                    resumed = False
+                    self._clear_checkpoint()
+                    continue
+                self._clear_checkpoint()
+                raise
+
+        self._clear_checkpoint()
+        return True
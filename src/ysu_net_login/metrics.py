@@ -0,0 +1,506 @@
+"""
+登录健康与延迟指标
+
+进程内的指标注册表（计数器、仪表、直方图），以 Prometheus 文本格式导出：
+登录尝试与按原因分类的失败次数、各请求步骤的耗时分布、当前在线状态以及距上次成功登录的时间。
+
+命令行工具的每次运行都是短进程，因此指标在进程结束（守护进程/常驻代理为每个周期/请求之后）时
+累加到缓存目录下的状态文件中；`ysunetlogin metrics` 从状态文件读取并输出，
+`--listen` 以HTTP提供给 Prometheus 抓取，设置 RUIJIE_METRICS_TEXTFILE 时每次写入状态文件后
+同时写出 node_exporter textfile collector 使用的 .prom 文件。
+
+本模块只依赖标准库。
+"""
+
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# 默认直方图分桶（秒），覆盖本地模拟门户的毫秒级请求到门户卡顿时的数十秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    """指标基类，按标签值保存样本"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Args:
+            name: 指标名称
+            documentation: 说明（导出为 # HELP）
+            labelnames: 标签名称元组
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._samples = {}
+
+    def to_dict(self, drain=False):
+        """
+        转换为可JSON序列化的字典（包括定义与样本）
+
+        Args:
+            drain: 是否同时清空样本（与读取在同一临界区内，不会丢失并发记录的样本）
+        """
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._samples.items()]
+            if drain:
+                self._samples = {}
+        return {'type': self.type, 'help': self.documentation, 'labels': list(self.labelnames),
+                'samples': samples}
+
+    def render(self):
+        """以 Prometheus 文本格式输出"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            samples = sorted(self._samples.items())
+        for key, value in samples:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    type = COUNTER
+
+    def inc(self, amount=1, **labels):
+        """增加计数"""
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def merge(self, key, value):
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + value
+
+
+class Gauge(Metric):
+    """可任意设置的仪表"""
+
+    type = GAUGE
+
+    def set(self, value, **labels):
+        """设置当前值"""
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = value
+
+    def get(self, **labels):
+        """获取当前值，未设置时返回None"""
+        return self._samples.get(self._key(labels))
+
+    def merge(self, key, value):
+        with self._lock:
+            self._samples[key] = value
+
+
+class Histogram(Metric):
+    """直方图，每个样本为 {'buckets': 各分桶计数（不累计）, 'sum': 总和, 'count': 次数}"""
+
+    type = HISTOGRAM
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name: 指标名称
+            documentation: 说明
+            labelnames: 标签名称元组
+            buckets: 分桶上界（升序，不含 +Inf）
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """记录一次观测值"""
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            sample['buckets'][index] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+
+    def merge(self, key, value):
+        counts = value.get('buckets') or []
+        if len(counts) != len(self.buckets) + 1:
+            # 分桶定义已变化，旧数据无法合并
+            return
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            sample['buckets'] = [a + b for a, b in zip(sample['buckets'], counts)]
+            sample['sum'] += value.get('sum', 0.0)
+            sample['count'] += value.get('count', 0)
+
+    def to_dict(self, drain=False):
+        data = super().to_dict(drain)
+        data['buckets'] = list(self.buckets)
+        return data
+
+    def _render_sample(self, key, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(round(value['sum'], 6))}")
+        lines.append(f"{self.name}_count{labels} {value['count']}")
+        return lines
+
+
+_METRIC_TYPES = {COUNTER: Counter, GAUGE: Gauge, HISTOGRAM: Histogram}
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._derived = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different definition")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def derived(self, name, documentation, func):
+        """
+        注册导出时计算的仪表（不保存、不持久化），如距上次成功登录的秒数
+
+        Args:
+            name: 指标名称
+            documentation: 说明
+            func: 参数为注册表、返回当前值的函数，返回None时不输出样本
+        """
+        self._derived.append((name, documentation, func))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._metrics.values()))
+
+    @property
+    def empty(self):
+        """是否没有任何样本"""
+        return not any(metric._samples for metric in self)
+
+    def clear(self):
+        """清空所有样本"""
+        for metric in self:
+            metric.clear()
+
+    def to_dict(self, drain=False):
+        """
+        Args:
+            drain: 是否同时清空样本
+        """
+        return {metric.name: metric.to_dict(drain) for metric in self}
+
+    def merge(self, data):
+        """
+        合并导出的数据：计数器与直方图累加，仪表取新值；未注册的指标按数据中的定义注册
+
+        Args:
+            data: to_dict() 的结果
+        """
+        for name, entry in data.items():
+            if not isinstance(entry, dict) or entry.get('type') not in _METRIC_TYPES:
+                continue
+            metric = self.get(name)
+            if metric is None:
+                try:
+                    if entry['type'] == HISTOGRAM:
+                        metric = self.histogram(name, entry.get('help', ''), entry.get('labels', ()),
+                                                entry.get('buckets') or DEFAULT_BUCKETS)
+                    else:
+                        metric = self._register(_METRIC_TYPES[entry['type']](name, entry.get('help', ''),
+                                                                             entry.get('labels', ())))
+                except ValueError:
+                    continue
+            if metric.type != entry['type']:
+                continue
+            for key, value in entry.get('samples') or []:
+                if len(key) == len(metric.labelnames):
+                    metric.merge(tuple(key), value)
+
+    def render(self):
+        """
+        以 Prometheus 文本格式（0.0.4）输出所有指标
+
+        Returns:
+            str: 文本内容
+        """
+        lines = []
+        for metric in sorted(self, key=lambda m: m.name):
+            lines.extend(metric.render())
+        for name, documentation, func in self._derived:
+            value = func(self)
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {GAUGE}")
+            if value is not None:
+                lines.append(f"{name} {_format_value(round(value, 3))}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsStore:
+    """
+    指标状态文件
+
+    多个进程（cron中的login、守护进程、常驻代理）并发写入时用文件锁串行化，
+    各进程只写入自上次写入以来的增量。
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: 状态文件路径，默认见 default_path
+        """
+        self.path = path or self.default_path()
+
+    @staticmethod
+    def default_path():
+        """获取默认状态文件路径"""
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache_home, 'ysunetlogin', 'metrics.json')
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self):
+        """
+        读取状态文件
+
+        Returns:
+            Registry: 包含累计指标的注册表（已注册导出时计算的指标）
+        """
+        registry = create_registry()
+        registry.merge(self._read())
+        return registry
+
+    def flush(self, registry):
+        """
+        把注册表中的样本累加到状态文件，然后清空注册表（避免下一次重复累加）
+
+        Args:
+            registry: Registry对象
+
+        Returns:
+            Registry: 写入后的累计指标
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        with open(f"{self.path}.lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            total = self.load()
+            total.merge(registry.to_dict(drain=True))
+            _write_atomic(self.path, json.dumps(total.to_dict()))
+        return total
+
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_textfile(registry, path):
+    """
+    写出 node_exporter textfile collector 使用的 .prom 文件（原子替换，抓取时不会读到一半的文件）
+
+    Args:
+        registry: Registry对象
+        path: 文件路径，应以 .prom 结尾
+    """
+    _write_atomic(path, registry.render())
+
+
+def _seconds_since_last_login(registry):
+    last = registry.get('ysunetlogin_last_login_success_timestamp_seconds')
+    value = last.get() if last is not None else None
+    return None if value is None else max(0.0, time.time() - value)
+
+
+def create_registry():
+    """创建包含本工具所有指标定义的注册表"""
+    registry = Registry()
+    registry.counter('ysunetlogin_login_attempts_total', 'Login attempts', ('service',))
+    registry.counter('ysunetlogin_login_failures_total',
+                     'Failed login attempts by reason (as classified by get_error_message)', ('reason',))
+    registry.histogram('ysunetlogin_login_duration_seconds', 'Duration of complete login attempts', ('result',))
+    registry.histogram('ysunetlogin_step_duration_seconds',
+                       'Portal request latency per login step, including retries', ('step',))
+    registry.gauge('ysunetlogin_online', 'Whether the last status check found this host online (1) or offline (0)')
+    registry.gauge('ysunetlogin_last_login_success_timestamp_seconds', 'Unix time of the last successful login')
+    registry.derived('ysunetlogin_seconds_since_last_login', 'Seconds since the last successful login',
+                     _seconds_since_last_login)
+    return registry
+
+
+# 当前进程的指标
+REGISTRY = create_registry()
+
+LOGIN_ATTEMPTS = REGISTRY.get('ysunetlogin_login_attempts_total')
+LOGIN_FAILURES = REGISTRY.get('ysunetlogin_login_failures_total')
+LOGIN_DURATION = REGISTRY.get('ysunetlogin_login_duration_seconds')
+STEP_DURATION = REGISTRY.get('ysunetlogin_step_duration_seconds')
+ONLINE = REGISTRY.get('ysunetlogin_online')
+LAST_LOGIN_SUCCESS = REGISTRY.get('ysunetlogin_last_login_success_timestamp_seconds')
+
+
+def record_login(service, elapsed, error=None):
+    """
+    记录一次登录尝试
+
+    Args:
+        service: 服务名称
+        elapsed: 耗时（秒）
+        error: 失败时的异常对象
+    """
+    LOGIN_ATTEMPTS.inc(service=service)
+    if error is None:
+        LOGIN_DURATION.observe(elapsed, result='success')
+        LAST_LOGIN_SUCCESS.set(time.time())
+        ONLINE.set(1)
+    else:
+        from .config import classify_error
+
+        LOGIN_DURATION.observe(elapsed, result='failure')
+        LOGIN_FAILURES.inc(reason=classify_error(error))
+
+
+def parse_listen_address(address):
+    """
+    解析监听地址
+
+    Args:
+        address: "[HOST]:PORT" 或 "PORT"，省略主机时监听所有地址
+
+    Returns:
+        tuple: (host, port)
+    """
+    host, _, port = address.rpartition(':')
+    host = host.strip('[]')
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"Invalid listen address: {address}") from None
+    return host, port
+
+
+def create_server(store, host, port, log=None):
+    """
+    创建提供 /metrics 的HTTP服务，每次抓取时读取状态文件
+
+    Args:
+        store: MetricsStore对象
+        host: 监听地址
+        port: 监听端口
+        log: 日志函数
+
+    Returns:
+        http.server.ThreadingHTTPServer 对象，调用 serve_forever() 开始服务
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = store.load().render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if log:
+                log(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
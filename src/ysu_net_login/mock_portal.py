@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+本地模拟认证门户
+
+模拟 auth1.ysu.edu.cn（eportal、cas-sso）与 cer.ysu.edu.cn（authserver）的接口，
+可配置延迟与抖动，用于在没有校园网的环境中运行登录流程和性能测试。
+
+Usage:
+    python -m ysu_net_login.mock_portal --port 8080 --latency 0.05 --jitter 0.01
+
+    RuijieClient(portal_base="http://127.0.0.1:8080")
+    YSULogin(username, password, cas_base="http://127.0.0.1:8080")
+"""
+
+import sys
+import json
+import time
+import uuid
+import base64
+import random
+import socket
+import ssl
+import string
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import unpad
+
+
+SERVICES = ["校园网", "中国联通", "中国电信", "中国移动"]
+
+
+class MockPortalState:
+    """模拟门户的服务端状态（线程安全）"""
+
+    def __init__(self, accounts=None, latency=0.0, jitter=0.0, need_captcha=False):
+        """
+        Args:
+            accounts: 用户名到密码的字典，为None时接受任意密码
+            latency: 每个请求的基础延迟（秒）
+            jitter: 延迟抖动幅度（秒），实际延迟在 latency±jitter 之间
+            need_captcha: CAS登录是否要求验证码
+        """
+        self.accounts = accounts
+        self.latency = latency
+        self.jitter = jitter
+        self.need_captcha = need_captcha
+        self.user_ip = "10.11.45.14"
+        self.nas_ip = "10.0.0.1"
+
+        self.lock = threading.Lock()
+        self.request_counts = Counter()
+        # sessionId -> {'croypto', 'execution', 'username', 'authenticated'}
+        self.sessions = {}
+        # execution -> {'salt', 'captcha'}（authserver表单）
+        self.cas_forms = {}
+        # 当前在线会话（一台机器同时只有一个在线会话）
+        self.online = None
+        # "METHOD /path" -> 剩余的注入失败次数
+        self.faults = Counter()
+
+    def delay(self):
+        """模拟网络和服务端处理延迟"""
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def check_password(self, username, password):
+        """校验用户名密码"""
+        if self.accounts is None:
+            return bool(username and password)
+        return self.accounts.get(username) == password
+
+    def inject_fault(self, method, path, count=1):
+        """
+        让后续的请求返回503，用于测试重试与断点续登
+
+        Args:
+            method: HTTP方法
+            path: 请求路径
+            count: 失败次数
+        """
+        with self.lock:
+            self.faults[f"{method} {path}"] += count
+
+    def take_fault(self, key):
+        """消耗一次注入的失败，返回该请求是否应失败"""
+        with self.lock:
+            if self.faults[key] <= 0:
+                return False
+            self.faults[key] -= 1
+            return True
+
+    def reset_counts(self):
+        """清空请求计数"""
+        with self.lock:
+            self.request_counts.clear()
+
+
+def _random_token(length):
+    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))
+
+
+def _captcha_image(text):
+    """生成验证码图片（JPEG）"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (90, 34), (235, 235, 235))
+    draw = ImageDraw.Draw(image)
+    for i, ch in enumerate(text):
+        draw.text((10 + i * 18, 10 + random.randint(-3, 3)), ch, fill=(20, 20, 120))
+    buf = BytesIO()
+    image.save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    """模拟门户请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockPortal/1.0"
+
+    # 每个路径对应的处理方法
+    GET_ROUTES = {
+        '/eportal/redirect.jsp': '_get_redirect',
+        '/eportal/entry': '_get_entry',
+        '/portal/portal-main': '_get_portal_main',
+        '/portal/auth-success.html': '_get_auth_success',
+        '/eportal/adaptor/getOnlineUserInfo': '_get_online_user_info',
+        '/cas-sso/login': '_get_cas_sso_login',
+        '/authserver/login': '_get_authserver_login',
+        '/authserver/getCaptcha.htl': '_get_captcha',
+        '/ehall/login': '_get_ehall',
+    }
+    POST_ROUTES = {
+        '/cas-sso/login': '_post_cas_sso_login',
+        '/eportal/network/serviceSelection': '_post_service_selection',
+        '/eportal/network/serviceLogin': '_post_service_login',
+        '/eportal/network/userOnline': '_post_user_online',
+        '/eportal/network/offline': '_post_offline',
+        '/eportal/operator/getAccountInfo': '_post_account_info',
+        '/eportal/workFlow/getCurrentNode': '_post_current_node',
+        '/authserver/login': '_post_authserver_login',
+        '/authserver/checkNeedCaptcha.htl': '_post_check_captcha',
+    }
+
+    @property
+    def state(self):
+        return self.server.state
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"{self.server.scheme}://{host}:{port}"
+
+    def setup(self):
+        super().setup()
+        # 响应头和响应体分开写出，关闭Nagle算法避免与延迟确认叠加出约40ms的额外延迟
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ---- 基础工具 ----
+
+    def _dispatch(self, routes):
+        parsed = urlparse(self.path)
+        self.query = {k: v[0] for k, v in parse_qs(parsed.query, keep_blank_values=True).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+
+        key = f"{self.command} {parsed.path}"
+        with self.state.lock:
+            self.state.request_counts[key] += 1
+        self.state.delay()
+
+        if self.state.take_fault(key):
+            self._send(503, b'Service Unavailable (injected)', 'text/plain')
+            return
+
+        handler = routes.get(parsed.path)
+        if handler is None:
+            self._send(404, b'Not Found', 'text/plain')
+            return
+        getattr(self, handler)()
+
+    def do_GET(self):
+        self._dispatch(self.GET_ROUTES)
+
+    def do_POST(self):
+        self._dispatch(self.POST_ROUTES)
+
+    def _send(self, status, body, content_type, headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _html(self, html, status=200):
+        self._send(status, html, 'text/html; charset=utf-8')
+
+    def _json(self, data):
+        self._send(200, json.dumps(data, ensure_ascii=False), 'application/json;charset=UTF-8')
+
+    def _api(self, data=None, code=200, message="success"):
+        self._json({"code": code, "message": message, "data": data})
+
+    def _redirect(self, location):
+        self._send(302, b'', 'text/plain', {'Location': location})
+
+    def _json_body(self):
+        try:
+            return json.loads(self.body or b'{}')
+        except ValueError:
+            return {}
+
+    def _form_body(self):
+        return {k: v[0] for k, v in parse_qs(self.body.decode('utf-8'), keep_blank_values=True).items()}
+
+    # ---- eportal ----
+
+    def _get_redirect(self):
+        self._html(f"<script>top.self.location.href='{self.base_url}/eportal/entry?mode=history'</script>")
+
+    def _get_entry(self):
+        state = self.state
+        with state.lock:
+            if state.online:
+                session_id = state.online
+            else:
+                session_id = uuid.uuid4().hex
+                state.sessions[session_id] = {'authenticated': False, 'username': None}
+        self._redirect(
+            f"{self.base_url}/portal/portal-main?sessionId={session_id}&customPageId=100"
+            f"&nasIp={state.nas_ip}&userIp={state.user_ip}&ssid=&mode=history"
+        )
+
+    def _get_portal_main(self):
+        self._html("<html><head><title>portal-main</title></head><body>portal</body></html>")
+
+    def _get_auth_success(self):
+        self._html("<html><body>auth-success</body></html>")
+
+    def _get_online_user_info(self):
+        state = self.state
+        with state.lock:
+            session = state.sessions.get(state.online) if state.online else None
+        if not session:
+            self._api({"portalOnlineUserInfo": {"redirectUrl": f"{self.base_url}/eportal/redirect.jsp"}})
+            return
+        self._api({
+            "portalOnlineUserInfo": {
+                "userName": session['username'],
+                "userId": session['username'],
+                "service": session.get('service'),
+                "userIp": state.user_ip,
+                "redirectUrl": None,
+            },
+            "onlineUser": {
+                "authenticationTime": session.get('login_time'),
+                "nodePhysicalLocation": "Mock Portal",
+            },
+        })
+
+    def _session(self):
+        """从JSON请求体中取得会话，不存在时返回None"""
+        with self.state.lock:
+            return self.state.sessions.get(self._json_body().get('sessionId'))
+
+    def _post_service_selection(self):
+        session = self._session()
+        if not session or not session['authenticated']:
+            self._api(code=500, message="session not authenticated")
+            return
+        self._api({"services": [{"name": name} for name in SERVICES]})
+
+    def _post_service_login(self):
+        body = self._json_body()
+        session = self._session()
+        if not session or not session['authenticated']:
+            self._api({"authResult": "fail", "authMessage": "session not authenticated"})
+            return
+        if body.get('service') not in SERVICES:
+            self._api({"authResult": "fail", "authMessage": f"unknown service {body.get('service')}"})
+            return
+        with self.state.lock:
+            session['service'] = body['service']
+            session['login_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.state.online = body['sessionId']
+        self._api({"authResult": "success"})
+
+    def _post_user_online(self):
+        session_id = self._json_body().get('sessionId')
+        with self.state.lock:
+            online = session_id is not None and session_id == self.state.online
+        self._api({"online": online})
+
+    def _post_offline(self):
+        session_id = self._json_body().get('sessionId')
+        with self.state.lock:
+            if session_id not in self.state.sessions:
+                self._api(code=500, message="invalid session")
+                return
+            if self.state.online == session_id:
+                self.state.online = None
+            self.state.sessions[session_id]['authenticated'] = False
+        self._api(None)
+
+    def _post_account_info(self):
+        session = self._session()
+        if not session or not session['authenticated']:
+            self._api(code=500, message="invalid session")
+            return
+        self._api({
+            "name": session['username'],
+            "service": session.get('service'),
+            "allowMab": False,
+            "nosenseEnable": False,
+            "accountInfo": [{"title": "余额", "content": "11.45元"}],
+        })
+
+    def _post_current_node(self):
+        session = self._session()
+        node = "portal_auth/success" if session and session['authenticated'] else "portal_auth/login"
+        self._api({"currentNodePath": node})
+
+    # ---- cas-sso ----
+
+    def _get_cas_sso_login(self):
+        session_id = self.query.get('flowSessionId')
+        croypto = base64.b64encode(random.getrandbits(128).to_bytes(16, 'big')).decode()
+        execution = _random_token(256)
+        with self.state.lock:
+            session = self.state.sessions.get(session_id)
+            if session is None:
+                self._html("<html><body>invalid flow session</body></html>", status=400)
+                return
+            session['croypto'] = croypto
+            session['execution'] = execution
+        self._html(
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>统一身份认证</title></head><body>"
+            "<div class=\"login-box\"><form id=\"login-form\">"
+            "<input type=\"text\" name=\"username\"><input type=\"password\" name=\"password\">"
+            "</form></div>"
+            f"<p id=\"login-croypto\" style=\"display:none\">{croypto}</p>"
+            f"<p id=\"login-page-flowkey\" style=\"display:none\">{execution}</p>"
+            "</body></html>"
+        )
+
+    def _post_cas_sso_login(self):
+        session_id = self.query.get('flowSessionId')
+        form = self._form_body()
+        with self.state.lock:
+            session = self.state.sessions.get(session_id)
+        if not session or form.get('execution') != session.get('execution'):
+            self._html("<html><body><div id=\"errorMessage\">登录流程已过期</div></body></html>")
+            return
+
+        try:
+            cipher = AES.new(base64.b64decode(session['croypto']), AES.MODE_ECB)
+            password = unpad(cipher.decrypt(base64.b64decode(form.get('password', ''))), AES.block_size).decode('utf-8')
+        except (ValueError, KeyError):
+            password = None
+
+        if not self.state.check_password(form.get('username'), password):
+            self._html("<html><body><div id=\"errorMessage\">用户名或密码错误</div></body></html>")
+            return
+
+        with self.state.lock:
+            session['authenticated'] = True
+            session['username'] = form['username']
+        self._redirect(f"{self.base_url}/portal/auth-success.html?ticket=ST-{_random_token(24)}")
+
+    # ---- authserver (cer.ysu.edu.cn) ----
+
+    def _get_authserver_login(self):
+        execution = _random_token(64)
+        salt = _random_token(16)
+        with self.state.lock:
+            self.state.cas_forms[execution] = {'salt': salt, 'captcha': None}
+        self._html(
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>统一身份认证</title></head><body>"
+            "<form id=\"pwdFromId\" method=\"post\">"
+            "<input type=\"text\" id=\"username\" name=\"username\">"
+            "<input type=\"password\" id=\"password\" name=\"password\">"
+            "<input type=\"hidden\" name=\"lt\" value=\"\">"
+            f"<input type=\"hidden\" name=\"execution\" value=\"{execution}\">"
+            "<input type=\"hidden\" name=\"_eventId\" value=\"submit\">"
+            "<input type=\"hidden\" name=\"cllt\" value=\"userNameLogin\">"
+            "<input type=\"hidden\" name=\"dllt\" value=\"generalLogin\">"
+            f"<input type=\"hidden\" id=\"pwdEncryptSalt\" value=\"{salt}\">"
+            "</form></body></html>"
+        )
+
+    def _post_check_captcha(self):
+        self._json({"isNeed": self.state.need_captcha})
+
+    def _get_captcha(self):
+        text = _random_token(4)
+        with self.state.lock:
+            for form in self.state.cas_forms.values():
+                form['captcha'] = text
+        self._send(200, _captcha_image(text), 'image/jpeg')
+
+    def _post_authserver_login(self):
+        form = self._form_body()
+        with self.state.lock:
+            cas_form = self.state.cas_forms.pop(form.get('execution'), None)
+
+        error = None
+        if cas_form is None:
+            error = "登录流程已过期"
+        else:
+            try:
+                cipher = AES.new(cas_form['salt'].encode('utf-8'), AES.MODE_CBC, b'\0' * 16)
+                decrypted = unpad(cipher.decrypt(base64.b64decode(form.get('password', ''))), AES.block_size)
+                # 前16字节受IV影响，前缀共64字节，之后为明文密码
+                password = decrypted[64:].decode('utf-8')
+            except (ValueError, UnicodeDecodeError):
+                password = None
+            if self.state.need_captcha and (form.get('captcha') or '').lower() != (cas_form['captcha'] or '').lower():
+                error = "验证码错误"
+            elif not self.state.check_password(form.get('username'), password):
+                error = "您提供的用户名或者密码有误"
+
+        if error:
+            self._html(f"<html><body><title>统一身份认证</title><span id=\"showErrorTip\">{error}</span></body></html>", status=401)
+            return
+
+        service = parse_qs(urlparse(self.path).query).get('service', [f"{self.base_url}/ehall/login"])[0]
+        if 'ysu.edu.cn' in service:
+            service = f"{self.base_url}/ehall/login"
+        self._redirect(f"{service}?ticket=ST-{_random_token(24)}")
+
+    def _get_ehall(self):
+        self._html("<html><head><title>网上办事服务大厅</title></head><body>ehall</body></html>")
+
+
+class MockPortalServer:
+    """在后台线程中运行的模拟门户服务器"""
+
+    def __init__(self, host="127.0.0.1", port=0, verbose=False, certfile=None, keyfile=None, **state_options):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            verbose: 是否输出访问日志
+            certfile: 证书文件，指定时以HTTPS提供服务
+            keyfile: 私钥文件，默认与证书在同一文件中
+            **state_options: 传给MockPortalState的参数（accounts、latency、jitter、need_captcha）
+        """
+        self.state = MockPortalState(**state_options)
+        self.httpd = ThreadingHTTPServer((host, port), MockPortalHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.httpd.verbose = verbose
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # 握手推迟到处理线程中第一次读取时进行，避免阻塞accept
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True,
+                                                    do_handshake_on_connect=False)
+            self.scheme = 'https'
+        self.httpd.scheme = self.scheme
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-portal', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    """命令行入口：在前台运行模拟门户"""
+    parser = argparse.ArgumentParser(description="本地模拟认证门户")
+    parser.add_argument('--host', default='127.0.0.1', help='Listen address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Listen port (default: 8080)')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='SECONDS',
+                        help='Base latency added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, metavar='SECONDS',
+                        help='Random latency jitter (+/-)')
+    parser.add_argument('--captcha', action='store_true', help='Require a captcha for CAS logins')
+    parser.add_argument('--certfile', metavar='PEM', help='Serve HTTPS using this certificate')
+    parser.add_argument('--keyfile', metavar='PEM', help='Private key for --certfile (default: inside certfile)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = MockPortalServer(args.host, args.port, verbose=args.verbose,
+                              certfile=args.certfile, keyfile=args.keyfile,
+                              latency=args.latency, jitter=args.jitter, need_captcha=args.captcha)
+    print(f"Mock portal listening on {server.base_url}")
+    print(f"  RuijieClient(portal_base={server.base_url!r})")
+    print(f"  YSULogin(username, password, cas_base={server.base_url!r})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
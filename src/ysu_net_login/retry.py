@@ -0,0 +1,193 @@
+"""
+请求超时与重试策略
+
+每个请求步骤（见 RuijieClient._request 的step参数）使用一个 RetryPolicy：
+连接/读取超时、最大尝试次数、带抖动的指数退避以及整个步骤的总耗时预算。
+非幂等的步骤（serviceLogin、offline 等）只在连接根本没有建立时才重试，
+不会在请求可能已被门户处理后盲目重放。
+"""
+
+import time
+import random
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+
+# 门户过载/网关错误时返回的状态码，幂等请求遇到这些状态码时重试
+RETRYABLE_STATUS = frozenset([429, 502, 503, 504])
+
+
+def _connection_not_established(exception):
+    """判断请求是否在发出之前就失败了（DNS解析失败、连接被拒绝、连接超时）"""
+    if isinstance(exception, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exception, requests.exceptions.ConnectionError) and exception.args:
+        reason = getattr(exception.args[0], 'reason', exception.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class RetryPolicy:
+    """单个请求步骤的超时与重试策略"""
+
+    def __init__(self, connect_timeout=5.0, read_timeout=10.0, max_attempts=3, backoff_base=0.5,
+                 backoff_max=8.0, budget=30.0, idempotent=True):
+        """
+        Args:
+            connect_timeout: 建立连接的超时（秒）
+            read_timeout: 等待响应数据的超时（秒）
+            max_attempts: 最大尝试次数（1表示不重试）
+            backoff_base: 第一次重试前退避时间的上限（秒），之后每次翻倍
+            backoff_max: 单次退避时间的上限（秒）
+            budget: 整个步骤（包括所有重试）的总耗时预算（秒），为None时不限制
+            idempotent: 请求是否可以安全重放
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self.idempotent = idempotent
+
+    def replace(self, **changes):
+        """返回修改了部分参数的新策略"""
+        params = dict(self.__dict__)
+        params.update(changes)
+        return RetryPolicy(**params)
+
+    def backoff(self, attempt):
+        """
+        第attempt次失败后的退避时间（full jitter：在 [0, base*2^(attempt-1)] 内均匀随机）
+
+        Args:
+            attempt: 已失败的次数（从1开始）
+        """
+        cap = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def should_retry(self, exception=None, response=None):
+        """判断一次失败的尝试是否应当重试"""
+        if exception is not None:
+            if _connection_not_established(exception):
+                return True
+            return self.idempotent and isinstance(
+                exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+            )
+        return self.idempotent and response is not None and response.status_code in RETRYABLE_STATUS
+
+    def run(self, send, log=None, sleep=time.sleep):
+        """
+        按策略执行请求
+
+        Args:
+            send: 发送请求的函数，参数为 (connect_timeout, read_timeout) 元组，返回 requests.Response
+            log: 日志函数
+            sleep: 等待函数（便于测试替换）
+
+        Returns:
+            最后一次尝试的 requests.Response（重试耗尽时可能是错误状态码的响应）
+        """
+        deadline = time.monotonic() + self.budget if self.budget else None
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = (self.connect_timeout, self.read_timeout)
+            if deadline is not None:
+                # 最后一次尝试的超时不超过剩余预算
+                remaining = max(deadline - time.monotonic(), 0.1)
+                timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+            exception = response = None
+            try:
+                response = send(timeout)
+            except requests.exceptions.RequestException as e:
+                exception = e
+
+            if exception is None and response.status_code not in RETRYABLE_STATUS:
+                return response
+            if attempt >= self.max_attempts or not self.should_retry(exception, response):
+                if exception is not None:
+                    raise exception
+                return response
+
+            delay = self.backoff(attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                if exception is not None:
+                    raise exception
+                return response
+
+            if log:
+                reason = exception if exception is not None else f"HTTP {response.status_code}"
+                log(f"Attempt {attempt}/{self.max_attempts} failed ({reason}), retrying in {delay:.2f}s")
+            if response is not None:
+                response.close()
+            sleep(delay)
+
+
+# 各步骤相对默认策略的调整，键为步骤名或步骤名前缀（点号之前的部分）
+DEFAULT_STEP_OVERRIDES = {
+    # 提交后门户即开始认证/计费，不能盲目重放
+    'service_login': {'idempotent': False},
+    'offline': {'idempotent': False},
+    # execution 和 croypto 为一次性参数，重放只会被拒绝
+    'cas_sso_login.submit': {'idempotent': False},
+    'ysu_login.submit': {'idempotent': False},
+    'get_cas_login_url.sam_login': {'idempotent': False},
+    # 状态查询和验证码请求需要快速失败，status 命令的尾延迟由它决定
+    'get_online_user_info': {'read_timeout': 5.0, 'budget': 15.0},
+    'ysu_login.check_captcha': {'read_timeout': 5.0},
+    'ysu_login.fetch_captcha': {'read_timeout': 5.0},
+}
+
+
+class RetryConfig:
+    """默认策略加上按步骤的覆盖"""
+
+    def __init__(self, default=None, overrides=None):
+        """
+        Args:
+            default: 默认 RetryPolicy
+            overrides: 步骤名（或前缀）到参数字典的映射，在 DEFAULT_STEP_OVERRIDES 基础上合并
+        """
+        self.default = default or RetryPolicy()
+        self.overrides = {step: dict(changes) for step, changes in DEFAULT_STEP_OVERRIDES.items()}
+        for step, changes in (overrides or {}).items():
+            self.overrides.setdefault(step, {}).update(changes)
+        self._cache = {}
+
+    @classmethod
+    def from_settings(cls, connect_timeout=None, read_timeout=None, retries=None):
+        """
+        根据命令行/环境变量中的设置创建配置，未设置的项使用默认值
+
+        Args:
+            connect_timeout: 连接超时（秒）
+            read_timeout: 读取超时（秒）
+            retries: 失败后的最大重试次数
+        """
+        changes = {}
+        if connect_timeout is not None:
+            changes['connect_timeout'] = connect_timeout
+        if read_timeout is not None:
+            changes['read_timeout'] = read_timeout
+        if retries is not None:
+            changes['max_attempts'] = retries + 1
+        config = cls(RetryPolicy().replace(**changes))
+        # 显式指定的读取超时对所有步骤生效
+        if read_timeout is not None:
+            for step_changes in config.overrides.values():
+                step_changes.pop('read_timeout', None)
+        return config
+
+    def for_step(self, step):
+        """获取步骤对应的策略"""
+        policy = self._cache.get(step)
+        if policy is None:
+            changes = self.overrides.get(step)
+            if changes is None:
+                changes = self.overrides.get(step.split('.', 1)[0], {})
+            policy = self.default.replace(**changes) if changes else self.default
+            self._cache[step] = policy
+        return policy
@@ -7,15 +7,85 @@ Usage:
     python ruijie_cli.py logout
     python ruijie_cli.py status
     python ruijie_cli.py info
+    python ruijie_cli.py --output json status
     python ruijie_cli.py --help
 
 Author: SkyRain <admin@misakacloud.net>
 """
 
 import sys
+import time
 import argparse
-from .ruijie_client import RuijieClient
-from .config import Config, get_error_message, print_status_info, print_account_info, resolve_service_name, interactive_service_selection
+from .config import Config, ConfigFileError, CommandOutput, OUTPUT_FORMATS, get_error_message, print_status_info, print_account_info, print_fleet_summary, print_batch_status, print_vault_accounts, print_circuit_states, circuit_states_to_dicts, resolve_service_name, interactive_service_selection
+
+
+# 结束时把记录的指标写入状态文件的命令：改变登录状态的命令，以及更新 ysunetlogin_online 的 status
+# （含 --batch 的各步骤耗时）；info 等其他只读命令不写，避免每次冷启动都加锁重写 metrics.json。
+# daemon 与 agent 在每次检查/请求后自行写入
+METRICS_COMMANDS = ('login', 'logout', 'status', 'fleet')
+
+
+def _dns_pin(value):
+    """解析 --resolve HOST=IP[,IP...] 参数"""
+    from .dns_cache import parse_pins
+    try:
+        parse_pins([value])
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def create_client(config):
+    """创建客户端（延迟导入，使 --help 等不需要网络的操作无需加载requests）"""
+    from .ruijie_client import RuijieClient
+    return RuijieClient(**config.get_client_config())
+
+
+# 只能在进程内生效的选项，指定时不使用常驻代理
+# （影响客户端的配置由 Config.client_fingerprint 与代理的配置比较，不一致时同样在进程内执行）
+AGENT_INCOMPATIBLE_OPTIONS = ('trace',)
+
+
+def call_agent(args, config, method, **params):
+    """
+    通过常驻代理执行命令
+
+    Returns:
+        代理返回的结果，代理未启用、未运行或不支持该命令时返回None（由调用方回退到进程内执行）
+
+    Raises:
+        AgentError: 代理执行命令失败
+    """
+    if not config.use_agent or any(getattr(args, option, None) not in (None, False)
+                                   for option in AGENT_INCOMPATIBLE_OPTIONS):
+        return None
+    
+    from .agent import AgentClient, AgentUnavailable
+    
+    agent = AgentClient(config.agent_socket, fingerprint=config.client_fingerprint())
+    try:
+        result = agent.call(method, **params)
+    except AgentUnavailable as e:
+        if config.verbose:
+            print(f"[DEBUG] {e}, running in-process")
+        return None
+    finally:
+        config.output.timings = agent.last_timings
+    if config.verbose:
+        print(f"[DEBUG] Served by agent at {agent.path}")
+    return result
+
+
+def report_error(config, command, error):
+    """输出命令执行失败的信息，返回退出码"""
+    if config.output.structured:
+        config.output.result(command, error=error)
+    else:
+        print(f"Error: {get_error_message(error) if isinstance(error, Exception) else error}")
+    if config.verbose and isinstance(error, Exception):
+        import traceback
+        traceback.print_exc()
+    return 1
 
 
 def cmd_login(args, config):
@@ -27,9 +97,6 @@ def cmd_login(args, config):
     if not config.validate_credentials():
         config.get_credentials_interactive()
     
-    # 创建客户端
-    client = RuijieClient(**config.get_client_config())
-    
     try:
         # 处理服务选择
         service_name = config.service
@@ -38,17 +105,31 @@ def cmd_login(args, config):
         if hasattr(args, 'service') and args.service is not None:
             if args.service == "":
                 # -s 选项没有提供参数，列出可用服务并让用户选择
+                if config.output.structured:
+                    # 机器可读模式下只输出服务列表，不交互、不登录
+                    services_data = create_client(config).get_available_services(config.username, config.password)
+                    config.output.result('login', {'services': services_data})
+                    return 0
                 print("Fetching available services...")
+                client = create_client(config)
                 services_data = client.get_available_services(config.username, config.password)
-                service_name = interactive_service_selection(services_data)
-                # 清空 Cookie 以避免重复登陆
-                client.client.cookies.clear()
+                service_name = interactive_service_selection(services_data, config)
             else:
                 # 解析用户提供的服务名称
                 service_name = resolve_service_name(args.service, config)
         
-        # 执行登录
-        success = client.login(config.username, config.password, service_name)
+        # 执行登录（常驻代理运行时由代理执行）
+        result = call_agent(args, config, 'login', username=config.username,
+                            password=config.password, service=service_name)
+        if result is not None:
+            success = result['success']
+        else:
+            success = create_client(config).login(config.username, config.password, service_name)
+        if config.output.structured:
+            config.output.result('login', {'success': bool(success), 'username': config.username,
+                                           'service': service_name},
+                                 error=None if success else "Login failed")
+            return 0 if success else 1
         if success:
             print(f"Login successful to service: {service_name}")
             return 0
@@ -56,21 +137,23 @@ def cmd_login(args, config):
             print("Login failed.")
             return 1
     except Exception as e:
-        print(f"Error: {get_error_message(e)}")
-        if config.verbose:
-            import traceback
-            traceback.print_exc()
-        return 1
+        return report_error(config, 'login', e)
 
 
 def cmd_logout(args, config):
     """执行登出命令"""
     config.update_from_args(args)
     
-    client = RuijieClient(**config.get_client_config())
-    
     try:
-        success = client.logout()
+        result = call_agent(args, config, 'logout')
+        if result is not None:
+            success = result['success']
+        else:
+            success = create_client(config).logout()
+        if config.output.structured:
+            config.output.result('logout', {'success': bool(success)},
+                                 error=None if success else "Logout failed")
+            return 0 if success else 1
         if success:
             print("Logout successful.")
             return 0
@@ -78,55 +161,120 @@ def cmd_logout(args, config):
             print("Logout failed.")
             return 1
     except Exception as e:
-        print(f"Error: {get_error_message(e)}")
-        if config.verbose:
-            import traceback
-            traceback.print_exc()
-        return 1
+        return report_error(config, 'logout', e)
 
 
 def cmd_status(args, config):
     """检查登录状态"""
     config.update_from_args(args)
     
-    client = RuijieClient(**config.get_client_config())
+    if getattr(args, 'batch', None):
+        return cmd_batch_status(args, config)
     
     try:
-        is_logged_in, info = client.check_login_status()
+        result = call_agent(args, config, 'status')
+        if result is not None:
+            is_logged_in, info, circuits = result['logged_in'], result['info'], result['circuits']
+        else:
+            client = create_client(config)
+            is_logged_in, info = client.check_login_status()
+            circuits = client.circuits.states()
+        
+        if config.output.structured:
+            config.output.result('status', {
+                'logged_in': is_logged_in,
+                'user_info': info if is_logged_in else None,
+                'circuits': circuit_states_to_dicts(circuits),
+            })
+            return 0
         
         if is_logged_in:
             print_status_info(info)
-            return 0
         else:
             print("Offline")
-            return 0
+        
+        # 门户不可达或刚恢复时显示熔断器状态
+        print_circuit_states(circuits, show_closed=config.verbose)
+        return 0
     except Exception as e:
-        print(f"Error: {get_error_message(e)}")
-        if config.verbose:
-            import traceback
-            traceback.print_exc()
-        return 1
+        return report_error(config, 'status', e)
+
+
+def cmd_batch_status(args, config):
+    """并发查询多台机器的在线状态"""
+    from .fleet import load_status_targets, run_batch_status, DEFAULT_STATUS_CONCURRENCY
+    
+    try:
+        targets = load_status_targets(args.batch)
+    except Exception as e:
+        return report_error(config, 'status', f"Failed to load hosts file: {e}")
+    
+    # 未单独配置代理或源地址的机器使用全局代理
+    global_proxy = config.proxies.get('https') or config.proxies.get('http')
+    for target in targets:
+        if not target.proxy and not target.source_address and global_proxy:
+            target.proxy = global_proxy
+    
+    # ndjson 在每台机器查询完成时立即输出一行
+    on_result = None
+    if config.output.format == 'ndjson':
+        on_result = lambda r: config.output.record(r.to_dict())
+    
+    start = time.perf_counter()
+    results = run_batch_status(targets, concurrency=args.concurrency or DEFAULT_STATUS_CONCURRENCY,
+                               portal_base=config.portal_base, verbose=config.verbose, tracer=config.tracer,
+                               retry=config.get_retry_config(), on_result=on_result,
+                               resolver=config.get_resolver())
+    wall_time = time.perf_counter() - start
+    
+    summary = {
+        'total': len(results),
+        'online': sum(1 for r in results if r.logged_in),
+        'offline': sum(1 for r in results if r.logged_in is False),
+        'errors': sum(1 for r in results if r.error),
+        'wall_time': round(wall_time, 3),
+        'serial_time': round(sum(r.elapsed for r in results), 3),
+    }
+    error = f"{summary['errors']} of {len(results)} hosts could not be probed" if summary['errors'] else None
+    
+    if config.output.format == 'ndjson':
+        config.output.result('status', summary, error=error)
+    elif config.output.structured:
+        config.output.result('status', dict(hosts=[r.to_dict() for r in results], **summary), error=error)
+    else:
+        print_batch_status(results, wall_time)
+    return 1 if error else 0
 
 
 def cmd_info(args, config):
     """获取账户信息"""
     config.update_from_args(args)
     
-    client = RuijieClient(**config.get_client_config())
-    
     try:
-        # 首先检查是否已登录
-        is_logged_in, user_info = client.check_login_status()
+        result = call_agent(args, config, 'info')
+        if result is not None:
+            is_logged_in = result['logged_in']
+            user_info, account_info = result.get('user_info'), result.get('account_info')
+        else:
+            # 首先检查是否已登录
+            client = create_client(config)
+            is_logged_in, user_info = client.check_login_status()
         
         if not is_logged_in:
+            if config.output.structured:
+                config.output.result('info', {'logged_in': False}, error="Not logged in")
+                return 1
             print("Error: Not logged in. Please login first.")
             return 1
         
-        # 获取会话信息
-        session_info = client.redirect_to_portal()
+        if result is None:
+            # 获取账户信息（优先使用缓存的会话信息）
+            account_info, _ = client.call_with_session(client.get_account_info)
         
-        # 获取账户信息
-        account_info = client.get_account_info(session_info)
+        if config.output.structured:
+            config.output.result('info', {'logged_in': True, 'user_info': user_info,
+                                          'account_info': account_info})
+            return 0
         
         # 打印用户状态信息
         print_status_info(user_info)
@@ -138,11 +286,237 @@ def cmd_info(args, config):
         return 0
         
     except Exception as e:
-        print(f"Error: {get_error_message(e)}")
-        if config.verbose:
-            import traceback
-            traceback.print_exc()
-        return 1
+        return report_error(config, 'info', e)
+
+
+def cmd_fleet(args, config):
+    """批量登录多个账户"""
+    from .fleet import load_accounts, parse_accounts, run_fleet_login, fill_passwords, DEFAULT_CONCURRENCY
+    from .vault import VaultError
+    
+    config.update_from_args(args)
+    
+    resolver = lambda name: resolve_service_name(name, config)
+    if args.accounts_file:
+        warnings = []
+        try:
+            accounts, file_concurrency = load_accounts(args.accounts_file, service_resolver=resolver, warnings=warnings)
+        except Exception as e:
+            return report_error(config, 'fleet', f"Failed to load accounts file: {e}")
+        for warning in warnings:
+            print(f"Warning: {warning}")
+    elif config.accounts:
+        # 使用配置文件中的 [[accounts]]
+        accounts = parse_accounts(config.accounts, config.service, resolver)
+        file_concurrency = config.fleet_concurrency
+    else:
+        return report_error(config, 'fleet', "No accounts file given and no [[accounts]] in the config files")
+    
+    # 未在文件中配置密码的账户从凭据库读取（只解锁一次）
+    vault = config.get_vault()
+    if any(not account.password and account.username in vault for account in accounts):
+        try:
+            fill_passwords(accounts, config.unlock_vault())
+        except VaultError as e:
+            return report_error(config, 'fleet', str(e))
+    
+    # 未单独配置代理的账户使用全局代理
+    global_proxy = config.proxies.get('https') or config.proxies.get('http')
+    for account in accounts:
+        if not account.proxy and global_proxy:
+            account.proxy = global_proxy
+    
+    concurrency = args.concurrency or file_concurrency or DEFAULT_CONCURRENCY
+    
+    start = time.perf_counter()
+    results = run_fleet_login(accounts, concurrency=concurrency, portal_base=config.portal_base,
+                              verbose=config.verbose, tracer=config.tracer, retry=config.get_retry_config(),
+                              resolver=config.get_resolver())
+    wall_time = time.perf_counter() - start
+    succeeded = sum(1 for r in results if r.success)
+    error = None if succeeded == len(results) else f"{len(results) - succeeded} of {len(results)} logins failed"
+    
+    if config.output.format == 'ndjson':
+        # 每个账户一行，最后一行为汇总
+        for r in results:
+            config.output.record(r.to_dict())
+        config.output.result('fleet', {'succeeded': succeeded, 'total': len(results),
+                                       'wall_time': round(wall_time, 3)}, error=error)
+    elif config.output.structured:
+        config.output.result('fleet', {'accounts': [r.to_dict() for r in results], 'succeeded': succeeded,
+                                       'total': len(results), 'wall_time': round(wall_time, 3)}, error=error)
+    else:
+        print_fleet_summary(results, wall_time)
+    return 0 if succeeded == len(results) else 1
+
+
+def cmd_creds(args, config):
+    """管理加密凭据库中的账户"""
+    from .vault import VaultError, get_passphrase
+    
+    config.update_from_args(args)
+    vault = config.get_vault()
+    
+    try:
+        if args.creds_command == 'list':
+            usernames = vault.usernames()
+            if config.output.structured:
+                config.output.result('creds', {'vault': vault.path, 'accounts': usernames})
+            else:
+                print_vault_accounts(usernames, vault.path)
+            return 0
+        
+        if args.creds_command == 'rm':
+            if not vault.remove(args.username):
+                return report_error(config, 'creds', f"No account {args.username} in {vault.path}")
+            vault.save()
+            message = f"Removed {args.username} from {vault.path}"
+        else:
+            if vault.exists():
+                config.unlock_vault()
+            else:
+                vault.create(get_passphrase(confirm=True))
+            password = args.password
+            if not password:
+                import getpass
+                password = getpass.getpass(f"Password for {args.username}: ")
+            if not password:
+                return report_error(config, 'creds', "Password must not be empty")
+            vault.set(args.username, password)
+            vault.save()
+            message = f"Saved {args.username} to {vault.path}"
+    except (VaultError, KeyboardInterrupt, EOFError) as e:
+        return report_error(config, 'creds', str(e) or "Operation cancelled.")
+    
+    if config.output.structured:
+        config.output.result('creds', {'vault': vault.path, 'username': args.username})
+    else:
+        print(message)
+    return 0
+
+
+def cmd_daemon(args, config):
+    """运行保活守护进程"""
+    import signal
+    from .daemon import KeepAliveDaemon
+    
+    config.update_from_args(args)
+    
+    if not config.validate_credentials():
+        config.get_credentials_interactive()
+    
+    if args.min_interval <= 0 or args.max_interval <= 0:
+        return report_error(config, 'daemon', "Polling intervals must be positive.")
+    
+    # 守护进程的事件不附带步骤耗时，未指定 --trace 时不记录（避免长期运行时Span无限增长）
+    if not args.trace:
+        config.tracer = None
+    client = create_client(config)
+    daemon = KeepAliveDaemon(
+        client, config.username, config.password,
+        service=resolve_service_name(args.service, config),
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        output=config.output,
+        flush_metrics=config.flush_metrics,
+    )
+    
+    # SIGTERM（如systemd停止服务）时优雅退出
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+def cmd_agent(args, config):
+    """运行常驻代理，或停止正在运行的代理"""
+    import signal
+    from .agent import ResidentAgent, AgentClient, AgentUnavailable, AgentError
+    
+    config.update_from_args(args)
+    
+    if args.stop:
+        try:
+            AgentClient(config.agent_socket).call('shutdown')
+        except (AgentUnavailable, AgentError) as e:
+            return report_error(config, 'agent', e)
+        if config.output.structured:
+            config.output.result('agent', {'stopping': True})
+        else:
+            print("Agent stopping.")
+        return 0
+    
+    # 记录每个请求的步骤耗时，随响应返回给命令行
+    if config.tracer is None:
+        from .tracing import Tracer
+        config.tracer = Tracer()
+    agent = ResidentAgent(create_client(config), path=config.agent_socket, verbose=config.verbose,
+                          output=config.output, flush_metrics=config.flush_metrics,
+                          fingerprint=config.client_fingerprint())
+    
+    # SIGTERM（如systemd停止服务）时优雅退出
+    signal.signal(signal.SIGTERM, lambda signum, frame: agent.stop())
+    
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except (RuntimeError, OSError) as e:
+        return report_error(config, 'agent', e)
+    return 0
+
+
+def cmd_metrics(args, config):
+    """输出登录健康与延迟指标，或以HTTP提供给 Prometheus 抓取"""
+    from .metrics import create_server, parse_listen_address, write_textfile
+    
+    config.update_from_args(args)
+    store = config.get_metrics_store()
+    
+    if args.textfile:
+        try:
+            write_textfile(store.load(), args.textfile)
+        except OSError as e:
+            return report_error(config, 'metrics', f"Failed to write {args.textfile}: {e}")
+        if config.output.structured:
+            config.output.result('metrics', {'textfile': args.textfile})
+        return 0
+    
+    if not args.listen:
+        if config.output.structured:
+            config.output.result('metrics', store.load().to_dict())
+        else:
+            sys.stdout.write(store.load().render())
+        return 0
+    
+    import signal
+    import threading
+    
+    try:
+        host, port = parse_listen_address(args.listen)
+        server = create_server(store, host, port,
+                               log=(lambda message: print(f"[DEBUG] {message}")) if config.verbose else None)
+    except (ValueError, OSError) as e:
+        return report_error(config, 'metrics', e)
+    
+    # SIGTERM（如systemd停止服务）时优雅退出，shutdown() 需要在其他线程中调用
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    
+    address = f"{host or '0.0.0.0'}:{server.server_address[1]}"
+    if config.output.structured:
+        config.output.record({'event': 'started', 'listen': address, 'path': store.path})
+    else:
+        print(f"Serving metrics on http://{address}/metrics", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
 
 
 def create_parser():
@@ -157,12 +531,41 @@ Examples:
   %(prog)s status
   %(prog)s logout
   %(prog)s info
+  %(prog)s creds add 1145141919810    # store the password in the encrypted vault
+  %(prog)s fleet login accounts.toml -j 8
+  %(prog)s status --batch hosts.txt   # which lab machines are online
+  %(prog)s daemon --min-interval 5 --max-interval 300
+  %(prog)s agent &                    # later status/info/login/logout calls use it
+  %(prog)s --trace login.json login   # open in chrome://tracing or Perfetto
+  %(prog)s --output json status       # machine-readable result with step timings
+  %(prog)s metrics --listen :9184     # Prometheus endpoint for login health and latency
+
+Config Files (merged in order, then environment variables, then options):
+  /etc/ysunetlogin/config.toml, $XDG_CONFIG_HOME/ysunetlogin/config.toml,
+  the nearest ysunetlogin.toml in the current or a parent directory (up to $HOME or the
+  repository root; files owned by other users are ignored), --config FILE
 
 Environment Variables:
   RUIJIE_USERNAME     Default username
   RUIJIE_PASSWORD     Default password
   RUIJIE_VERBOSE      Enable verbose output (1/true/yes)
   RUIJIE_SERVICE      Service name (default: 校园网)
+  RUIJIE_DEBUG_NODES  Log portal workflow nodes during login (1/true/yes)
+  RUIJIE_PORTAL_BASE  Portal base URL (default: https://auth1.ysu.edu.cn)
+  RUIJIE_SESSION_CACHE  Session cache file path (0/false/no to disable)
+  RUIJIE_AGENT        Use a running agent when available (0/false/no to disable)
+  RUIJIE_AGENT_SOCKET Agent socket path (default: $XDG_RUNTIME_DIR/ysunetlogin/agent.sock)
+  RUIJIE_TIMEOUT      Read timeout per request in seconds (default: 10)
+  RUIJIE_CONNECT_TIMEOUT  Connect timeout in seconds (default: 5)
+  RUIJIE_RETRIES      Retries per request after a failure (default: 2)
+  RUIJIE_METRICS      Metrics state file path (0/false/no to disable)
+  RUIJIE_METRICS_TEXTFILE  Also write metrics to this .prom file (node_exporter textfile collector)
+  RUIJIE_CONFIG       Extra config file (same as --config)
+  RUIJIE_VAULT        Credential vault path (default: $XDG_CONFIG_HOME/ysunetlogin/credentials.vault)
+  RUIJIE_VAULT_PASSPHRASE  Vault passphrase (prompted if unset)
+  RUIJIE_DNS_CACHE    DNS cache file path (0/false/no to disable)
+  RUIJIE_DNS_TTL      Seconds a cached DNS result stays fresh (default: 600)
+  RUIJIE_DNS_PINS     Static addresses, e.g. "auth1.ysu.edu.cn=IP[,IP] cer.ysu.edu.cn=IP"
   HTTP_PROXY          HTTP proxy URL
   HTTPS_PROXY         HTTPS proxy URL
         """
@@ -173,12 +576,43 @@ Environment Variables:
                        help='Enable verbose output')
     parser.add_argument('--proxy', metavar='URL',
                        help='Proxy URL (e.g., socks5://127.0.0.1:1080)')
+    parser.add_argument('--trace', metavar='FILE',
+                       help='Record per-request timings and write them to FILE')
+    parser.add_argument('--trace-format', choices=['chrome', 'jsonl'],
+                       help='Trace file format (default: jsonl for .jsonl/.ndjson, chrome otherwise)')
+    parser.add_argument('--debug-nodes', action='store_true',
+                       help='Query and log the portal workflow node after each login step (extra requests)')
+    parser.add_argument('--no-session-cache', action='store_true',
+                       help='Do not read or write the cached portal session')
+    parser.add_argument('--no-agent', action='store_true',
+                       help='Run in-process even if a resident agent is running')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                       help='Read timeout per request (default: 10)')
+    parser.add_argument('--connect-timeout', type=float, metavar='SECONDS',
+                       help='Connect timeout per request (default: 5)')
+    parser.add_argument('--retries', type=int, metavar='N',
+                       help='Retries per request after a network error or 5xx (default: 2; '
+                            'non-idempotent requests are only retried if no connection was made)')
+    parser.add_argument('--resolve', action='append', type=_dns_pin, metavar='HOST=IP[,IP]',
+                       help='Connect to HOST at the given addresses without a DNS lookup (repeatable)')
+    parser.add_argument('--no-dns-cache', action='store_true',
+                       help='Resolve portal hosts on every run instead of using the DNS cache')
+    parser.add_argument('--config', metavar='FILE',
+                       help='Extra config file merged over the system, user and project config files')
+    parser.add_argument('-o', '--output', choices=OUTPUT_FORMATS, default='text',
+                       help='Output format: text, json (one document) or ndjson (one record per line); '
+                            'structured output includes per-step timings')
+    
+    # 子命令也接受 --output（如 `status --output json`），未指定时不覆盖全局选项
+    output_parent = argparse.ArgumentParser(add_help=False)
+    output_parent.add_argument('-o', '--output', choices=OUTPUT_FORMATS, default=argparse.SUPPRESS,
+                              help='Output format (same as the global --output)')
     
     # 子命令
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # login 命令
-    login_parser = subparsers.add_parser('login', help='Login to network')
+    login_parser = subparsers.add_parser('login', help='Login to network', parents=[output_parent])
     login_parser.add_argument('-u', '--username', metavar='USERNAME',
                              help='Username for authentication')
     login_parser.add_argument('-p', '--password', metavar='PASSWORD',
@@ -187,13 +621,73 @@ Environment Variables:
                              help='Service name. Use -s without argument to list available services. Supports aliases: campus/1=校园网, unicom/2=中国联通, telecom/3=中国电信, mobile/4=中国移动')
     
     # logout 命令
-    logout_parser = subparsers.add_parser('logout', help='Logout from network')
+    logout_parser = subparsers.add_parser('logout', help='Logout from network', parents=[output_parent])
     
     # status 命令
-    status_parser = subparsers.add_parser('status', help='Check login status')
+    status_parser = subparsers.add_parser('status', help='Check login status', parents=[output_parent])
+    status_parser.add_argument('--batch', metavar='HOSTS_FILE',
+                               help='Probe every host listed in the file (one per line: NAME [proxy=URL] [source=IP])')
+    status_parser.add_argument('-j', '--concurrency', type=int, metavar='N',
+                               help='Maximum concurrent probes with --batch (default: 32)')
     
     # info 命令
-    info_parser = subparsers.add_parser('info', help='Show account information')
+    info_parser = subparsers.add_parser('info', help='Show account information', parents=[output_parent])
+    
+    # daemon 命令
+    daemon_parser = subparsers.add_parser('daemon', help='Keep the connection alive, re-login on drop',
+                                          parents=[output_parent])
+    daemon_parser.add_argument('-u', '--username', metavar='USERNAME',
+                              help='Username for authentication')
+    daemon_parser.add_argument('-p', '--password', metavar='PASSWORD',
+                              help='Password for authentication')
+    daemon_parser.add_argument('-s', '--service', metavar='SERVICE',
+                              help='Service name or alias (campus/unicom/telecom/mobile)')
+    daemon_parser.add_argument('--min-interval', type=float, default=5.0, metavar='SECONDS',
+                              help='Polling interval after a drop or failure (default: 5)')
+    daemon_parser.add_argument('--max-interval', type=float, default=300.0, metavar='SECONDS',
+                              help='Longest polling interval while stable (default: 300)')
+    
+    # agent 命令
+    agent_parser = subparsers.add_parser('agent', help='Run a resident agent that serves CLI calls over a Unix socket',
+                                         parents=[output_parent])
+    agent_parser.add_argument('--socket', metavar='PATH',
+                             help='Socket path (default: $XDG_RUNTIME_DIR/ysunetlogin/agent.sock)')
+    agent_parser.add_argument('--stop', action='store_true',
+                             help='Stop the running agent')
+    
+    # metrics 命令
+    metrics_parser = subparsers.add_parser('metrics', help='Export login health and latency metrics (Prometheus format)',
+                                           parents=[output_parent])
+    metrics_parser.add_argument('--listen', metavar='[HOST:]PORT', nargs='?', const=':9184',
+                               help='Serve metrics over HTTP for Prometheus (default: :9184)')
+    metrics_parser.add_argument('--textfile', metavar='PATH',
+                               help='Write metrics to PATH for the node_exporter textfile collector')
+    
+    # creds 命令
+    creds_parser = subparsers.add_parser('creds', help='Manage passwords in the encrypted credential vault')
+    creds_subparsers = creds_parser.add_subparsers(dest='creds_command', help='Credential commands')
+    vault_parent = argparse.ArgumentParser(add_help=False)
+    vault_parent.add_argument('--vault', metavar='PATH',
+                              help='Vault file (default: $XDG_CONFIG_HOME/ysunetlogin/credentials.vault)')
+    creds_add_parser = creds_subparsers.add_parser('add', help='Add or update an account',
+                                                   parents=[output_parent, vault_parent])
+    creds_add_parser.add_argument('username', metavar='USERNAME')
+    creds_add_parser.add_argument('-p', '--password', metavar='PASSWORD',
+                                  help='Password (prompted if omitted)')
+    creds_subparsers.add_parser('list', help='List stored accounts', parents=[output_parent, vault_parent])
+    creds_rm_parser = creds_subparsers.add_parser('rm', help='Remove an account',
+                                                  parents=[output_parent, vault_parent])
+    creds_rm_parser.add_argument('username', metavar='USERNAME')
+    
+    # fleet 命令
+    fleet_parser = subparsers.add_parser('fleet', help='Manage many accounts at once')
+    fleet_subparsers = fleet_parser.add_subparsers(dest='fleet_command', help='Fleet commands')
+    fleet_login_parser = fleet_subparsers.add_parser('login', help='Login all accounts listed in a TOML file',
+                                                   parents=[output_parent])
+    fleet_login_parser.add_argument('accounts_file', metavar='ACCOUNTS_FILE', nargs='?',
+                                   help='TOML file with [[accounts]] entries (default: [[accounts]] in the config files)')
+    fleet_login_parser.add_argument('-j', '--concurrency', type=int, metavar='N',
+                                   help='Maximum number of concurrent logins (default: 4)')
     
     return parser
 
@@ -208,10 +702,33 @@ def main():
         parser.print_help()
         return 1
     
-    # 创建配置对象
-    config = Config()
+    # 创建配置对象（配置文件 < 环境变量 < 命令行参数）
+    try:
+        config = Config(args.config)
+    except ConfigFileError as e:
+        print(f"Error: {e}")
+        return 1
+    
+    # 机器可读输出附带各步骤耗时，同样需要追踪器
+    if args.trace or args.output != 'text':
+        from .tracing import Tracer
+        config.tracer = Tracer()
+    config.output = CommandOutput(args.output, config.tracer)
     
-    # 根据命令执行相应操作
+    try:
+        return run_command(parser, args, config)
+    finally:
+        if args.command in METRICS_COMMANDS:
+            config.flush_metrics()
+        if args.trace:
+            try:
+                config.tracer.export(args.trace, args.trace_format)
+            except OSError as e:
+                print(f"Error: Failed to write trace file: {e}")
+
+
+def run_command(parser, args, config):
+    """根据命令执行相应操作"""
     if args.command == 'login':
         return cmd_login(args, config)
     elif args.command == 'logout':
@@ -220,6 +737,16 @@ def main():
         return cmd_status(args, config)
     elif args.command == 'info':
         return cmd_info(args, config)
+    elif args.command == 'daemon':
+        return cmd_daemon(args, config)
+    elif args.command == 'agent':
+        return cmd_agent(args, config)
+    elif args.command == 'metrics':
+        return cmd_metrics(args, config)
+    elif args.command == 'fleet' and args.fleet_command == 'login':
+        return cmd_fleet(args, config)
+    elif args.command == 'creds' and args.creds_command:
+        return cmd_creds(args, config)
     else:
         parser.print_help()
         return 1
@@ -1,30 +1,184 @@
 import requests
 import time
-import base64
-import json
-import functools
-import inspect
 from urllib.parse import urlparse, parse_qs
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad
-from bs4 import BeautifulSoup
-from . import ysu_login
+from .tracing import trace_step
+from .html_extract import find_text_by_id
+from .transport import mount_portal_adapter
+from .login_flow import LoginFlow
+from .retry import RetryConfig
+from .circuit import CircuitBreakers
+from .crypto import aes_ecb_encrypt_many
+from . import metrics
+
+
+def _unwrap_api_data(data):
+    """
+    解包门户接口的JSON响应
+
+    Args:
+        data: 响应JSON字典
+
+    Returns:
+        data字段内容，code不为200时抛出ValueError
+    """
+    if data.get("code") == 200:
+        return data.get("data")
+    raise ValueError(f"API error: {data.get('message')}")
+
+
+def _parse_query_params(url):
+    """解析URL查询参数，只保留每个参数的第一个值"""
+    request_params = parse_qs(urlparse(url).query)
+    return {k: v[0] for k, v in request_params.items()}
+
+
+def _build_cas_sso_url(session_info, portal_base="https://auth1.ysu.edu.cn"):
+    """
+    构造cas-sso登录页URL
+
+    Args:
+        session_info: 会话信息字典
+        portal_base: 认证门户根地址
+
+    Returns:
+        cas-sso登录页URL字符串
+    """
+    timer = str(int(time.time() * 1000))
+    return (
+        f"{portal_base}/cas-sso/login?"
+        f"flowSessionId={session_info.get('sessionId', '')}"
+        f"&customPageId={session_info.get('customPageId', '')}"
+        f"&preview=false&appType=normal&language=zh-CN"
+        f"&mode={session_info.get('mode', '')}&timer={timer}"
+        f"&nasIp={session_info.get('nasIp', '')}&userIp={session_info.get('userIp', '')}"
+        f"&ssid={session_info.get('ssid', '')}"
+    )
+
+
+def _parse_cas_sso_page(html):
+    """
+    从cas-sso登录页提取croypto和execution
+
+    Args:
+        html: 登录页HTML
+
+    Returns:
+        tuple: (croypto, execution)
+    """
+    # 直接定位目标标签，页面结构变化导致找不到时回退到BeautifulSoup
+    croypto = find_text_by_id(html, 'login-croypto', 'p')
+    execution = find_text_by_id(html, 'login-page-flowkey', 'p')
+    if croypto is not None and execution is not None:
+        return croypto, execution
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    croypto_el = soup.find('p', {'id': 'login-croypto'})
+    flowkey_el = soup.find('p', {'id': 'login-page-flowkey'})
+
+    if not croypto_el or not flowkey_el:
+        raise Exception("Failed to extract croypto/flowkey from cas-sso page")
+
+    return croypto_el.get_text(strip=True), flowkey_el.get_text(strip=True)
+
+
+def _parse_cas_sso_error(html):
+    """从cas-sso登录响应中提取错误信息，没有时返回None"""
+    error_message = find_text_by_id(html, 'errorMessage')
+    if error_message is not None:
+        return error_message
+
+    from bs4 import BeautifulSoup
+
+    error_soup = BeautifulSoup(html, 'html.parser')
+    error_el = error_soup.find(id='errorMessage')
+    if error_el:
+        return error_el.get_text(strip=True)
+    return None
+
+
+def _build_cas_sso_form(username, execution, croypto, encrypted_password, encrypted_captcha):
+    """构造cas-sso登录表单"""
+    return {
+        'username': username,
+        'type': 'UsernamePassword',
+        '_eventId': 'submit',
+        'geolocation': '',
+        'execution': execution,
+        'captcha_code': '',
+        'croypto': croypto,
+        'password': encrypted_password,
+        'captcha_payload': encrypted_captcha,
+    }
+
+
+def _verify_login_result(login_result, online_status):
+    """
+    检查服务登录结果和在线状态，失败时抛出异常
+
+    Args:
+        login_result: serviceLogin响应
+        online_status: userOnline响应数据
+    """
+    if login_result.get('code') == 200 and login_result.get('data'):
+        auth_result = login_result['data'].get('authResult')
+        if auth_result == 'fail':
+            auth_message = login_result['data'].get('authMessage', 'Unknown authentication error')
+            raise Exception(f"Authentication failed: {auth_message}")
+        elif auth_result != 'success':
+            raise Exception(f"Unexpected authentication result: {auth_result}")
+    else:
+        raise Exception(f"Invalid service login response: {login_result}")
+
+    if not online_status.get('online', False):
+        error_message = online_status.get('message', 'User is not online after authentication')
+        raise Exception(f"Login verification failed: {error_message}")
 
 
 class RuijieClient:
     """燕山大学锐捷V2网络认证客户端"""
     
-    def __init__(self, proxies=None, verbose=False):
+    # 认证门户根地址
+    PORTAL_BASE = "https://auth1.ysu.edu.cn"
+    
+    def __init__(self, proxies=None, verbose=False, session_cache=None, debug_nodes=False, portal_base=None,
+                 tracer=None, checkpoint_store=None, retry=None, circuits=None, source_address=None, resolver=None):
         """
         初始化锐捷客户端
         
         Args:
             proxies: 代理设置字典，格式如 {"http": "...", "https": "..."}
             verbose: 是否输出详细日志
-        """
+            session_cache: SessionCache对象，用于持久化会话信息，为None时不使用缓存
+            debug_nodes: 是否在各登录步骤后查询并输出工作流节点（额外的诊断请求）
+            portal_base: 认证门户根地址，默认为PORTAL_BASE（可指向本地模拟门户）
+            tracer: Tracer对象，用于记录每个请求各阶段的耗时
+            checkpoint_store: 登录检查点存储（SessionCache对象），使中断的登录可以跨进程续登，
+                              为None时检查点只保留在本客户端对象中
+            retry: RetryConfig对象，各请求步骤的超时与重试策略，为None时使用默认策略
+            circuits: CircuitBreakers对象，按主机熔断，为None时使用仅在本客户端内有效的熔断器
+            source_address: 出站连接绑定的本地IP地址，门户按来源IP识别机器，
+                            可据此查询本机上某个地址的在线状态
+            resolver: DNSCache对象，缓存门户主机的解析结果并支持固定地址，为None时直接使用系统解析
+        """
+        self.portal_base = (portal_base or self.PORTAL_BASE).rstrip('/')
         self.client = requests.Session()
         self.proxies = proxies or {}
         self.verbose = verbose
+        self.debug_nodes = debug_nodes
+        self.tracer = tracer
+        self.retry = retry or RetryConfig()
+        self.circuits = circuits or CircuitBreakers()
+        mount_portal_adapter(self.client, tracer,
+                             source_address=(source_address, 0) if source_address else None,
+                             resolver=resolver, log=self._log if verbose else None)
+        self.session_cache = session_cache
+        self.session_info = None
+        self._session_from_cache = False
+        self.checkpoint_store = checkpoint_store
+        self.login_checkpoint = None
         
         # 设置User-Agent
         self.client.headers.update({
@@ -33,29 +187,124 @@ class RuijieClient:
         
         if self.proxies:
             self.client.proxies.update(self.proxies)
+        
+        self._load_cached_session()
+    
+    def _load_cached_session(self):
+        """从会话缓存恢复Cookie和会话信息"""
+        if not self.session_cache:
+            return
+        
+        cached = self.session_cache.load()
+        if not cached:
+            return
+        
+        self.session_cache.restore_cookies(self.client.cookies, cached.get('cookies'))
+        self.session_info = cached['session_info']
+        self._session_from_cache = True
+        self._log(f"Loaded cached session: {self.session_info.get('sessionId')}")
+    
+    def _save_session(self, session_info):
+        """记录会话信息并写入会话缓存"""
+        self.session_info = session_info
+        self._session_from_cache = False
+        if not self.session_cache:
+            return
+        
+        try:
+            self.session_cache.save(session_info, self.client.cookies)
+        except OSError as e:
+            self._log(f"Failed to save session cache: {e}")
+    
+    def invalidate_session(self):
+        """丢弃已知的会话信息及其缓存"""
+        self.session_info = None
+        self._session_from_cache = False
+        if self.session_cache:
+            self.session_cache.clear()
+    
+    def get_session_info(self, refresh=False):
+        """
+        获取会话信息，优先使用已知（缓存）的会话
+        
+        Args:
+            refresh: 是否强制重新走门户重定向链
+            
+        Returns:
+            包含sessionId等参数的字典
+        """
+        if self.session_info and not refresh:
+            return self.session_info
+        
+        session_info = self.redirect_to_portal()
+        self._save_session(session_info)
+        return session_info
+    
+    def call_with_session(self, func):
+        """
+        使用会话信息调用接口，缓存的会话被服务端拒绝时重新获取会话后重试一次
+        
+        Args:
+            func: 接收session_info参数的方法
+            
+        Returns:
+            tuple: (func的返回值, 实际使用的session_info)
+        """
+        session_info = self.get_session_info()
+        if not self._session_from_cache:
+            return func(session_info), session_info
+        
+        try:
+            return func(session_info), session_info
+        except (ValueError, KeyError, requests.exceptions.HTTPError) as e:
+            self._log(f"Cached session rejected ({e}), falling back to portal redirect")
+            self.invalidate_session()
+            session_info = self.get_session_info(refresh=True)
+            return func(session_info), session_info
     
     def _log(self, message):
         """输出日志信息"""
         if self.verbose:
             print(f"[DEBUG] {message}")
     
-    def _aes_encrypt_ecb(self, key_b64, plaintext):
+    def _request(self, step, method, url, **kwargs):
         """
-        AES-ECB-PKCS7加密（cas-sso登录使用）
+        发送HTTP请求，按步骤对应的 RetryPolicy 设置超时并重试
 
+        目标主机的熔断器打开时直接抛出 CircuitOpenError；重试耗尽后的网络错误和5xx响应
+        计为一次失败。
+        
         Args:
-            key_b64: Base64编码的AES密钥
-            plaintext: 明文字符串
-
+            step: 流程步骤名称，用于请求追踪
+            method: HTTP方法
+            url: 请求URL
+            **kwargs: 传给requests的其他参数
+            
         Returns:
-            Base64编码的密文
-        """
-        key = base64.b64decode(key_b64)
-        cipher = AES.new(key, AES.MODE_ECB)
-        padded = pad(plaintext.encode('utf-8'), AES.block_size)
-        encrypted = cipher.encrypt(padded)
-        return base64.b64encode(encrypted).decode('utf-8')
-
+            requests.Response对象
+        """
+        policy = self.retry.for_step(step)
+        breaker = self.circuits.get(urlparse(url).hostname)
+        with trace_step(self.tracer, step):
+            breaker.before_call()
+            start = time.perf_counter()
+            try:
+                response = policy.run(
+                    lambda timeout: self.client.request(method, url, proxies=self.proxies, timeout=timeout, **kwargs),
+                    log=self._log,
+                )
+            except requests.RequestException:
+                breaker.record_failure()
+                raise
+            finally:
+                metrics.STEP_DURATION.observe(time.perf_counter() - start, step=step)
+        
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+    
     def _unwrap_response(self, response, json_response=False):
         """
         解包响应结果
@@ -70,10 +319,7 @@ class RuijieClient:
         response.raise_for_status()
         
         if json_response:
-            data = response.json()
-            if data.get("code") == 200:
-                return data.get("data")
-            raise ValueError(f"API error: {data.get('message')}")
+            return _unwrap_api_data(response.json())
         
         return response.json()
     
@@ -88,39 +334,34 @@ class RuijieClient:
             用户在线信息字典
         """
         timestamp = int(time.time() * 1000)
-        url = f"https://auth1.ysu.edu.cn/eportal/adaptor/getOnlineUserInfo?sessionId={session_id}&{timestamp}&version=this%20is%20a%20git-commit"
+        url = f"{self.portal_base}/eportal/adaptor/getOnlineUserInfo?sessionId={session_id}&{timestamp}&version=this%20is%20a%20git-commit"
         
-        response = self.client.get(url, proxies=self.proxies)
+        response = self._request("get_online_user_info", "GET", url)
         return self._unwrap_response(response, json_response=True)
     
-    def redirect_to_portal(self, redirect_url='https://auth1.ysu.edu.cn/eportal/redirect.jsp?mode=history'):
+    def redirect_to_portal(self, redirect_url=None):
         """
         重定向到门户网站获取会话信息
         
         Args:
-            redirect_url: 重定向URL
+            redirect_url: 重定向URL，默认为门户的redirect.jsp
             
         Returns:
             包含sessionId等参数的字典
         """
-        resp = self.client.get(redirect_url, allow_redirects=True, proxies=self.proxies)
+        redirect_url = redirect_url or f"{self.portal_base}/eportal/redirect.jsp?mode=history"
+        resp = self._request("redirect_to_portal.redirect", "GET", redirect_url, allow_redirects=True)
         
         # 处理JavaScript重定向
         if "location.href=" in resp.text:
             redirect_url_2 = resp.text.split("'")[1].split("'")[0]
-            resp = self.client.get(redirect_url_2, allow_redirects=True, proxies=self.proxies)
+            resp = self._request("redirect_to_portal.js_redirect", "GET", redirect_url_2, allow_redirects=True)
         
         if "portal-main" not in resp.request.url:
             raise Exception(f"Portal redirection failed. Expected URL to contain 'portal-main', but got: {resp.request.url}")
         
         # 解析URL参数
-        parsed_url = urlparse(resp.request.url)
-        request_params = parse_qs(parsed_url.query)
-        
-        # 移除列表包装，只保留第一个值
-        request_params = {k: v[0] for k, v in request_params.items()}
-        
-        return request_params
+        return _parse_query_params(resp.request.url)
     
     def _get_current_node(self, session_info, flowKey='portal_auth'):
         """
@@ -133,14 +374,13 @@ class RuijieClient:
         Returns:
             当前节点信息
         """
-        node_url = "https://auth1.ysu.edu.cn/eportal/workFlow/getCurrentNode"
-        response = self.client.post(
-            node_url,
+        node_url = f"{self.portal_base}/eportal/workFlow/getCurrentNode"
+        response = self._request(
+            "get_current_node", "POST", node_url,
             json={
                 "sessionId": session_info['sessionId'],
                 "flowKey": flowKey
-            },
-            proxies=self.proxies
+            }
         )
         
         node_resp = response.json()
@@ -149,6 +389,21 @@ class RuijieClient:
         
         return node_resp
     
+    def _debug_current_node(self, session_info):
+        """
+        诊断用：输出当前工作流节点
+        
+        门户并不要求查询节点，只有开启debug_nodes时才发出该请求，
+        默认的登录流程不为此多付出往返开销。
+        """
+        if not self.debug_nodes:
+            return
+        
+        try:
+            self._get_current_node(session_info)
+        except Exception as e:
+            self._log(f"Failed to get current node: {e}")
+    
     def cas_sso_login(self, username, password, session_info):
         """
         通过cas-sso直接登录（浏览器实际使用的流程）
@@ -161,63 +416,28 @@ class RuijieClient:
         Returns:
             bool: 登录是否成功
         """
-        session_id = session_info.get('sessionId', '')
-        custom_page_id = session_info.get('customPageId', '')
-        nas_ip = session_info.get('nasIp', '')
-        user_ip = session_info.get('userIp', '')
-        ssid = session_info.get('ssid', '')
-        mode = session_info.get('mode', '')
-
-        timer = str(int(time.time() * 1000))
-        cas_sso_url = (
-            f"https://auth1.ysu.edu.cn/cas-sso/login?"
-            f"flowSessionId={session_id}"
-            f"&customPageId={custom_page_id}"
-            f"&preview=false&appType=normal&language=zh-CN"
-            f"&mode={mode}&timer={timer}"
-            f"&nasIp={nas_ip}&userIp={user_ip}&ssid={ssid}"
-        )
+        cas_sso_url = _build_cas_sso_url(session_info, self.portal_base)
 
         # Step 1: GET cas-sso/login page to extract croypto and execution
         self._log(f"Fetching cas-sso login page...")
-        resp = self.client.get(cas_sso_url, proxies=self.proxies)
+        resp = self._request("cas_sso_login.fetch_page", "GET", cas_sso_url)
         resp.raise_for_status()
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        croypto_el = soup.find('p', {'id': 'login-croypto'})
-        flowkey_el = soup.find('p', {'id': 'login-page-flowkey'})
-
-        if not croypto_el or not flowkey_el:
-            raise Exception("Failed to extract croypto/flowkey from cas-sso page")
-
-        croypto = croypto_el.get_text(strip=True)
-        execution = flowkey_el.get_text(strip=True)
+        croypto, execution = _parse_cas_sso_page(resp.text)
         self._log(f"Got croypto: {croypto[:20]}..., execution length: {len(execution)}")
 
-        # Step 2: Encrypt password with AES-ECB
-        encrypted_password = self._aes_encrypt_ecb(croypto, password)
-        encrypted_captcha = self._aes_encrypt_ecb(croypto, '{}')
+        # Step 2: Encrypt password and captcha payload with AES-ECB (one cached cipher, one call)
+        encrypted_password, encrypted_captcha = aes_ecb_encrypt_many(croypto, password, '{}')
 
         # Step 3: POST login form
         post_url = cas_sso_url + "&accept-language=zh-CN"
-        form_data = {
-            'username': username,
-            'type': 'UsernamePassword',
-            '_eventId': 'submit',
-            'geolocation': '',
-            'execution': execution,
-            'captcha_code': '',
-            'croypto': croypto,
-            'password': encrypted_password,
-            'captcha_payload': encrypted_captcha,
-        }
+        form_data = _build_cas_sso_form(username, execution, croypto, encrypted_password, encrypted_captcha)
 
         self._log(f"Submitting cas-sso login form...")
-        resp = self.client.post(
-            post_url, data=form_data,
-            allow_redirects=True,
-            proxies=self.proxies
+        resp = self._request(
+            "cas_sso_login.submit", "POST", post_url,
+            data=form_data,
+            allow_redirects=True
         )
 
         self._log(f"Login response URL: {resp.url}")
@@ -229,10 +449,9 @@ class RuijieClient:
 
         # Check for error in response
         if resp.status_code == 200:
-            error_soup = BeautifulSoup(resp.text, 'html.parser')
-            error_el = error_soup.find(id='errorMessage')
-            if error_el:
-                raise Exception(f"Login failed: {error_el.get_text(strip=True)}")
+            error_message = _parse_cas_sso_error(resp.text)
+            if error_message:
+                raise Exception(f"Login failed: {error_message}")
 
         raise Exception(f"CAS-SSO login failed, final URL: {resp.url}")
 
@@ -246,8 +465,8 @@ class RuijieClient:
             CAS登录URL字符串，如果已认证则返回None
         """
         # 访问portal入口，不自动跟随重定向
-        portal_url = "https://auth1.ysu.edu.cn/eportal/redirect.jsp?mode=history"
-        resp = self.client.get(portal_url, allow_redirects=False, proxies=self.proxies)
+        portal_url = f"{self.portal_base}/eportal/redirect.jsp?mode=history"
+        resp = self._request("get_cas_login_url_v2", "GET", portal_url, allow_redirects=False)
 
         # 检查是否有重定向
         redirect_count = 0
@@ -262,7 +481,7 @@ class RuijieClient:
 
             # 继续跟随重定向
             if location:
-                resp = self.client.get(location, allow_redirects=False, proxies=self.proxies)
+                resp = self._request("get_cas_login_url_v2", "GET", location, allow_redirects=False)
                 redirect_count += 1
             else:
                 break
@@ -289,12 +508,12 @@ class RuijieClient:
         user_mac = session_info.get('userMac', '')
 
         # 首先POST到sam-sso/login
-        sam_url = f"https://auth1.ysu.edu.cn/sam-sso/login?flowSessionId={session_id}&customPageId={custom_page_id}&preview=false&appType=normal&language=zh-CN&nasIp={nas_ip}&userIp={user_ip}&ssid={ssid}&userMac={user_mac}"
-        resp = self.client.post(sam_url, json=session_info, proxies=self.proxies, allow_redirects=True)
+        sam_url = f"{self.portal_base}/sam-sso/login?flowSessionId={session_id}&customPageId={custom_page_id}&preview=false&appType=normal&language=zh-CN&nasIp={nas_ip}&userIp={user_ip}&ssid={ssid}&userMac={user_mac}"
+        resp = self._request("get_cas_login_url.sam_login", "POST", sam_url, json=session_info, allow_redirects=True)
 
         # 获取CAS重定向URL（不自动跟随重定向）
-        cas_redirect_url = "https://auth1.ysu.edu.cn/sam-sso/clientredirect?client_name=sidadapter&service=https://auth1.ysu.edu.cn/portal/entry/pc/authenticate;flowParams=undefined;from="
-        resp = self.client.get(cas_redirect_url, allow_redirects=False, proxies=self.proxies)
+        cas_redirect_url = f"{self.portal_base}/sam-sso/clientredirect?client_name=sidadapter&service={self.portal_base}/portal/entry/pc/authenticate;flowParams=undefined;from="
+        resp = self._request("get_cas_login_url.client_redirect", "GET", cas_redirect_url, allow_redirects=False)
 
         # 检查是否有重定向
         if resp.status_code in [301, 302, 303, 307, 308]:
@@ -330,7 +549,7 @@ class RuijieClient:
         user_info = self.get_online_user_info(session_id)
         self._log(f"User online info after authenticate: {user_info}")
 
-        self._get_current_node(session_info)
+        self._debug_current_node(session_info)
     
     def service_selection(self, session_info):
         """
@@ -342,12 +561,12 @@ class RuijieClient:
         Returns:
             服务选择响应数据
         """
-        service_url = "https://auth1.ysu.edu.cn/eportal/network/serviceSelection"
-        response = self.client.post(service_url, json={
+        service_url = f"{self.portal_base}/eportal/network/serviceSelection"
+        response = self._request("service_selection", "POST", service_url, json={
             "sessionId": session_info['sessionId']
-        }, proxies=self.proxies)
+        })
         
-        self._get_current_node(session_info)
+        self._debug_current_node(session_info)
         return self._unwrap_response(response, json_response=True)
     
     def service_login(self, session_info, service="校园网"):
@@ -361,13 +580,14 @@ class RuijieClient:
         Returns:
             服务登录响应
         """
-        service_url = "https://auth1.ysu.edu.cn/eportal/network/serviceLogin"
-        response = self.client.post(service_url, json={
+        service_url = f"{self.portal_base}/eportal/network/serviceLogin"
+        response = self._request("service_login", "POST", service_url, json={
             "sessionId": session_info['sessionId'],
             "service": service
-        }, proxies=self.proxies)
+        })
         
-        self._get_current_node(session_info)
+        self._debug_current_node(session_info)
+        response.raise_for_status()
         return response.json()
     
     def user_online(self, session_info):
@@ -380,10 +600,10 @@ class RuijieClient:
         Returns:
             用户在线状态数据
         """
-        online_url = "https://auth1.ysu.edu.cn/eportal/network/userOnline"
-        response = self.client.post(online_url, json={
+        online_url = f"{self.portal_base}/eportal/network/userOnline"
+        response = self._request("user_online", "POST", online_url, json={
             "sessionId": session_info['sessionId']
-        }, proxies=self.proxies)
+        })
         
         return self._unwrap_response(response, json_response=True)
     
@@ -397,10 +617,10 @@ class RuijieClient:
         Returns:
             账户信息数据
         """
-        account_url = "https://auth1.ysu.edu.cn/eportal/operator/getAccountInfo"
-        response = self.client.post(account_url, json={
+        account_url = f"{self.portal_base}/eportal/operator/getAccountInfo"
+        response = self._request("get_account_info", "POST", account_url, json={
             "sessionId": session_info['sessionId']
-        }, proxies=self.proxies)
+        })
         
         return self._unwrap_response(response, json_response=True)
     
@@ -414,10 +634,10 @@ class RuijieClient:
         Returns:
             登出响应数据
         """
-        offline_url = "https://auth1.ysu.edu.cn/eportal/network/offline"
-        response = self.client.post(offline_url, json={
+        offline_url = f"{self.portal_base}/eportal/network/offline"
+        response = self._request("offline", "POST", offline_url, json={
             "sessionId": session_info['sessionId']
-        }, proxies=self.proxies)
+        })
         
         return self._unwrap_response(response, json_response=True)
     
@@ -434,9 +654,11 @@ class RuijieClient:
             
             if redirect_url:
                 # 未登录
+                metrics.ONLINE.set(0)
                 return False, redirect_url
             else:
                 # 已登录
+                metrics.ONLINE.set(1)
                 return True, user_info
         except Exception as e:
             self._log(f"Error checking login status: {e}")
@@ -484,6 +706,9 @@ class RuijieClient:
         """
         执行完整的登录流程
 
+        流程为 门户重定向 → cas-sso → 服务选择 → 服务登录 → 验证 的状态机（见 login_flow），
+        上一次登录因网络错误中断时从失败的步骤继续。
+
         Args:
             username: 用户名
             password: 密码
@@ -492,54 +717,20 @@ class RuijieClient:
         Returns:
             bool: 登录是否成功
         """
+        flow = LoginFlow(self, username, password, service,
+                         checkpoint=self.login_checkpoint, store=self.checkpoint_store)
+        start = time.perf_counter()
         try:
-            # 1. 检查当前状态
-            is_logged_in, info = self.check_login_status()
-            if is_logged_in:
-                self._log("Already logged in")
-                return True
-
-            # 2. 重定向到门户获取会话信息
-            session_info = self.redirect_to_portal()
-            self._log(f"Got session info: {session_info}")
-
-            # 3. 通过cas-sso直接登录
-            self.cas_sso_login(username, password, session_info)
-            
-            # 5. 获取服务列表
-            services = self.service_selection(session_info)
-            self._log(f"Available services: {services}")
-            
-            # 6. 登录到指定服务
-            login_result = self.service_login(session_info, service)
-            self._log(f"Service login result: {login_result}")
-            
-            # 7. 验证登录状态
-            online_status = self.user_online(session_info)
-            self._log(f"User online status: {online_status}")
-            
-            # 8. 检查认证结果
-            if login_result.get('code') == 200 and login_result.get('data'):
-                auth_result = login_result['data'].get('authResult')
-                if auth_result == 'fail':
-                    auth_message = login_result['data'].get('authMessage', 'Unknown authentication error')
-                    raise Exception(f"Authentication failed: {auth_message}")
-                elif auth_result != 'success':
-                    raise Exception(f"Unexpected authentication result: {auth_result}")
-            else:
-                raise Exception(f"Invalid service login response: {login_result}")
-            
-            # 9. 检查在线状态
-            if not online_status.get('online', False):
-                error_message = online_status.get('message', 'User is not online after authentication')
-                raise Exception(f"Login verification failed: {error_message}")
-            
-            return True
-            
+            success = flow.run()
+            metrics.record_login(service, time.perf_counter() - start)
+            return success
         except Exception as e:
+            metrics.record_login(service, time.perf_counter() - start, error=e)
             if self.verbose:
                 self._log(f"Login failed: {e}")
             raise e
+        finally:
+            self.login_checkpoint = flow.checkpoint if flow.resumable else None
     
     def logout(self):
         """
@@ -553,20 +744,21 @@ class RuijieClient:
             is_logged_in, info = self.check_login_status()
             if not is_logged_in:
                 self._log("Already logged out")
+                self.invalidate_session()
                 return True
             
-            # 2. 重定向到门户获取会话信息
-            session_info = self.redirect_to_portal()
-            self._log(f"Got session info for logout: {session_info}")
-            
-            # 3. 执行登出
-            offline_result = self.offline(session_info)
+            # 2. 使用缓存的会话信息执行登出（会话失效时重新走门户重定向链）
+            offline_result, session_info = self.call_with_session(self.offline)
             self._log(f"Offline result: {offline_result}")
             
-            # 4. 验证登出状态
+            # 3. 验证登出状态
             final_status = self.user_online(session_info)
             self._log(f"Final user status: {final_status}")
             
+            # 4. 会话已结束，清除缓存
+            self.invalidate_session()
+            metrics.ONLINE.set(0)
+            
             return True
             
         except Exception as e:
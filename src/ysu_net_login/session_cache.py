@@ -0,0 +1,119 @@
+import os
+import json
+import time
+
+
+class SessionCache:
+    """
+    门户会话缓存
+
+    将登录时获得的 session_info（sessionId、nasIp、userIp 等）以及 Cookie
+    持久化到本地，使 status/info/logout 等命令无需重新走一遍门户重定向链。
+    """
+
+    # 默认缓存有效期（秒），过期后重新走重定向链获取会话信息
+    DEFAULT_TTL = 12 * 60 * 60
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """
+        初始化会话缓存
+
+        Args:
+            path: 缓存文件路径，默认位于用户缓存目录下
+            ttl: 缓存有效期（秒）
+        """
+        self.path = path or self.default_path()
+        self.ttl = ttl
+
+    @staticmethod
+    def default_path():
+        """获取默认缓存文件路径"""
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache_home, 'ysunetlogin', 'session.json')
+
+    def load(self):
+        """
+        读取缓存
+
+        Returns:
+            dict: 包含 session_info、cookies、extra、saved_at、expires_at 的字典，
+                  缓存不存在、损坏或已过期时返回 None
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or not data.get('session_info'):
+            return None
+
+        if data.get('expires_at', 0) <= time.time():
+            self.clear()
+            return None
+
+        return data
+
+    def save(self, session_info, cookies=None, extra=None):
+        """
+        写入缓存
+
+        Args:
+            session_info: 会话信息字典
+            cookies: requests.cookies.RequestsCookieJar 对象
+            extra: 随会话一起保存的其他可JSON序列化数据
+        """
+        now = time.time()
+        data = {
+            'session_info': session_info,
+            'cookies': [
+                {
+                    'name': cookie.name,
+                    'value': cookie.value,
+                    'domain': cookie.domain,
+                    'path': cookie.path,
+                    'secure': cookie.secure,
+                    'expires': cookie.expires,
+                }
+                for cookie in (cookies or [])
+            ],
+            'extra': extra,
+            'saved_at': now,
+            'expires_at': now + self.ttl,
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        # 先写临时文件再原子替换，缓存中含有会话 Cookie，仅当前用户可读
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """删除缓存文件"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def restore_cookies(cookie_jar, cookies):
+        """
+        将缓存中的 Cookie 恢复到 Cookie 容器中
+
+        Args:
+            cookie_jar: requests.cookies.RequestsCookieJar 对象
+            cookies: 缓存中的 Cookie 列表
+        """
+        for cookie in cookies or []:
+            cookie_jar.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''),
+                path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False),
+                expires=cookie.get('expires'),
+            )
@@ -0,0 +1,168 @@
+import os
+import json
+import threading
+import contextlib
+
+
+class Span:
+    """一次HTTP请求的耗时记录"""
+
+    # 按发生顺序排列的阶段
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body')
+
+    def __init__(self, step, method, url, start):
+        """
+        Args:
+            step: 流程步骤名称，如 cas_sso_login.fetch_page
+            method: HTTP方法
+            url: 请求URL
+            start: 开始时间（Unix时间戳，秒）
+        """
+        self.step = step
+        self.method = method
+        self.url = url
+        self.start = start
+        self.status = None
+        self.error = None
+        self.thread_id = threading.get_ident()
+        # 各阶段耗时（秒），连接复用时 dns/connect/tls 为 None
+        self.timings = {phase: None for phase in self.PHASES}
+        self.total = 0.0
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典（耗时单位为毫秒）"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        data = {
+            'step': self.step,
+            'method': self.method,
+            'url': self.url,
+            'status': self.status,
+            'start': self.start,
+            'total_ms': ms(self.total),
+        }
+        for phase in self.PHASES:
+            data[f'{phase}_ms'] = ms(self.timings[phase])
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class Tracer:
+    """
+    请求追踪器
+
+    记录每个门户请求的各阶段耗时（DNS、TCP连接、TLS握手、首字节、响应体），
+    并可导出为 JSON Lines 或 Chrome Trace（chrome://tracing、Perfetto）格式。
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """
+        标记当前线程正在执行的流程步骤，期间发出的请求都归入该步骤
+
+        Args:
+            name: 步骤名称
+        """
+        previous = getattr(self._local, 'step', None)
+        self._local.step = name
+        try:
+            yield
+        finally:
+            self._local.step = previous
+
+    def current_step(self):
+        """获取当前线程的流程步骤名称"""
+        return getattr(self._local, 'step', None)
+
+    def record(self, span):
+        """记录一个Span"""
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self):
+        """清空已记录的Span"""
+        with self._lock:
+            self.spans = []
+
+    def step_totals(self):
+        """
+        按步骤汇总耗时
+
+        Returns:
+            dict: 步骤名称到 {'requests': 请求数, 'total_ms': 总耗时} 的字典，按首次出现顺序排列
+        """
+        totals = {}
+        for span in list(self.spans):
+            entry = totals.setdefault(span.step, {'requests': 0, 'total_ms': 0.0})
+            entry['requests'] += 1
+            entry['total_ms'] = round(entry['total_ms'] + span.total * 1000, 3)
+        return totals
+
+    def export_jsonl(self, fp):
+        """以JSON Lines格式写出，每行一个Span"""
+        for span in list(self.spans):
+            fp.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+
+    def export_chrome(self, fp):
+        """以Chrome Trace Event格式写出，每个请求及其各阶段为一个完整事件"""
+        pid = os.getpid()
+        events = []
+        for span in list(self.spans):
+            ts = span.start * 1e6
+            events.append({
+                'name': span.step,
+                'cat': 'http',
+                'ph': 'X',
+                'ts': ts,
+                'dur': span.total * 1e6,
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.to_dict(),
+            })
+            offset = ts
+            for phase in Span.PHASES:
+                duration = span.timings[phase]
+                if duration is None:
+                    continue
+                events.append({
+                    'name': phase,
+                    'cat': 'http.phase',
+                    'ph': 'X',
+                    'ts': offset,
+                    'dur': duration * 1e6,
+                    'pid': pid,
+                    'tid': span.thread_id,
+                })
+                offset += duration * 1e6
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fp, ensure_ascii=False)
+
+    def export(self, path, fmt=None):
+        """
+        导出到文件
+
+        Args:
+            path: 输出文件路径
+            fmt: 'chrome' 或 'jsonl'，为None时根据扩展名判断（.jsonl/.ndjson 为 jsonl，其余为 chrome）
+        """
+        if fmt is None:
+            fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'chrome'
+
+        with open(path, 'w', encoding='utf-8') as fp:
+            if fmt == 'jsonl':
+                self.export_jsonl(fp)
+            else:
+                self.export_chrome(fp)
+
+
+def trace_step(tracer, name):
+    """获取步骤上下文，tracer为None时不做任何事"""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.step(name)
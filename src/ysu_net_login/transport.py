@@ -0,0 +1,520 @@
+import os
+import ssl
+import time
+import errno
+import socket
+import selectors
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.ssl_ import create_urllib3_context, resolve_cert_reqs, resolve_ssl_version
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # urllib3 < 2
+    NameResolutionError = None
+
+from .tracing import Span
+
+
+# 当前线程正在发送的请求的连接阶段耗时，由适配器设置、连接对象填写
+_local = threading.local()
+
+# 门户只涉及少数几个主机（auth1、cer、ehall），每个主机同时最多一两个请求
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 4
+
+
+# RFC 8305 建议的并行连接间隔：上一个地址在此时间内没有连上时开始尝试下一个
+HAPPY_EYEBALLS_DELAY = 0.25
+
+
+def _phase_timings():
+    """获取当前请求的阶段耗时字典，未在追踪时返回None"""
+    return getattr(_local, 'timings', None)
+
+
+def _resolve(host, port):
+    """
+    解析主机地址，适配器设置了 DNSCache 时经过缓存与固定地址
+
+    Returns:
+        tuple: (getaddrinfo 格式的地址列表, 来源)
+    """
+    resolver = getattr(_local, 'resolver', None)
+    if resolver is not None:
+        return resolver.resolve(host, port, allowed_gai_family())
+    return socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM), 'dns'
+
+
+def _interleave(addresses):
+    """按地址族交替排列（保持各族内的顺序），首个地址族与解析结果的第一个相同"""
+    families = {}
+    for info in addresses:
+        families.setdefault(info[0], []).append(info)
+    queues = list(families.values())
+    result = []
+    while queues:
+        for queue in list(queues):
+            result.append(queue.pop(0))
+            if not queue:
+                queues.remove(queue)
+    return result
+
+
+def _open_socket(info, source_address, socket_options):
+    """创建非阻塞套接字并开始连接"""
+    af, socktype, proto, canonname, sa = info
+    sock = socket.socket(af, socktype, proto)
+    try:
+        for option in socket_options or []:
+            sock.setsockopt(*option)
+        if source_address:
+            sock.bind(source_address)
+        sock.setblocking(False)
+        code = sock.connect_ex(sa)
+        if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            raise OSError(code, os.strerror(code))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _connect_result(sock):
+    """
+    非阻塞连接有事件后判断结果
+
+    Returns:
+        int: 0表示已连接，否则为错误码
+    """
+    code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    if code:
+        return code
+    try:
+        # SO_ERROR 为0不一定表示已连接（Windows 上失败的连接可能不设置它），以能否取得对端地址为准
+        sock.getpeername()
+    except OSError as e:
+        return e.errno or errno.ECONNREFUSED
+    return 0
+
+
+def _happy_eyeballs_connect(addresses, timeout, source_address=None, socket_options=None,
+                            delay=HAPPY_EYEBALLS_DELAY):
+    """
+    按 Happy Eyeballs（RFC 8305）方式连接：依次开始连接各个地址，上一个地址在 delay 秒内
+    没有连上（或已失败）时立即尝试下一个，同时进行的连接中第一个成功的胜出，其余关闭
+
+    Args:
+        addresses: getaddrinfo 格式的地址列表
+        timeout: 总连接超时（秒），None表示不限
+        source_address: 绑定的本地地址
+        socket_options: setsockopt 参数列表
+        delay: 开始下一个地址前的等待时间（秒）
+
+    Returns:
+        tuple: (已连接的套接字, 对端地址)
+    """
+    pending = _interleave(addresses)
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    selector = selectors.DefaultSelector()
+    attempts = {}
+    next_attempt = 0.0
+    err = None
+    try:
+        while pending or attempts:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                raise socket.timeout("timed out")
+
+            if pending and (not attempts or now >= next_attempt):
+                info = pending.pop(0)
+                try:
+                    sock = _open_socket(info, source_address, socket_options)
+                except OSError as e:
+                    err = e
+                    continue
+                # 连接失败在 POSIX 上表现为可读+可写，在 Windows 上通过异常集合通知；
+                # 同时关注读写事件，具体结果由 _connect_result 判断
+                selector.register(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, info[4])
+                attempts[sock] = info[4]
+                next_attempt = now + delay
+                continue
+
+            wake = [t for t in (deadline, next_attempt if pending else None) if t is not None]
+            events = selector.select(max(0.0, min(wake) - now) if wake else None)
+            for key, _ in events:
+                sock = key.fileobj
+                selector.unregister(sock)
+                sa = attempts.pop(sock)
+                code = _connect_result(sock)
+                if code == 0:
+                    sock.settimeout(timeout)
+                    return sock, sa
+                err = OSError(code, os.strerror(code))
+                sock.close()
+                # 失败后不必等待，立即尝试下一个地址
+                next_attempt = 0.0
+    finally:
+        for sock in attempts:
+            sock.close()
+        selector.close()
+
+    if err is not None:
+        raise err
+    raise OSError("getaddrinfo returns an empty list")
+
+
+def _create_connection(address, timeout, source_address=None, socket_options=None):
+    """
+    建立TCP连接，代替 urllib3.util.connection.create_connection：
+    - 经过适配器的 DNSCache 解析（设置了时）
+    - 多个地址时按 Happy Eyeballs 方式并行连接，而不是逐个等待超时
+    - 分别记录DNS解析与TCP连接的耗时，verbose 时输出解析来源与耗时
+    """
+    host, port = address
+    if host.startswith('['):
+        host = host.strip('[]')
+    if timeout is not None and not isinstance(timeout, (int, float)):
+        # urllib3 的默认超时哨兵对象
+        timeout = socket.getdefaulttimeout()
+
+    timings = _phase_timings()
+    log = getattr(_local, 'log', None)
+    start = time.perf_counter()
+    addresses, source = _resolve(host, port)
+    resolved = time.perf_counter()
+    if timings is not None:
+        timings['dns'] = resolved - start
+    if log is not None:
+        ips = ', '.join(dict.fromkeys(info[4][0] for info in addresses))
+        log(f"Resolved {host} via {source} in {(resolved - start) * 1000:.1f}ms: {ips}")
+
+    sock, sa = _happy_eyeballs_connect(addresses, timeout, source_address, socket_options)
+    connected = time.perf_counter()
+    if timings is not None:
+        timings['connect'] = connected - resolved
+    if log is not None and len(addresses) > 1:
+        log(f"Connected to {sa[0]} in {(connected - resolved) * 1000:.1f}ms ({len(addresses)} addresses)")
+    return sock
+
+
+class TLSSessionCache:
+    """
+    按（SSLContext, 主机名）缓存TLS会话，新连接携带上一次的会话进行简短握手（会话恢复）
+
+    Python的ssl模块无法序列化SSLSession，会话只能在进程内复用：
+    同一进程中的所有requests会话、客户端对象和连接池共享此缓存。
+    """
+
+    def __init__(self, max_entries=32):
+        """
+        Args:
+            max_entries: 最多缓存的会话数
+        """
+        self.max_entries = max_entries
+        self.enabled = True
+        self.resumed = 0
+        self.full = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, context, hostname):
+        """获取主机对应的TLS会话（会话只能在创建它的SSLContext中恢复），没有时返回None"""
+        if not self.enabled or not hostname:
+            return None
+        with self._lock:
+            return self._sessions.get((id(context), hostname))
+
+    def put(self, context, hostname, session):
+        """保存主机的TLS会话"""
+        if not self.enabled or not hostname or session is None:
+            return
+        key = (id(context), hostname)
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def record_handshake(self, resumed):
+        """统计一次握手是否为会话恢复"""
+        with self._lock:
+            if resumed:
+                self.resumed += 1
+            else:
+                self.full += 1
+
+    def clear(self):
+        """清空缓存的会话和统计"""
+        with self._lock:
+            self._sessions.clear()
+            self.resumed = 0
+            self.full = 0
+
+
+TLS_SESSIONS = TLSSessionCache()
+
+# (cert_reqs, ssl_version, 最低版本, 最高版本) -> 共享的SSLContext
+# TLS会话只能在创建它的SSLContext中恢复，因此同一组参数的连接共用一个上下文
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
+
+def _shared_ssl_context(cert_reqs, ssl_version, ssl_minimum_version=None, ssl_maximum_version=None,
+                        ca_certs=None, ca_cert_dir=None, ca_cert_data=None):
+    """
+    获取支持TLS会话恢复的共享SSLContext
+
+    上下文与 urllib3 默认创建的一致，额外：
+    - 允许TLS 1.2会话票据（urllib3默认设置了OP_NO_TICKET）
+    - wrap_socket 自动携带 TLS_SESSIONS 中缓存的会话
+    - 同一CA文件只加载一次（requests会为每个新连接重复传入certifi证书包）
+
+    CA来源是键的一部分：指定了不同 verify= 的会话使用各自的上下文，信任的CA不会互相混入。
+    """
+    if isinstance(ca_cert_data, bytearray):
+        ca_cert_data = bytes(ca_cert_data)
+    key = (resolve_cert_reqs(cert_reqs), ssl_version, ssl_minimum_version, ssl_maximum_version,
+           ca_certs, ca_cert_dir, ca_cert_data)
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context is not None:
+            return context
+
+        version_options = {}
+        if ssl_minimum_version is not None or ssl_maximum_version is not None:
+            # urllib3 < 2 的 create_urllib3_context 不接受最低/最高版本参数
+            version_options = dict(ssl_minimum_version=ssl_minimum_version,
+                                   ssl_maximum_version=ssl_maximum_version)
+        context = create_urllib3_context(
+            ssl_version=resolve_ssl_version(ssl_version),
+            cert_reqs=key[0],
+            **version_options
+        )
+        context.options &= ~ssl.OP_NO_TICKET
+        if not (ca_certs or ca_cert_dir or ca_cert_data):
+            # 传入了ssl_context时urllib3不再加载系统证书，与其未指定上下文时的行为保持一致
+            context.load_default_certs()
+
+        wrap_socket = context.wrap_socket
+        load_verify_locations = context.load_verify_locations
+        loaded = set()
+        load_lock = threading.Lock()
+
+        def wrap_socket_resuming(sock, server_hostname=None, **kwargs):
+            if kwargs.get('session') is None:
+                # urllib3 < 2 对IP地址不传 server_hostname，使用连接对象记录的主机
+                hostname = server_hostname or getattr(_local, 'tls_hostname', None)
+                kwargs['session'] = TLS_SESSIONS.get(context, hostname)
+            return wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+
+        def load_verify_locations_once(cafile=None, capath=None, cadata=None):
+            source = (cafile, capath, cadata if not isinstance(cadata, (bytes, bytearray)) else bytes(cadata))
+            with load_lock:
+                if source in loaded:
+                    return
+                load_verify_locations(cafile, capath, cadata)
+                loaded.add(source)
+
+        context.wrap_socket = wrap_socket_resuming
+        context.load_verify_locations = load_verify_locations_once
+        _ssl_contexts[key] = context
+        return context
+
+
+class _TimedConnectionMixin:
+    """替换连接建立过程以记录DNS与TCP连接耗时"""
+
+    def _new_conn(self):
+        try:
+            return _create_connection(
+                (self._dns_host, self.port),
+                self.timeout,
+                source_address=self.source_address,
+                socket_options=self.socket_options,
+            )
+        except socket.gaierror as e:
+            if NameResolutionError is not None:
+                raise NameResolutionError(self.host, self, e) from e
+            raise NewConnectionError(self, f"Failed to resolve '{self.host}': {e}") from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    """记录连接阶段耗时的HTTP连接"""
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """
+    记录连接阶段耗时的HTTPS连接，TLS握手耗时为整个connect()减去DNS和TCP连接耗时
+
+    未指定ssl_context时使用共享的上下文并恢复缓存的TLS会话。
+    """
+
+    def connect(self):
+        if self.ssl_context is None and TLS_SESSIONS.enabled:
+            # ssl_minimum_version/ssl_maximum_version 为 urllib3 2 新增的连接属性
+            self.ssl_context = _shared_ssl_context(
+                self.cert_reqs, self.ssl_version,
+                getattr(self, 'ssl_minimum_version', None), getattr(self, 'ssl_maximum_version', None),
+                self.ca_certs, self.ca_cert_dir, getattr(self, 'ca_cert_data', None),
+            )
+
+        timings = _phase_timings()
+        self._tls_hostname = getattr(self, 'server_hostname', None) or self.host
+        _local.tls_hostname = self._tls_hostname
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _local.tls_hostname = None
+        if timings is not None:
+            elapsed = time.perf_counter() - start
+            timings['tls'] = elapsed - (timings.get('dns') or 0) - (timings.get('connect') or 0)
+        if isinstance(self.sock, ssl.SSLSocket):
+            TLS_SESSIONS.record_handshake(self.sock.session_reused)
+
+    def getresponse(self):
+        response = super().getresponse()
+        # TLS 1.3的会话票据在握手之后才到达，读取响应后再保存会话
+        if isinstance(self.sock, ssl.SSLSocket):
+            hostname = self.sock.server_hostname or getattr(self, '_tls_hostname', None)
+            TLS_SESSIONS.put(self.sock.context, hostname, self.sock.session)
+        return response
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+POOL_CLASSES_BY_SCHEME = {
+    'http': TimedHTTPConnectionPool,
+    'https': TimedHTTPSConnectionPool,
+}
+
+
+class PortalAdapter(HTTPAdapter):
+    """
+    门户请求使用的传输适配器
+
+    使用可记录各阶段耗时的连接类；设置了tracer时，
+    每个请求（包括重定向的每一跳）都会记录为一个Span。
+    新连接经过 resolver（DNSCache）解析主机地址。
+    """
+
+    def __init__(self, tracer=None, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 source_address=None, resolver=None, log=None, **kwargs):
+        """
+        Args:
+            tracer: Tracer对象，为None时不记录
+            pool_connections: 缓存的连接池（主机）数量
+            pool_maxsize: 每个主机保留的空闲连接数
+            source_address: 出站连接绑定的本地地址 (host, port)，用于从指定的IP（如某台机器的地址）访问门户
+            resolver: DNSCache对象，为None时直接使用系统解析
+            log: 输出调试信息的函数（如解析来源与耗时），为None时不输出
+            **kwargs: 传给 requests.adapters.HTTPAdapter 的参数
+        """
+        self.tracer = tracer
+        self.source_address = source_address
+        self.resolver = resolver
+        self.log = log
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.source_address:
+            kwargs['source_address'] = self.source_address
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = POOL_CLASSES_BY_SCHEME
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self.source_address:
+            proxy_kwargs['source_address'] = self.source_address
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS代理使用自己的连接类，不做替换
+        if not proxy.lower().startswith('socks'):
+            manager.pool_classes_by_scheme = POOL_CLASSES_BY_SCHEME
+        return manager
+
+    def send(self, request, stream=False, **kwargs):
+        # 连接在当前线程中建立，解析器与日志函数通过线程局部变量传给 _create_connection
+        _local.resolver = self.resolver
+        _local.log = self.log
+        try:
+            return self._send(request, stream=stream, **kwargs)
+        finally:
+            _local.resolver = None
+            _local.log = None
+
+    def _send(self, request, stream=False, **kwargs):
+        if self.tracer is None:
+            return super().send(request, stream=stream, **kwargs)
+
+        step = self.tracer.current_step() or f"{request.method} {urlparse(request.url).path}"
+        span = Span(step, request.method, request.url, time.time())
+        timings = {}
+        _local.timings = timings
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            headers_received = time.perf_counter()
+            if not stream:
+                # 在此读取响应体以便单独计时，requests随后会直接使用已读取的内容
+                response.content
+            finished = time.perf_counter()
+        except Exception as e:
+            span.error = str(e)
+            span.timings.update(timings)
+            span.total = time.perf_counter() - start
+            self.tracer.record(span)
+            raise
+        finally:
+            _local.timings = None
+
+        setup = sum(timings.get(phase) or 0 for phase in ('dns', 'connect', 'tls'))
+        span.status = response.status_code
+        span.timings.update(timings)
+        span.timings['ttfb'] = headers_received - start - setup
+        span.timings['body'] = finished - headers_received
+        span.total = finished - start
+        self.tracer.record(span)
+        return response
+
+
+def mount_portal_adapter(session, tracer=None, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                         pool_maxsize=DEFAULT_POOL_MAXSIZE, source_address=None, resolver=None, log=None):
+    """
+    为requests会话挂载PortalAdapter
+
+    Args:
+        session: requests.Session对象
+        tracer: Tracer对象
+        pool_connections: 缓存的连接池（主机）数量
+        pool_maxsize: 每个主机保留的空闲连接数
+        source_address: 出站连接绑定的本地地址 (host, port)
+        resolver: DNSCache对象，为None时直接使用系统解析
+        log: 输出调试信息的函数
+
+    Returns:
+        PortalAdapter对象
+    """
+    adapter = PortalAdapter(tracer=tracer, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                            source_address=source_address, resolver=resolver, log=log)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
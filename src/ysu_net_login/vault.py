@@ -0,0 +1,231 @@
+"""
+加密的本地凭据库
+
+密码不再以明文放在环境变量或账户文件中，而是保存在凭据库文件里：
+- 口令经 scrypt 派生出256位密钥（只在解锁时计算一次，之后保存在进程内存中）
+- 每个账户的密码单独以 AES-GCM 加密，用户名作为附加认证数据，条目不能被替换到其他账户下
+- 解锁时一次解密全部条目，之后按用户名查找为字典查询，批量登录时不会逐个账户重复解密
+
+文件中用户名为明文（`creds list` 不需要口令），文件权限为 0600。
+"""
+
+import os
+import sys
+import json
+import base64
+import hashlib
+import secrets
+
+
+VAULT_VERSION = 1
+
+# scrypt 参数：约16MiB内存，单次派生在几十毫秒量级
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# 用于校验口令的固定明文
+_VERIFIER = b'ysunetlogin-vault'
+
+
+class VaultError(Exception):
+    """凭据库不存在、损坏或口令错误"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _b64decode(text):
+    return base64.b64decode(text.encode('ascii'))
+
+
+def _seal(key, plaintext, associated_data):
+    from Crypto.Cipher import AES
+
+    nonce = secrets.token_bytes(12)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(associated_data)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return {'nonce': _b64encode(nonce), 'ciphertext': _b64encode(ciphertext + tag)}
+
+
+def _open(key, sealed, associated_data):
+    from Crypto.Cipher import AES
+
+    data = _b64decode(sealed['ciphertext'])
+    cipher = AES.new(key, AES.MODE_GCM, nonce=_b64decode(sealed['nonce']))
+    cipher.update(associated_data)
+    return cipher.decrypt_and_verify(data[:-16], data[-16:])
+
+
+def get_passphrase(confirm=False):
+    """
+    获取凭据库口令：优先使用环境变量 RUIJIE_VAULT_PASSPHRASE，否则在终端中输入
+
+    Args:
+        confirm: 是否要求输入两次（创建凭据库时）
+
+    Returns:
+        str: 口令
+    """
+    passphrase = os.getenv('RUIJIE_VAULT_PASSPHRASE')
+    if passphrase:
+        return passphrase
+    if not (sys.stdin and sys.stdin.isatty()):
+        raise VaultError("Vault passphrase required: set RUIJIE_VAULT_PASSPHRASE or run interactively")
+
+    import getpass
+    passphrase = getpass.getpass("Vault passphrase: ")
+    if not passphrase:
+        raise VaultError("Vault passphrase must not be empty")
+    if confirm and getpass.getpass("Repeat passphrase: ") != passphrase:
+        raise VaultError("Passphrases do not match")
+    return passphrase
+
+
+class CredentialVault:
+    """加密的凭据库文件"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: 凭据库文件路径，为None时使用默认路径
+        """
+        self.path = path or self.default_path()
+        self._data = None
+        self._key = None
+        # 用户名 -> 密码（解锁后）
+        self._secrets = {}
+
+    @staticmethod
+    def default_path():
+        """获取默认凭据库路径"""
+        config_home = os.getenv('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        return os.path.join(config_home, 'ysunetlogin', 'credentials.vault')
+
+    def exists(self):
+        """凭据库文件是否存在"""
+        return self._data is not None or os.path.exists(self.path)
+
+    @property
+    def unlocked(self):
+        return self._key is not None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                raise VaultError(f"No credential vault at {self.path}; add an account with 'creds add'")
+            except (OSError, ValueError) as e:
+                raise VaultError(f"Cannot read credential vault {self.path}: {e}")
+            if not isinstance(data, dict) or data.get('version') != VAULT_VERSION:
+                raise VaultError(f"Unsupported credential vault format: {self.path}")
+            data.setdefault('accounts', {})
+            self._data = data
+        return self._data
+
+    def usernames(self):
+        """
+        列出凭据库中的账户（不需要解锁）
+
+        Returns:
+            list: 排序后的用户名列表
+        """
+        if not self.exists():
+            return []
+        return sorted(self._load()['accounts'])
+
+    def __contains__(self, username):
+        return self.exists() and username in self._load()['accounts']
+
+    @staticmethod
+    def _derive(passphrase, kdf):
+        return hashlib.scrypt(passphrase.encode('utf-8'), salt=_b64decode(kdf['salt']),
+                              n=kdf['n'], r=kdf['r'], p=kdf['p'], maxmem=64 * 1024 * 1024, dklen=32)
+
+    def create(self, passphrase):
+        """
+        以口令创建空的凭据库（调用 save() 后写入文件）
+
+        Args:
+            passphrase: 口令
+        """
+        kdf = {'name': 'scrypt', 'salt': _b64encode(secrets.token_bytes(16)),
+               'n': SCRYPT_N, 'r': SCRYPT_R, 'p': SCRYPT_P}
+        self._key = self._derive(passphrase, kdf)
+        self._data = {
+            'version': VAULT_VERSION,
+            'kdf': kdf,
+            'verifier': _seal(self._key, _VERIFIER, b'verifier'),
+            'accounts': {},
+        }
+        self._secrets = {}
+
+    def unlock(self, passphrase):
+        """
+        以口令解锁凭据库并解密全部条目
+
+        Args:
+            passphrase: 口令
+
+        Raises:
+            VaultError: 口令错误或条目被篡改
+        """
+        data = self._load()
+        key = self._derive(passphrase, data['kdf'])
+        try:
+            if _open(key, data['verifier'], b'verifier') != _VERIFIER:
+                raise ValueError
+            self._secrets = {
+                username: _open(key, sealed, username.encode('utf-8')).decode('utf-8')
+                for username, sealed in data['accounts'].items()
+            }
+        except (ValueError, KeyError):
+            raise VaultError("Wrong vault passphrase or corrupted vault")
+        self._key = key
+
+    def _require_unlocked(self):
+        if self._key is None:
+            raise VaultError("Credential vault is locked")
+
+    def get(self, username):
+        """
+        获取账户的密码
+
+        Returns:
+            str: 密码，账户不存在时返回None
+        """
+        self._require_unlocked()
+        return self._secrets.get(username)
+
+    def set(self, username, password):
+        """添加或更新账户的密码（调用 save() 后写入文件）"""
+        self._require_unlocked()
+        self._data['accounts'][username] = _seal(self._key, password.encode('utf-8'), username.encode('utf-8'))
+        self._secrets[username] = password
+
+    def remove(self, username):
+        """
+        删除账户（调用 save() 后写入文件）
+
+        Returns:
+            bool: 账户是否存在
+        """
+        accounts = self._load()['accounts']
+        self._secrets.pop(username, None)
+        return accounts.pop(username, None) is not None
+
+    def save(self):
+        """原子写入凭据库文件（仅当前用户可读写）"""
+        data = self._load()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
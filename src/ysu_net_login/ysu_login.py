@@ -1,95 +1,204 @@
 import requests
-import base64
-import random
 import os
+import time
 import tempfile
 import atexit
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad
-from bs4 import BeautifulSoup
 import urllib3
-from PIL import Image
-from io import BytesIO
+from urllib.parse import urlparse
+from .tracing import trace_step
+from .html_extract import find_text_by_id, find_form_inputs, find_input_value
+from .transport import mount_portal_adapter
+from .retry import RetryConfig
+from .circuit import CircuitBreakers, CircuitOpenError
+from .crypto import random_string, encrypt_cas_password
+from .ascii_render import image_to_ascii, image_to_halfblocks
+from .captcha import ManualSolver
+from . import metrics
 
 # 禁用 InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# 为图片查看器写出的验证码临时文件（进程内共享，异常退出时由同一个 atexit 函数清理）
+_captcha_spill_files = set()
+_spill_cleanup_registered = False
+
+
+def _captcha_spill_dir():
+    """
+    验证码临时文件目录：优先使用内存文件系统（XDG_RUNTIME_DIR、/dev/shm），否则为系统临时目录
+    """
+    for directory in (os.environ.get('XDG_RUNTIME_DIR'), '/dev/shm'):
+        if directory and os.path.isdir(directory) and os.access(directory, os.W_OK):
+            return directory
+    return None
+
+
+def spill_captcha(image_data):
+    """
+    把验证码写到仅当前用户可读写（0600）的临时文件，供图片查看器打开
+
+    Args:
+        image_data: 验证码图片二进制数据
+
+    Returns:
+        str: 文件路径，使用后应调用 remove_captcha_file 删除
+    """
+    global _spill_cleanup_registered
+    fd, path = tempfile.mkstemp(prefix='captcha_', suffix='.jpg', dir=_captcha_spill_dir())
+    with os.fdopen(fd, 'wb') as f:
+        f.write(image_data)
+    _captcha_spill_files.add(path)
+    if not _spill_cleanup_registered:
+        atexit.register(_cleanup_spill_files)
+        _spill_cleanup_registered = True
+    return path
+
+
+def remove_captcha_file(path):
+    """删除 spill_captcha 写出的文件"""
+    _captcha_spill_files.discard(path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _cleanup_spill_files():
+    for path in list(_captcha_spill_files):
+        try:
+            remove_captcha_file(path)
+        except OSError:
+            pass
+
+
 class YSULogin:
+    CAS_BASE = "https://cer.ysu.edu.cn"
     DEFAULT_LOGIN_URL = "https://cer.ysu.edu.cn/authserver/login?service=https%3A%2F%2Fehall.ysu.edu.cn%2Flogin"
     CHECK_CAPTCHA_URL = "https://cer.ysu.edu.cn/authserver/checkNeedCaptcha.htl"
     CAPTCHA_URL = "https://cer.ysu.edu.cn/authserver/getCaptcha.htl"
 
-    def __init__(self, username, password, session=None, proxies={}, display_mode='both', login_url=None):
+    def __init__(self, username, password, session=None, proxies={}, display_mode='both', login_url=None, cas_base=None, tracer=None, retry=None, circuits=None,
+                 captcha_solver=None, manual_captcha=True, resolver=None):
         self.username = username
         self.password = password
         self.session = session or requests.Session()
+        self._owns_session = session is None
         self.proxies = proxies
-        self.display_mode = display_mode  # 'ascii', 'file', 'both'
-        self.LOGIN_URL = login_url or self.DEFAULT_LOGIN_URL
+        self.display_mode = display_mode  # 'ascii', 'blocks', 'file', 'both'
+        self.tracer = tracer
+        self.retry = retry or RetryConfig()
+        self.circuits = circuits or CircuitBreakers()
+        # 验证码识别器（captcha.CaptchaSolver），未识别时按 manual_captcha 决定是否由用户输入
+        self.captcha_solver = captcha_solver
+        self.manual_captcha = manual_captcha
+        # resolver: DNSCache对象，缓存 cer.ysu.edu.cn 的解析结果并支持固定地址
+        mount_portal_adapter(self.session, tracer, resolver=resolver)
+        if cas_base:
+            # 指向其他CAS服务器（如本地模拟门户）
+            cas_base = cas_base.rstrip('/')
+            self.CHECK_CAPTCHA_URL = f"{cas_base}/authserver/checkNeedCaptcha.htl"
+            self.CAPTCHA_URL = f"{cas_base}/authserver/getCaptcha.htl"
+            self.LOGIN_URL = login_url or f"{cas_base}/authserver/login?service=https%3A%2F%2Fehall.ysu.edu.cn%2Flogin"
+        else:
+            self.LOGIN_URL = login_url or self.DEFAULT_LOGIN_URL
         # 模拟浏览器 User-Agent
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def reset(self, clear_cookies=False):
+        """
+        清除上一次登录流程的表单状态和验证码，使同一个对象（及其会话）可以再次登录
+
+        Args:
+            clear_cookies: 是否同时清除会话中的Cookie（如CAS登录态）
+        """
         self.lt = None
         self.execution = None
         self.salt = None
-        self.cllt = None    
+        self.cllt = None
         self.dllt = None
         self._eventId = None
         self.captcha = None
-        self.captcha_files = []  # 跟踪创建的验证码文件
-        
-        # 注册退出时的清理函数
-        atexit.register(self._cleanup_captcha_files)
+        if clear_cookies:
+            self.session.cookies.clear()
 
-    def _random_string(self, length):
-        chars = "ABCDEFGHJKMNPQRSTWXYZabcdefhijkmnprstwxyz2345678"
-        return ''.join(random.choice(chars) for _ in range(length))
+    def close(self):
+        """关闭自行创建的HTTP会话"""
+        if self._owns_session:
+            self.session.close()
 
-    def _encrypt_password(self, password, salt):
+    def _request(self, step, method, url, **kwargs):
         """
-        使用AES/CBC/PKCS7对密码进行加密，与JS端逻辑保持一致
+        发送HTTP请求，按步骤对应的 RetryPolicy 设置超时并重试，经过目标主机的熔断器
         """
-        prefix = self._random_string(64)
-        iv = self._random_string(16).encode('utf-8')
-        key = salt.strip().encode('utf-8')
-        data_to_encrypt = (prefix + password).encode('utf-8')
+        policy = self.retry.for_step(step)
+        breaker = self.circuits.get(urlparse(url).hostname)
+        with trace_step(self.tracer, step):
+            breaker.before_call()
+            start = time.perf_counter()
+            try:
+                response = policy.run(
+                    lambda timeout: self.session.request(method, url, verify=False, proxies=self.proxies,
+                                                         timeout=timeout, **kwargs)
+                )
+            except requests.exceptions.RequestException:
+                breaker.record_failure()
+                raise
+            finally:
+                metrics.STEP_DURATION.observe(time.perf_counter() - start, step=step)
 
-        cipher = AES.new(key, AES.MODE_CBC, iv)
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
 
-        # PKCS7 填充
-        padded_data = pad(data_to_encrypt, AES.block_size)
+    def _random_string(self, length):
+        return random_string(length)
 
-        encrypted = cipher.encrypt(padded_data)
-        return base64.b64encode(encrypted).decode('utf-8')
+    def _encrypt_password(self, password, salt):
+        """
+        使用AES/CBC/PKCS7对密码进行加密，与JS端逻辑保持一致（见 crypto.encrypt_cas_password）
+        """
+        return encrypt_cas_password(password, salt)
 
     def _fetch_login_page(self):
         """
         访问登录页面，获取表单所需参数
         """
         try:
-            resp = self.session.get(self.LOGIN_URL, verify=False, timeout=10, proxies=self.proxies)
+            resp = self._request("ysu_login.fetch_login_page", "GET", self.LOGIN_URL)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'html.parser')
 
-            # 首先定位到账号密码登录的表单，以确保获取正确的参数
-            form = soup.find('form', {'id': 'pwdFromId'})
-            if not form:
-                print("错误：未能找到ID为 'pwdFromId' 的登录表单。")
-                return False
+            # 优先直接扫描表单中的input标签，页面结构不符合预期时回退到BeautifulSoup
+            if not self._parse_login_form_fast(resp.text):
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(resp.text, 'html.parser')
 
-            self.lt = form.find('input', {'name': 'lt'}).get('value', '')
-            self.execution = form.find('input', {'name': 'execution'}).get('value', '')
-            self.salt = form.find('input', {'id': 'pwdEncryptSalt'}).get('value', '')
-            self.cllt = form.find('input', {'name': 'cllt'}).get('value', 'userNameLogin')
-            self.dllt = form.find('input', {'name': 'dllt'}).get('value', 'generalLogin')
-            self._eventId = form.find('input', {'name': '_eventId'}).get('value', 'submit')
+                # 首先定位到账号密码登录的表单，以确保获取正确的参数
+                form = soup.find('form', {'id': 'pwdFromId'})
+                if not form:
+                    print("错误：未能找到ID为 'pwdFromId' 的登录表单。")
+                    return False
+
+                self.lt = form.find('input', {'name': 'lt'}).get('value', '')
+                self.execution = form.find('input', {'name': 'execution'}).get('value', '')
+                self.salt = form.find('input', {'id': 'pwdEncryptSalt'}).get('value', '')
+                self.cllt = form.find('input', {'name': 'cllt'}).get('value', 'userNameLogin')
+                self.dllt = form.find('input', {'name': 'dllt'}).get('value', 'generalLogin')
+                self._eventId = form.find('input', {'name': '_eventId'}).get('value', 'submit')
 
             if not all([self.execution, self.salt]):
                 print("错误：未能从登录页面获取到所有必要的参数。")
                 return False
             return True
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             print(f"错误：访问登录页面失败: {e}")
             return False
         except (AttributeError, TypeError) as e:
@@ -97,43 +206,53 @@ class YSULogin:
             return False
 
 
+    def _parse_login_form_fast(self, html):
+        """
+        不构建DOM树，直接从 pwdFromId 表单中提取登录参数
+
+        Returns:
+            bool: 是否成功提取了所有input，失败时由调用方回退到BeautifulSoup
+        """
+        inputs = find_form_inputs(html, 'pwdFromId')
+        if not inputs:
+            return False
+
+        values = {
+            'lt': find_input_value(inputs, name='lt', default=''),
+            'execution': find_input_value(inputs, name='execution', default=''),
+            'salt': find_input_value(inputs, element_id='pwdEncryptSalt', default=''),
+            'cllt': find_input_value(inputs, name='cllt', default='userNameLogin'),
+            'dllt': find_input_value(inputs, name='dllt', default='generalLogin'),
+            '_eventId': find_input_value(inputs, name='_eventId', default='submit'),
+        }
+        if any(value is None for value in values.values()):
+            return False
+
+        self.lt = values['lt']
+        self.execution = values['execution']
+        self.salt = values['salt']
+        self.cllt = values['cllt']
+        self.dllt = values['dllt']
+        self._eventId = values['_eventId']
+        return True
+
     def _need_captcha(self):
         """
         检查是否需要输入验证码
         """
         try:
-            resp = self.session.post(self.CHECK_CAPTCHA_URL, data={"username": self.username}, verify=False, timeout=5, proxies=self.proxies)
+            resp = self._request("ysu_login.check_captcha", "POST", self.CHECK_CAPTCHA_URL,
+                                 data={"username": self.username})
             resp.raise_for_status()
             data = resp.json()
             return data.get("isNeed", False)
-        except (requests.exceptions.RequestException, ValueError) as e:
+        except (requests.exceptions.RequestException, CircuitOpenError, ValueError) as e:
             print(f"警告：检查验证码失败，将不使用验证码登录。错误: {e}")
             return False
 
-    def _cleanup_captcha_files(self):
-        """
-        清理所有创建的验证码文件
-        """
-        for file_path in self.captcha_files:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    print(f"已清理验证码文件: {file_path}")
-            except Exception as e:
-                print(f"清理验证码文件失败 {file_path}: {e}")
-        self.captcha_files.clear()
-
-    def _generate_captcha_filename(self):
-        """
-        生成唯一的验证码文件名
-        """
-        timestamp = str(int(random.random() * 1000000))
-        filename = f"captcha_{timestamp}.jpg"
-        return filename
-
     def _image_to_ascii(self, image_data, width=60, char_set="standard"):
         """
-        将图像数据转换为 ASCII 字符
+        将图像数据转换为 ASCII 字符（见 ascii_render.image_to_ascii）
         
         Args:
             image_data: 图像二进制数据
@@ -141,124 +260,110 @@ class YSULogin:
             char_set: 字符集类型 ("dense", "standard", "extended")
         
         Returns:
-            ASCII 字符串
+            (ASCII 字符串, 原始尺寸, ASCII尺寸)，失败时尺寸为None
         """
         try:
-            # 不同密度的字符集
-            ascii_chars_dense = "@%#*+=-:. "
-            ascii_chars_standard = "@#S%?*+;:,. "
-            ascii_chars_extended = "$@B%8&WM#*oahkbdpqwmZO0QLCJUYXzcvunxrjft/\\|()1{}[]?-_+~<>i!lI;:,\"^`'. "
-            
-            # 选择字符集
-            if char_set == "dense":
-                ascii_chars = ascii_chars_dense
-            elif char_set == "extended":
-                ascii_chars = ascii_chars_extended
-            else:
-                ascii_chars = ascii_chars_standard
-            
-            # 从二进制数据创建图像
-            image = Image.open(BytesIO(image_data))
-            
-            # 获取原始尺寸
-            orig_width, orig_height = image.size
-            
-            # 计算新的高度，保持宽高比
-            aspect_ratio = orig_height / orig_width
-            height = int(aspect_ratio * width * 0.55)  # 0.55 用于补偿字符高宽比
-            
-            # 调整图像大小
-            image = image.resize((width, height))
-            
-            # 转换为灰度
-            image = image.convert('L')
-            
-            # 获取像素数据
-            pixels = image.getdata()
-            
-            # 将像素映射到 ASCII 字符
-            ascii_str = ""
-            for i, pixel in enumerate(pixels):
-                # 将像素值 (0-255) 映射到字符索引
-                char_index = int(pixel * (len(ascii_chars) - 1) / 255)
-                ascii_str += ascii_chars[char_index]
-                
-                # 每行结束时添加换行符
-                if (i + 1) % width == 0:
-                    ascii_str += "\n"
-            
-            return ascii_str, (orig_width, orig_height), (width, height)
-            
+            return image_to_ascii(image_data, width=width, char_set=char_set)
         except Exception as e:
             return f"ASCII转换失败: {e}", None, None
 
+    def _image_to_halfblocks(self, image_data, width=60):
+        """
+        将图像数据转换为 ANSI 半块字符（真彩色，见 ascii_render.image_to_halfblocks）
+
+        Returns:
+            (带转义序列的字符串, 原始尺寸, 字符尺寸)，失败时尺寸为None
+        """
+        try:
+            return image_to_halfblocks(image_data, width=width)
+        except Exception as e:
+            return f"ANSI渲染失败: {e}", None, None
+
+    def _display_captcha(self, image_data):
+        """
+        按显示模式显示验证码：ascii/blocks 直接在内存中渲染；file/both 需要图片查看器，
+        才把图片写到仅当前用户可读的临时文件（见 spill_captcha）
+
+        Returns:
+            str: 写出的临时文件路径，未写文件时为None
+        """
+        print("=" * 60)
+        print("验证码显示")
+        print("=" * 60)
+
+        if self.display_mode in ['ascii', 'blocks', 'both']:
+            # 显示ASCII艺术版本（blocks 模式为真彩色半块字符）
+            print("\nASCII 艺术版本:")
+            print("-" * 40)
+            if self.display_mode == 'blocks':
+                ascii_art, orig_size, new_size = self._image_to_halfblocks(image_data, width=60)
+            else:
+                ascii_art, orig_size, new_size = self._image_to_ascii(image_data, width=60, char_set="standard")
+            if orig_size:
+                print(f"原始尺寸: {orig_size[0]}x{orig_size[1]} -> ASCII尺寸: {new_size[0]}x{new_size[1]}")
+                print()
+            print(ascii_art)
+            print("-" * 40)
+
+        captcha_file = None
+        if self.display_mode in ['file', 'both']:
+            captcha_file = spill_captcha(image_data)
+            print(f"\n验证码已保存到文件: {captcha_file}")
+
+            # 尝试自动打开图片（Windows系统）
+            try:
+                if os.name == 'nt':  # Windows
+                    os.startfile(captcha_file)
+                    print("验证码图片已自动打开")
+                else:
+                    print(f"请手动打开验证码图片: {captcha_file}")
+            except Exception:
+                print(f"无法自动打开图片，请手动查看: {captcha_file}")
+
+        print("=" * 60)
+        return captcha_file
+
     def _fetch_captcha(self):
         """
-        获取验证码并由用户输入，支持ASCII艺术显示和文件保存
+        获取验证码：先交给识别器，未能识别时显示并由用户输入；图片只保存在内存中
         """
         captcha_file = None
         try:
             # 获取验证码图片
-            resp = self.session.get(self.CAPTCHA_URL, verify=False, timeout=5, proxies=self.proxies)
+            resp = self._request("ysu_login.fetch_captcha", "GET", self.CAPTCHA_URL)
             resp.raise_for_status()
             image_data = resp.content
-            
-            print("=" * 60)
-            print("验证码显示")
-            print("=" * 60)
-            
-            # 根据显示模式处理验证码
-            if self.display_mode in ['ascii', 'both']:
-                # 显示ASCII艺术版本
-                print("\nASCII 艺术版本:")
-                print("-" * 40)
-                ascii_art, orig_size, new_size = self._image_to_ascii(image_data, width=60, char_set="standard")
-                if orig_size:
-                    print(f"原始尺寸: {orig_size[0]}x{orig_size[1]} -> ASCII尺寸: {new_size[0]}x{new_size[1]}")
-                    print()
-                    print(ascii_art)
-                else:
-                    print(ascii_art)
-                print("-" * 40)
-            
-            if self.display_mode in ['file', 'both']:
-                # 保存到文件
-                captcha_file = self._generate_captcha_filename()
-                with open(captcha_file, 'wb') as f:
-                    f.write(image_data)
-                
-                # 添加到跟踪列表
-                self.captcha_files.append(captcha_file)
-                
-                print(f"\n验证码已保存到文件: {captcha_file}")
-                
-                # 尝试自动打开图片（Windows系统）
+
+            if self.captcha_solver:
                 try:
-                    if os.name == 'nt':  # Windows
-                        os.startfile(captcha_file)
-                        print("验证码图片已自动打开")
-                    else:
-                        print(f"请手动打开验证码图片: {captcha_file}")
-                except Exception:
-                    print(f"无法自动打开图片，请手动查看: {captcha_file}")
-            
-            print("=" * 60)
-            
-            # 获取用户输入
-            try:
-                self.captcha = input("请输入验证码: ").strip()
-                if not self.captcha:
-                    print("警告：验证码为空")
-                    return False
-                    
-                print(f"验证码输入完成: {self.captcha}")
-                return True
-                
-            except (KeyboardInterrupt, EOFError):
-                print("\n验证码输入已取消")
-                raise KeyboardInterrupt("用户取消验证码输入")
-                
-        except requests.exceptions.RequestException as e:
+                    answer = self.captcha_solver.solve(image_data)
+                except Exception as e:
+                    # 识别器出错不影响手动输入
+                    print(f"警告：验证码识别器出错: {e}")
+                    answer = None
+                if answer:
+                    self.captcha = answer
+                    print(f"验证码已自动识别: {answer}")
+                    return True
+                print("验证码自动识别失败")
+
+            if not self.manual_captcha:
+                # 无人值守时不阻塞在输入上
+                print("错误：需要验证码但未启用手动输入")
+                return False
+
+            def display(data):
+                nonlocal captcha_file
+                captcha_file = self._display_captcha(data)
+
+            # 显示验证码并由用户输入，取消输入时抛出 KeyboardInterrupt
+            self.captcha = ManualSolver(display=display).solve(image_data)
+            if not self.captcha:
+                return False
+            print(f"验证码输入完成: {self.captcha}")
+            return True
+
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             print(f"错误：获取验证码失败: {e}")
             return False
         except Exception as e:
@@ -266,20 +371,19 @@ class YSULogin:
             return False
         finally:
             # 立即清理当前验证码文件
-            if captcha_file and os.path.exists(captcha_file):
+            if captcha_file:
                 try:
-                    os.remove(captcha_file)
+                    remove_captcha_file(captcha_file)
                     print(f"验证码文件已清理: {captcha_file}")
-                    if captcha_file in self.captcha_files:
-                        self.captcha_files.remove(captcha_file)
-                except Exception as e:
+                except OSError as e:
                     print(f"清理验证码文件失败: {e}")
 
 
     def login(self):
         """
-        执行登录操作
+        执行登录操作，可以在同一个对象上重复调用
         """
+        self.reset()
         if not self._fetch_login_page():
             return False
 
@@ -303,18 +407,16 @@ class YSULogin:
 
         try:
             # 提交登录表单
-            resp = self.session.post(self.LOGIN_URL, data=data, allow_redirects=False, verify=False, timeout=10, proxies=self.proxies)
+            resp = self._request("ysu_login.submit", "POST", self.LOGIN_URL, data=data, allow_redirects=False)
 
             # 检查是否登录成功 (成功时通常是302重定向)
             if resp.status_code == 302 and 'Location' in resp.headers:
                 location = resp.headers['Location']
                 print(f"登录成功！正在跳转到: {location}")
                 # 可以选择访问跳转后的页面来确认
-                final_resp = self.session.get(location, verify=False, proxies=self.proxies)
+                final_resp = self._request("ysu_login.follow_redirect", "GET", location)
                 if "统一身份认证" not in final_resp.text:
                     print("确认登录成功。")
-                    # 登录成功后清理所有验证码文件
-                    self._cleanup_captcha_files()
                     return True
                 else:
                     print("登录似乎成功，但又跳转回了登录页，请检查。")
@@ -322,16 +424,20 @@ class YSULogin:
 
             # 处理登录失败
             else:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                error_msg_span = soup.find('span', {'id': 'showErrorTip'})
-                if error_msg_span:
-                    error_msg = error_msg_span.get_text(strip=True)
+                error_msg = find_text_by_id(resp.text, 'showErrorTip', 'span')
+                if error_msg is None:
+                    from bs4 import BeautifulSoup
+                    soup = BeautifulSoup(resp.text, 'html.parser')
+                    error_msg_span = soup.find('span', {'id': 'showErrorTip'})
+                    if error_msg_span:
+                        error_msg = error_msg_span.get_text(strip=True)
+                if error_msg is not None:
                     print(f"登录失败：{error_msg}")
                 else:
                     print("登录失败，未找到明确的错误信息。")
                 return False
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             print(f"登录请求失败: {e}")
             return False
 
@@ -343,8 +449,8 @@ def test_login():
     username = input("请输入用户名: ")
     password = input("请输入密码: ")
     
-    client = YSULogin(username, password, display_mode='both')
-    success = client.login()
+    with YSULogin(username, password, display_mode='both') as client:
+        success = client.login()
     
     print("\n" + "=" * 50)
     print("登录流程结束。")
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from ysu_net_login.mock_portal import MockPortalServer
+
+
+@pytest.fixture(autouse=True)
+def isolated_dirs(tmp_path, monkeypatch):
+    """把缓存、配置和运行时目录指向临时目录，并清除会影响配置的环境变量"""
+    for name in ('XDG_CACHE_HOME', 'XDG_CONFIG_HOME', 'XDG_RUNTIME_DIR'):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setenv(name, str(path))
+    for name in list(os.environ):
+        if name.startswith('RUIJIE_') or name.lower() in ('http_proxy', 'https_proxy', 'all_proxy', 'no_proxy'):
+            monkeypatch.delenv(name)
+    # 项目配置文件从当前目录向上查找
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def portal():
+    """本地模拟门户"""
+    with MockPortalServer() as server:
+        yield server
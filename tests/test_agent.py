@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ysu_net_login.agent import AgentClient, AgentError, AgentUnavailable, ResidentAgent
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+def start_agent(path, client, **options):
+    agent = ResidentAgent(client, path=path, **options)
+    thread = threading.Thread(target=agent.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not AgentClient(path).is_running():
+        assert time.monotonic() < deadline, "agent did not start"
+        time.sleep(0.01)
+    return agent, thread
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'agent.sock')
+
+
+@pytest.fixture
+def agent(portal, socket_path):
+    agent, thread = start_agent(socket_path, RuijieClient(portal_base=portal.base_url))
+    yield agent
+    agent.stop()
+    thread.join(5)
+
+
+def test_ping_reports_agent(agent, socket_path, portal):
+    result = AgentClient(socket_path).call('ping')
+    assert result['pid'] == os.getpid()
+    assert result['portal_base'] == portal.base_url
+
+
+def test_login_and_status_share_the_agent_client(agent, socket_path, portal):
+    client = AgentClient(socket_path)
+    assert client.call('status')['logged_in'] is False
+    assert client.call('login', username='alice', password='secret') == {'success': True, 'service': '校园网'}
+    status = client.call('status')
+    assert status['logged_in'] is True
+    assert status['info']['portalOnlineUserInfo']['userName'] == 'alice'
+    # 登录时记录的会话信息直接用于 logout，不再走重定向链
+    redirects = portal.state.request_counts['GET /eportal/redirect.jsp']
+    assert client.call('logout') == {'success': True}
+    assert portal.state.request_counts['GET /eportal/redirect.jsp'] == redirects
+    assert agent.requests_served >= 4
+
+
+def test_unknown_method_is_unavailable(agent, socket_path):
+    with pytest.raises(AgentUnavailable, match='Unknown method'):
+        AgentClient(socket_path).call('reboot')
+
+
+def test_bad_parameters_are_rejected(agent, socket_path):
+    with pytest.raises(AgentError) as info:
+        AgentClient(socket_path).call('login', username='alice')
+    assert info.value.error_type == 'bad_request'
+
+
+def test_handler_errors_are_reported(agent, socket_path):
+    with pytest.raises(AgentError) as info:
+        AgentClient(socket_path).call('login', username='alice', password='secret', service='no-such-service')
+    assert 'unknown service' in str(info.value)
+
+
+def test_client_without_agent(socket_path):
+    client = AgentClient(socket_path)
+    assert not client.is_running()
+    with pytest.raises(AgentUnavailable):
+        client.call('status')
+
+
+def test_shutdown_removes_socket(portal, socket_path):
+    agent, thread = start_agent(socket_path, RuijieClient(portal_base=portal.base_url))
+    with pytest.raises(RuntimeError, match='already running'):
+        ResidentAgent(RuijieClient(portal_base=portal.base_url), path=socket_path).serve_forever()
+
+    assert AgentClient(socket_path).call('shutdown') == {'stopping': True}
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not os.path.exists(socket_path)
+
+
+def test_mismatched_fingerprint_is_unavailable(portal, socket_path):
+    agent, thread = start_agent(socket_path, RuijieClient(portal_base=portal.base_url), fingerprint='agent')
+    try:
+        assert AgentClient(socket_path, fingerprint='agent').call('status')['logged_in'] is False
+        with pytest.raises(AgentUnavailable, match='different client configuration'):
+            AgentClient(socket_path, fingerprint='cli').call('status')
+        # ping 和 shutdown 不受客户端配置影响
+        assert AgentClient(socket_path, fingerprint='cli').call('ping')['fingerprint'] == 'agent'
+    finally:
+        agent.stop()
+        thread.join(5)
+
+
+def test_fingerprint_follows_effective_config(monkeypatch):
+    from ysu_net_login.config import Config
+
+    base = Config().client_fingerprint()
+    assert Config().client_fingerprint() == base
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', 'http://127.0.0.1:1')
+    assert Config().client_fingerprint() != base
+    monkeypatch.delenv('RUIJIE_PORTAL_BASE')
+    monkeypatch.setenv('RUIJIE_TIMEOUT', '3')
+    assert Config().client_fingerprint() != base
+
+
+def test_parameters_are_checked_before_dispatch(socket_path):
+    agent = ResidentAgent(RuijieClient(), path=socket_path)
+    for request in ({'method': 'login', 'params': {'username': 'alice'}},
+                    {'method': 'status', 'params': {'verbose': True}},
+                    {'method': 'status', 'params': ['alice']}):
+        response = agent.handle(request)
+        assert response['ok'] is False
+        assert response['error_type'] == 'bad_request'
+    assert agent.requests_served == 0
+
+
+def test_internal_type_error_is_not_a_bad_request(socket_path, monkeypatch):
+    agent = ResidentAgent(RuijieClient(), path=socket_path)
+
+    def broken():
+        raise TypeError("unsupported operand type(s)")
+
+    monkeypatch.setattr(agent.client, 'check_login_status', broken)
+    response = agent.handle({'method': 'status'})
+    assert response['ok'] is False
+    assert response['error_type'] == 'TypeError'
+    assert 'unsupported operand' in response['error']
@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from ysu_net_login.ascii_render import (ANSI_RESET, CHAR_ASPECT, CHAR_SETS, UPPER_HALF_BLOCK, image_to_ascii,
+                                        image_to_halfblocks)
+
+
+def gradient(width=90, height=30):
+    """水平灰度渐变加彩色方块，覆盖全部灰度值"""
+    image = Image.new('RGB', (width, height))
+    for x in range(width):
+        for y in range(height):
+            value = x * 255 // (width - 1)
+            image.putpixel((x, y), (value, value, value))
+    image.paste((200, 30, 30), (0, 0, 10, 10))
+    return image
+
+
+def reference_ascii(image, width, chars):
+    """逐像素计算的参考实现（旧版渲染方式）"""
+    height = int(image.size[1] / image.size[0] * width * CHAR_ASPECT)
+    pixels = image.resize((width, height)).convert('L').tobytes()
+    text = ''
+    for i, pixel in enumerate(pixels):
+        text += chars[int(pixel * (len(chars) - 1) / 255)]
+        if (i + 1) % width == 0:
+            text += '\n'
+    return text
+
+
+@pytest.mark.parametrize('char_set', sorted(CHAR_SETS))
+@pytest.mark.parametrize('width', [20, 60, 120])
+def test_ascii_matches_per_pixel_reference(char_set, width):
+    image = gradient()
+    text, original, size = image_to_ascii(image, width=width, char_set=char_set)
+    assert text == reference_ascii(image, width, CHAR_SETS[char_set])
+    assert original == (90, 30)
+    assert size[0] == width
+
+
+def test_ascii_accepts_png_bytes_and_unknown_char_set():
+    buffer = BytesIO()
+    gradient().save(buffer, format='PNG')
+    text, _, (width, height) = image_to_ascii(buffer.getvalue(), width=30, char_set='nosuch')
+    lines = text.splitlines()
+    assert len(lines) == height
+    assert all(len(line) == width for line in lines)
+    assert set(text) <= set(CHAR_SETS['standard'] + '\n')
+
+
+@pytest.mark.parametrize('color', [True, False])
+def test_halfblocks_dimensions_and_reset(color):
+    text, original, (width, rows) = image_to_halfblocks(gradient(), width=40, color=color)
+    lines = text.splitlines()
+    assert original == (90, 30)
+    assert width == 40
+    assert len(lines) == rows
+    for line in lines:
+        assert line.count(UPPER_HALF_BLOCK) == 40
+        assert line.endswith(ANSI_RESET)
+    assert ('\x1b[38;2;200;30;30m' in text) is color
+
+
+def test_halfblocks_skip_repeated_colors():
+    image = Image.new('RGB', (20, 20), (10, 20, 30))
+    text, _, _ = image_to_halfblocks(image, width=20)
+    first = text.splitlines()[0]
+    assert first == '\x1b[38;2;10;20;30m\x1b[48;2;10;20;30m' + UPPER_HALF_BLOCK * 20 + ANSI_RESET
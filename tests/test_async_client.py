@@ -0,0 +1,64 @@
+import asyncio
+import socket
+
+import pytest
+
+from ysu_net_login.async_client import AsyncRuijieClient
+from ysu_net_login.ruijie_client import RuijieClient
+
+# AsyncRuijieClient 需要可选依赖 aiohttp
+pytest.importorskip('aiohttp')
+
+
+def run(coro_func, *args, **kwargs):
+    """在新的事件循环中用 AsyncRuijieClient 执行 coro_func(client)"""
+    async def main():
+        async with AsyncRuijieClient(*args, **kwargs) as client:
+            return await coro_func(client)
+    return asyncio.run(main())
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_unreachable_portal_reports_offline_like_sync_client():
+    proxy = f"http://127.0.0.1:{unused_port()}"
+    proxies = {'http': proxy, 'https': proxy}
+    expected = RuijieClient(proxies=proxies).check_login_status()
+    assert expected == (False, None)
+    assert run(lambda client: client.check_login_status(), proxies=proxies) == expected
+
+
+def test_login_status_and_logout_match_sync_client(portal):
+    sync = RuijieClient(portal_base=portal.base_url)
+
+    async def login(client):
+        assert await client.login('alice', 'secret')
+        return await client.check_login_status()
+
+    logged_in, info = run(login, portal_base=portal.base_url)
+    assert logged_in
+    assert info == sync.check_login_status()[1]
+    assert portal.state.request_counts['POST /eportal/network/serviceLogin'] == 1
+
+    async def logout(client):
+        assert await client.logout()
+        return await client.check_login_status()
+
+    assert run(logout, portal_base=portal.base_url)[0] is False
+    assert sync.check_login_status()[0] is False
+
+
+def test_service_login_failure_raises_like_sync_client(portal):
+    with pytest.raises(Exception, match='unknown service') as sync_error:
+        RuijieClient(portal_base=portal.base_url).login('alice', 'secret', service='no-such-service')
+
+    async def login(client):
+        with pytest.raises(Exception) as async_error:
+            await client.login('alice', 'secret', service='no-such-service')
+        return str(async_error.value)
+
+    assert run(login, portal_base=portal.base_url) == str(sync_error.value)
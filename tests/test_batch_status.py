@@ -0,0 +1,66 @@
+import json
+import socket
+import sys
+
+import pytest
+
+from ysu_net_login.fleet import StatusTarget, load_status_targets, run_batch_status
+from ysu_net_login.retry import RetryConfig, RetryPolicy
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_load_status_targets(tmp_path):
+    path = tmp_path / 'hosts.txt'
+    path.write_text(
+        "# 机房\n"
+        "lab-101  proxy=socks5://10.20.1.101:1080\n"
+        "\n"
+        "lab-102  source=10.20.1.102   # 注释\n"
+        "lab-103  http://10.20.1.103:3128\n",
+        encoding='utf-8')
+    targets = load_status_targets(str(path))
+    assert [t.name for t in targets] == ['lab-101', 'lab-102', 'lab-103']
+    assert targets[0].get_proxies() == {'http': 'socks5://10.20.1.101:1080', 'https': 'socks5://10.20.1.101:1080'}
+    assert targets[1].source_address == '10.20.1.102' and targets[1].get_proxies() == {}
+    assert targets[2].proxy == 'http://10.20.1.103:3128'
+
+
+def test_load_status_targets_rejects_unknown_option(tmp_path):
+    path = tmp_path / 'hosts.txt'
+    path.write_text("lab-101 port=22\n", encoding='utf-8')
+    with pytest.raises(ValueError, match=':1: unknown option'):
+        load_status_targets(str(path))
+
+
+def test_batch_status_against_portal(portal):
+    RuijieClient(portal_base=portal.base_url).login('alice', 'secret')
+    targets = [StatusTarget('local'), StatusTarget('also-local', source_address='127.0.0.1'),
+               StatusTarget('unreachable', proxy=f'http://127.0.0.1:{unused_port()}')]
+    seen = []
+    results = run_batch_status(targets, concurrency=3, portal_base=portal.base_url,
+                               retry=RetryConfig(RetryPolicy(max_attempts=1)), on_result=seen.append)
+
+    assert [r.target.name for r in results] == ['local', 'also-local', 'unreachable']
+    assert sorted(r.target.name for r in seen) == ['also-local', 'local', 'unreachable']
+    assert results[0].logged_in is True and results[1].logged_in is True
+    assert results[0].to_dict()['username']
+    assert results[2].logged_in is None and results[2].to_dict()['error']
+
+
+def test_cli_batch_status_json(portal, tmp_path, monkeypatch, capsys):
+    from ysu_net_login import ruijie_cli
+
+    path = tmp_path / 'hosts.txt'
+    path.write_text("lab-101\nlab-102 source=127.0.0.1\n", encoding='utf-8')
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', portal.base_url)
+    monkeypatch.setattr(sys, 'argv', ['ysunetlogin', '--output', 'json', 'status', '--batch', str(path)])
+    assert ruijie_cli.main() == 0
+    document = json.loads(capsys.readouterr().out)
+    assert [host['host'] for host in document['result']['hosts']] == ['lab-101', 'lab-102']
+    assert all(host['logged_in'] is False for host in document['result']['hosts'])
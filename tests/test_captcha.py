@@ -0,0 +1,47 @@
+import pytest
+
+from ysu_net_login.captcha import CaptchaSolver, ManualSolver, SolverChain
+
+
+class FixedSolver(CaptchaSolver):
+    def __init__(self, answer):
+        self.answer = answer
+
+    def solve(self, image_data):
+        return self.answer
+
+
+def test_solver_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CaptchaSolver()
+
+    class Incomplete(CaptchaSolver):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_manual_solver_displays_and_reads_input(monkeypatch):
+    shown = []
+    monkeypatch.setattr('builtins.input', lambda prompt='': ' ab12 ')
+    assert ManualSolver(display=shown.append).solve(b'image') == 'ab12'
+    assert shown == [b'image']
+
+
+def test_manual_solver_empty_or_cancelled_input(capsys):
+    assert ManualSolver(input_func=lambda prompt: '  ').solve(b'image') is None
+    assert '验证码为空' in capsys.readouterr().out
+
+    def cancel(prompt):
+        raise EOFError
+
+    with pytest.raises(KeyboardInterrupt):
+        ManualSolver(input_func=cancel).solve(b'image')
+
+
+def test_chain_returns_first_answer():
+    second = FixedSolver('cd34')
+    chain = SolverChain([FixedSolver(None), second, FixedSolver('never')])
+    assert chain.solve(b'image') == 'cd34'
+    assert chain.last_solver is second
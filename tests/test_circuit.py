@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+from ysu_net_login import circuit
+from ysu_net_login.circuit import CircuitBreaker, CircuitBreakers, CircuitOpenError
+from ysu_net_login.retry import RetryConfig, RetryPolicy
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+STATUS_QUERY = 'GET /eportal/adaptor/getOnlineUserInfo'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit.time, 'time', clock.time)
+    return clock
+
+
+def test_opens_after_threshold_and_rejects_calls(clock):
+    breaker = CircuitBreaker('portal', failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == circuit.CLOSED
+    breaker.record_failure()
+    assert breaker.state == circuit.OPEN
+
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    assert info.value.retry_after == 30
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker('portal', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    assert breaker.state == circuit.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == circuit.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker('portal', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == circuit.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_stalled_probe_expires(clock):
+    breaker = CircuitBreaker('portal', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    # 探测进程没有记录结果就退出了
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == circuit.HALF_OPEN
+
+
+def test_state_is_shared_through_file(clock, tmp_path):
+    path = str(tmp_path / 'circuit.json')
+    CircuitBreakers(path, failure_threshold=1).get('a').record_failure()
+    CircuitBreakers(path, failure_threshold=1).get('b').record_failure()
+
+    states = {host: state for host, state, _, _ in CircuitBreakers(path).states()}
+    assert states == {'a': circuit.OPEN, 'b': circuit.OPEN}
+
+
+def test_open_circuit_stops_requests_to_portal(portal):
+    portal.state.inject_fault('GET', '/eportal/adaptor/getOnlineUserInfo', count=2)
+    client = RuijieClient(portal_base=portal.base_url, circuits=CircuitBreakers(failure_threshold=2),
+                          retry=RetryConfig(RetryPolicy(max_attempts=1)))
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.get_online_user_info()
+    with pytest.raises(CircuitOpenError):
+        client.get_online_user_info()
+    assert portal.state.request_counts[STATUS_QUERY] == 2
@@ -0,0 +1,57 @@
+import json
+import sys
+
+import pytest
+
+from ysu_net_login import ruijie_cli
+
+
+def run_cli(monkeypatch, capsys, *argv):
+    """以给定参数运行命令行，返回退出码和标准输出"""
+    monkeypatch.setattr(sys, 'argv', ['ysunetlogin', *argv])
+    code = ruijie_cli.main()
+    return code, capsys.readouterr().out
+
+
+@pytest.fixture
+def cli_env(portal, monkeypatch):
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', portal.base_url)
+    monkeypatch.setenv('RUIJIE_USERNAME', '20230001')
+    monkeypatch.setenv('RUIJIE_PASSWORD', 'secret')
+    monkeypatch.setenv('RUIJIE_AGENT', '0')
+    return portal
+
+
+def test_json_login_and_status(cli_env, monkeypatch, capsys):
+    code, out = run_cli(monkeypatch, capsys, '--output', 'json', 'login', '--service', 'campus')
+    assert code == 0
+    document = json.loads(out)
+    assert document['command'] == 'login'
+    assert document['ok'] is True
+    assert document['result']['success'] is True
+    assert document['timings']
+    assert document['elapsed_ms'] > 0
+
+    code, out = run_cli(monkeypatch, capsys, 'status', '--output', 'json')
+    assert code == 0
+    document = json.loads(out)
+    assert document['command'] == 'status'
+    assert document['result']['logged_in'] is True
+
+
+def test_ndjson_error_is_one_line(cli_env, monkeypatch, capsys):
+    code, out = run_cli(monkeypatch, capsys, '--output', 'ndjson', 'login', '--service', 'nosuch')
+    assert code == 1
+    lines = out.splitlines()
+    assert len(lines) == 1
+    document = json.loads(lines[0])
+    assert document['command'] == 'login'
+    assert document['ok'] is False
+    assert document['error']
+
+
+def test_text_output_is_not_json(cli_env, monkeypatch, capsys):
+    code, out = run_cli(monkeypatch, capsys, 'status')
+    assert code == 0
+    with pytest.raises(ValueError):
+        json.loads(out)
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from ysu_net_login import config_files
+from ysu_net_login.config import Config
+from ysu_net_login.config_files import ConfigFileError
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def no_system_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config_files, 'SYSTEM_CONFIG', str(tmp_path / 'etc' / 'config.toml'))
+    return tmp_path / 'etc' / 'config.toml'
+
+
+@pytest.fixture
+def user_config(tmp_path):
+    return tmp_path / 'xdg_config_home' / 'ysunetlogin' / 'config.toml'
+
+
+def test_layers_merge_in_order(no_system_config, user_config, tmp_path, monkeypatch):
+    write(no_system_config, 'service = "unicom"\ntimeout = 20\n[services]\nsys = "中国移动"\n')
+    write(user_config, 'timeout = 8\nretries = 3\n[services]\nlab = "中国电信"\n')
+    write(tmp_path / 'project' / 'ysunetlogin.toml', 'retries = 1\n')
+    explicit = write(tmp_path / 'explicit.toml', 'connect_timeout = 2\n')
+    (tmp_path / 'project' / 'sub').mkdir()
+    monkeypatch.chdir(tmp_path / 'project' / 'sub')
+
+    config = Config(str(explicit))
+    assert config.service == '中国联通'
+    assert (config.timeout, config.retries, config.connect_timeout) == (8, 1, 2)
+    # services 按键合并
+    assert config.SERVICE_MAPPING['sys'] == '中国移动'
+    assert config.SERVICE_MAPPING['lab'] == '中国电信'
+
+
+def test_environment_and_arguments_override_files(no_system_config, user_config, monkeypatch):
+    write(user_config, 'timeout = 8\nretries = 3\n')
+    monkeypatch.setenv('RUIJIE_TIMEOUT', '4')
+    config = Config()
+    assert (config.timeout, config.retries) == (4, 3)
+
+    class Args:
+        retries = 0
+    config.update_from_args(Args())
+    assert config.retries == 0
+
+
+def test_invalid_values_raise(no_system_config, user_config):
+    write(user_config, 'timeout = "fast"\n')
+    with pytest.raises(ConfigFileError, match="'timeout' must be"):
+        Config()
+    write(user_config, 'retries = -1\n')
+    with pytest.raises(ConfigFileError, match='retries'):
+        Config()
+
+
+def test_snapshot_is_reused_until_a_file_changes(no_system_config, user_config):
+    path = write(user_config, 'timeout = 8\nbogus = 1\n')
+    first = config_files.load()
+    assert not first.cached
+    second = config_files.load()
+    assert second.cached and second.settings == {'timeout': 8}
+    # 未知配置项的警告也保存在快照中
+    assert second.warnings == first.warnings and 'bogus' in second.warnings[0]
+
+    write(user_config, 'timeout = 9\n')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    third = config_files.load()
+    assert not third.cached and third.settings == {'timeout': 9}
+
+
+def test_secrets_are_not_snapshotted(no_system_config, user_config):
+    write(user_config, 'username = "alice"\npassword = "secret"\n')
+    config_files.load()
+    assert not os.path.exists(config_files.default_snapshot_path())
+    assert not config_files.load().cached
+
+
+def test_project_search_stops_at_repository_root(no_system_config, tmp_path, monkeypatch):
+    write(tmp_path / 'ysunetlogin.toml', 'timeout = 1\n')
+    repo = tmp_path / 'repo'
+    (repo / '.git').mkdir(parents=True)
+    (repo / 'src').mkdir()
+    monkeypatch.chdir(repo / 'src')
+    assert config_files.find_project_config() is None
+
+    write(repo / 'ysunetlogin.toml', 'timeout = 2\n')
+    assert config_files.find_project_config() == str(repo / 'ysunetlogin.toml')
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX file ownership')
+def test_project_file_writable_by_others_is_ignored(no_system_config, tmp_path):
+    path = write(tmp_path / 'ysunetlogin.toml', 'portal_base = "http://attacker.example"\n')
+    os.chmod(path, 0o666)
+    warnings = []
+    assert config_files.find_project_config(warnings=warnings) is None
+    assert 'writable by others' in warnings[0]
+    assert Config().portal_base is None
@@ -0,0 +1,68 @@
+import base64
+
+import pytest
+
+pytest.importorskip('Crypto')
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import unpad
+
+from ysu_net_login.crypto import (RANDOM_CHARS, aes_ecb_encrypt, aes_ecb_encrypt_many, encrypt_cas_password,
+                                  random_string)
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.ysu_login import YSULogin
+
+KEY = base64.b64encode(b'0123456789abcdef').decode('ascii')
+
+
+def ecb_decrypt(key_b64, ciphertext):
+    cipher = AES.new(base64.b64decode(key_b64), AES.MODE_ECB)
+    return unpad(cipher.decrypt(base64.b64decode(ciphertext)), AES.block_size).decode('utf-8')
+
+
+@pytest.mark.parametrize('plaintexts', [('secret', '{}'), ('', 'x' * 16), ('密码' * 9, '{"captcha":"ab12"}')])
+def test_encrypt_many_matches_one_by_one(plaintexts):
+    combined = aes_ecb_encrypt_many(KEY, *plaintexts)
+    assert combined == [aes_ecb_encrypt(KEY, text) for text in plaintexts]
+    assert [ecb_decrypt(KEY, text) for text in combined] == list(plaintexts)
+
+
+def test_cas_password_decrypts_to_prefix_and_password():
+    salt = 'abcdefghijklmnop'
+    ciphertext = base64.b64decode(encrypt_cas_password('s3cret', salt))
+    # 不知道IV时只有第一个分组无法解出
+    decrypted = unpad(AES.new(salt.encode(), AES.MODE_CBC, b'\0' * 16).decrypt(ciphertext), AES.block_size)
+    assert decrypted[64:] == b's3cret'
+    assert set(decrypted[16:64].decode('ascii')) <= set(RANDOM_CHARS)
+    # 每次使用新的随机前缀和IV
+    assert encrypt_cas_password('s3cret', salt) != encrypt_cas_password('s3cret', salt)
+
+
+def test_random_string_uses_page_charset():
+    for length in (0, 1, 16, 200):
+        value = random_string(length)
+        assert len(value) == length
+        assert set(value) <= set(RANDOM_CHARS)
+    assert len(set(random_string(2000))) == len(RANDOM_CHARS)
+
+
+@pytest.fixture
+def strict_portal():
+    with MockPortalServer(accounts={'alice': 'secret'}) as server:
+        yield server
+
+
+def test_portal_accepts_encrypted_passwords(strict_portal):
+    RuijieClient(portal_base=strict_portal.base_url).login('alice', 'secret')
+    assert strict_portal.state.online is not None
+    with YSULogin('alice', 'secret', cas_base=strict_portal.base_url) as client:
+        assert client.login()
+
+
+def test_portal_rejects_wrong_password(strict_portal):
+    with pytest.raises(Exception, match='密码'):
+        RuijieClient(portal_base=strict_portal.base_url).login('alice', 'wrong')
+    assert strict_portal.state.online is None
+    with YSULogin('alice', 'wrong', cas_base=strict_portal.base_url) as client:
+        assert client.login() is False
@@ -0,0 +1,109 @@
+from ysu_net_login.daemon import KeepAliveDaemon
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+class ScriptedClient:
+    """按顺序返回预设的状态查询结果"""
+
+    verbose = False
+
+    def __init__(self, statuses, login_error=None):
+        self.statuses = list(statuses)
+        self.login_error = login_error
+        self.logins = 0
+
+    def check_login_status(self):
+        return self.statuses.pop(0)
+
+    def login(self, username, password, service):
+        self.logins += 1
+        if self.login_error:
+            raise self.login_error
+        return True
+
+
+ONLINE = (True, {'portalOnlineUserInfo': {}})
+OFFLINE = (False, 'http://portal/redirect')
+UNREACHABLE = (False, None)
+
+
+def make_daemon(client, **options):
+    options.setdefault('min_interval', 5.0)
+    options.setdefault('max_interval', 40.0)
+    return KeepAliveDaemon(client, 'alice', 'secret', **options)
+
+
+def test_interval_relaxes_while_online(capsys):
+    daemon = make_daemon(ScriptedClient([ONLINE] * 5))
+    intervals = []
+    for _ in range(5):
+        assert daemon.check_once()
+        intervals.append(daemon.interval)
+    assert intervals == [10.0, 20.0, 40.0, 40.0, 40.0]
+    # 状态未变化时不重复输出
+    assert capsys.readouterr().out.count('Online') == 1
+
+
+def test_offline_logs_in_and_resets_interval(capsys):
+    client = ScriptedClient([ONLINE, ONLINE, OFFLINE])
+    daemon = make_daemon(client)
+    daemon.check_once()
+    daemon.check_once()
+
+    assert daemon.check_once()
+    assert client.logins == 1
+    assert daemon.interval == 5.0
+    assert 'Login successful' in capsys.readouterr().out
+
+
+def test_unreachable_portal_backs_off_without_login(capsys):
+    client = ScriptedClient([UNREACHABLE] * 4)
+    daemon = make_daemon(client, login_retry_max=20.0)
+    intervals = []
+    for _ in range(4):
+        assert not daemon.check_once()
+        intervals.append(daemon.interval)
+    assert client.logins == 0
+    assert intervals == [5.0, 10.0, 20.0, 20.0]
+
+
+def test_failed_login_backs_off(capsys):
+    client = ScriptedClient([OFFLINE, OFFLINE], login_error=ValueError("bad password"))
+    daemon = make_daemon(client)
+    assert not daemon.check_once()
+    assert not daemon.check_once()
+    assert client.logins == 2
+    assert daemon.interval == 10.0
+    assert 'Login failed' in capsys.readouterr().out
+
+
+def test_run_polls_until_stopped(capsys):
+    client = ScriptedClient([ONLINE] * 3)
+    daemon = make_daemon(client, min_interval=0.01, max_interval=0.01)
+    check_login_status = client.check_login_status
+
+    def check_and_stop():
+        if len(client.statuses) == 1:
+            daemon.stop()
+        return check_login_status()
+
+    client.check_login_status = check_and_stop
+    daemon.run()
+    assert client.statuses == []
+    out = capsys.readouterr().out
+    assert 'daemon started' in out and 'daemon stopped' in out
+
+
+def test_relogs_in_after_drop_against_portal(portal, capsys):
+    daemon = make_daemon(RuijieClient(portal_base=portal.base_url))
+    assert daemon.check_once()
+    assert daemon.check_once()
+    assert daemon.interval == 10.0
+
+    # 门户侧下线（如被管理员踢下线）
+    with portal.state.lock:
+        portal.state.online = None
+    assert daemon.check_once()
+    assert portal.state.online is not None
+    assert portal.state.request_counts['POST /eportal/network/serviceLogin'] == 2
+    assert daemon.interval == 5.0
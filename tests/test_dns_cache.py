@@ -0,0 +1,66 @@
+import socket
+
+import pytest
+
+from ysu_net_login import dns_cache
+from ysu_net_login.dns_cache import DNSCache
+
+
+class Resolver:
+    """替换 getaddrinfo，记录查询次数"""
+
+    def __init__(self, ip='10.0.0.1'):
+        self.ip = ip
+        self.calls = 0
+
+    def __call__(self, host, port, family=0, type=0, *args):
+        self.calls += 1
+        if self.ip is None:
+            raise socket.gaierror(socket.EAI_AGAIN, 'Temporary failure in name resolution')
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (self.ip, port))]
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    resolver = Resolver()
+    monkeypatch.setattr(dns_cache.socket, 'getaddrinfo', resolver)
+    return resolver
+
+
+def addresses(result):
+    infos, source = result
+    return [info[4][0] for info in infos], source
+
+
+def test_pins_skip_dns(resolver):
+    cache = DNSCache(path=False, pins=['Portal.example=10.9.9.9'])
+    assert addresses(cache.resolve('portal.example', 80)) == (['10.9.9.9'], 'pin')
+    assert resolver.calls == 0
+
+
+def test_results_are_cached_across_instances(resolver, tmp_path):
+    path = str(tmp_path / 'dns.json')
+    assert addresses(DNSCache(path).resolve('portal.example', 80)) == (['10.0.0.1'], 'dns')
+    assert addresses(DNSCache(path).resolve('portal.example', 80)) == (['10.0.0.1'], 'cache')
+    assert resolver.calls == 1
+
+
+def test_expired_entry_is_used_when_lookup_fails(resolver, tmp_path):
+    path = str(tmp_path / 'dns.json')
+    DNSCache(path, ttl=-1).resolve('portal.example', 80)
+
+    resolver.ip = None
+    assert addresses(DNSCache(path).resolve('portal.example', 80)) == (['10.0.0.1'], 'stale')
+
+
+def test_lookup_failure_without_cache_raises(resolver):
+    resolver.ip = None
+    with pytest.raises(socket.gaierror):
+        DNSCache(path=False).resolve('portal.example', 80)
+
+
+def test_invalid_pin_raises():
+    with pytest.raises(ValueError):
+        DNSCache(path=False, pins=['portal.example'])
+    with pytest.raises(ValueError):
+        DNSCache(path=False, pins=['portal.example=not-an-ip'])
@@ -0,0 +1,48 @@
+import pytest
+
+from ysu_net_login.config_files import ConfigFileError
+from ysu_net_login.fleet import FleetAccount, load_accounts, run_fleet_login
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'accounts.toml'
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_fleet_login_uses_portal_base(portal):
+    results = run_fleet_login([FleetAccount('alice', 'secret')], portal_base=portal.base_url)
+    assert results[0].success, results[0].error
+    assert portal.state.request_counts['POST /eportal/network/serviceLogin'] == 1
+
+
+def test_load_accounts_file(tmp_path):
+    path = write(tmp_path, 'concurrency = 8\nservice = "unicom"\n'
+                           '[[accounts]]\nusername = 1145141919810\n'
+                           '[[accounts]]\nusername = "bob"\npassword = "pw"\nservice = "mobile"\nname = "lab"\n')
+    accounts, concurrency = load_accounts(path, service_resolver=str.upper)
+    assert concurrency == 8
+    assert [(a.username, a.password, a.service, a.name) for a in accounts] == [
+        ('1145141919810', None, 'UNICOM', '1145141919810'),
+        ('bob', 'pw', 'MOBILE', 'lab'),
+    ]
+
+
+@pytest.mark.parametrize('text, message', [
+    ('concurrency = "8"\n', "'concurrency' must be an integer"),
+    ('concurrency = 0\n', "'concurrency' must be at least 1"),
+    ('[[accounts]]\npassword = "pw"\n', 'account #1 has no username'),
+    ('[[accounts]]\nusername = "a"\nport = 22\n', 'account #1 has unknown keys: port'),
+    ('[[accounts]]\nusername = "a"\npassword = 123\n', "account #1 'password' must be a string"),
+    ('accounts = [', 'Invalid TOML'),
+])
+def test_invalid_accounts_file_is_rejected(tmp_path, text, message):
+    with pytest.raises(ConfigFileError, match=message):
+        load_accounts(write(tmp_path, text))
+
+
+def test_unknown_top_level_key_warns(tmp_path):
+    warnings = []
+    accounts, _ = load_accounts(write(tmp_path, 'timeout = 3\n[[accounts]]\nusername = "a"\n'), warnings=warnings)
+    assert [a.username for a in accounts] == ['a']
+    assert warnings == [f"Ignoring unknown option 'timeout' in {tmp_path / 'accounts.toml'}"]
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+from ysu_net_login.html_extract import find_form_inputs, find_input_value, find_text_by_id
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.ysu_login import YSULogin
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, 'benchmarks', 'fixtures')
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('name, element_id', [
+    ('cas_sso_login.html', 'login-croypto'),
+    ('cas_sso_login.html', 'login-page-flowkey'),
+    ('cas_sso_error.html', 'errorMessage'),
+])
+def test_text_matches_beautifulsoup(name, element_id):
+    html = fixture(name)
+    expected = BeautifulSoup(html, 'html.parser').find(id=element_id).get_text(strip=True)
+    assert find_text_by_id(html, element_id) == expected
+
+
+def test_form_inputs_match_beautifulsoup():
+    html = fixture('authserver_login.html')
+    form = BeautifulSoup(html, 'html.parser').find('form', {'id': 'pwdFromId'})
+    inputs = find_form_inputs(html, 'pwdFromId')
+    fields = ('id', 'name', 'value')
+    assert [[attrs.get(key) for key in fields] for attrs in inputs] == \
+        [[tag.get(key) for key in fields] for tag in form.find_all('input')]
+    assert find_input_value(inputs, element_id='pwdEncryptSalt') == 'rjBFAaHsNHKsPDpw'
+    assert find_input_value(inputs, name='lt', default='') == ''
+    assert find_input_value(inputs, name='missing') is None
+
+
+def test_attribute_quoting_and_entities():
+    html = ("<div><P class=x ID='msg'>用户名 <b>或</b>\n 密码&amp;错误</P>"
+            "<form id=f><input name=a value=1><input name=\"b\" value='&lt;2&gt;' disabled></form></div>")
+    assert find_text_by_id(html, 'msg') == '用户名或密码&错误'
+    assert find_text_by_id(html, 'msg', 'span') is None
+    assert find_form_inputs(html, 'f') == [{'name': 'a', 'value': '1'},
+                                           {'name': 'b', 'value': '<2>', 'disabled': ''}]
+    assert find_form_inputs(html, 'other') is None
+
+
+def test_portal_login_does_not_need_beautifulsoup(portal, monkeypatch):
+    # 导入 bs4 时抛出 ImportError：登录页面只能通过快速路径解析
+    monkeypatch.setitem(sys.modules, 'bs4', None)
+    assert RuijieClient(portal_base=portal.base_url).login('alice', 'secret')
+    assert YSULogin('alice', 'secret', cas_base=portal.base_url).login()
@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+from ysu_net_login import login_flow
+from ysu_net_login.circuit import CircuitOpenError
+from ysu_net_login.retry import RetryConfig, RetryPolicy
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+SERVICE_LOGIN = 'POST /eportal/network/serviceLogin'
+CAS_SSO_SUBMIT = 'POST /cas-sso/login'
+
+
+def make_client(portal, store=None):
+    # 不重试，注入的一次失败即中断登录
+    return RuijieClient(portal_base=portal.base_url, checkpoint_store=store,
+                        retry=RetryConfig(RetryPolicy(max_attempts=1)))
+
+
+def test_interrupted_login_resumes_at_failed_step(portal):
+    portal.state.inject_fault('POST', '/eportal/network/serviceLogin')
+    client = make_client(portal)
+
+    with pytest.raises(requests.RequestException):
+        client.login('alice', 'secret')
+    assert client.login_checkpoint.step == login_flow.SERVICE_LOGIN
+
+    assert client.login('alice', 'secret')
+    assert client.login_checkpoint is None
+    counts = portal.state.request_counts
+    # 续登不重新走CAS认证，只重新提交服务登录
+    assert counts[CAS_SSO_SUBMIT] == 1
+    assert counts[SERVICE_LOGIN] == 2
+
+
+def test_checkpoint_store_resumes_in_new_client(portal, tmp_path):
+    store_path = str(tmp_path / 'checkpoint.json')
+    portal.state.inject_fault('POST', '/eportal/network/serviceSelection')
+
+    with pytest.raises(requests.RequestException):
+        make_client(portal, login_flow.create_checkpoint_store(store_path)).login('alice', 'secret')
+
+    client = make_client(portal, login_flow.create_checkpoint_store(store_path))
+    assert client.login('alice', 'secret')
+    assert portal.state.request_counts[CAS_SSO_SUBMIT] == 1
+    # 登录完成后检查点被清除
+    assert login_flow.create_checkpoint_store(store_path).load() is None
+
+
+def test_checkpoint_for_other_account_is_ignored(portal, tmp_path):
+    store_path = str(tmp_path / 'checkpoint.json')
+    portal.state.inject_fault('POST', '/eportal/network/serviceLogin')
+
+    with pytest.raises(requests.RequestException):
+        make_client(portal, login_flow.create_checkpoint_store(store_path)).login('alice', 'secret')
+
+    client = make_client(portal, login_flow.create_checkpoint_store(store_path))
+    assert client.login('bob', 'secret')
+    assert portal.state.request_counts[CAS_SSO_SUBMIT] == 2
+
+
+@pytest.mark.parametrize('path, step', [('/eportal/network/serviceSelection', login_flow.SERVICE_SELECTION),
+                                        ('/eportal/network/serviceLogin', login_flow.SERVICE_LOGIN)])
+def test_open_circuit_keeps_checkpoint_on_resume(portal, tmp_path, path, step):
+    store_path = str(tmp_path / 'checkpoint.json')
+    portal.state.inject_fault('POST', path)
+    with pytest.raises(requests.RequestException):
+        make_client(portal, login_flow.create_checkpoint_store(store_path)).login('alice', 'secret')
+
+    client = make_client(portal, login_flow.create_checkpoint_store(store_path))
+    breaker = client.circuits.get('127.0.0.1')
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        client.login('alice', 'secret')
+    # 熔断不代表门户会话失效，检查点（包括磁盘上的）保留在失败的步骤
+    assert client.login_checkpoint.step == step
+    assert login_flow.create_checkpoint_store(store_path).load() is not None
+
+    assert make_client(portal, login_flow.create_checkpoint_store(store_path)).login('alice', 'secret')
+    assert portal.state.request_counts[CAS_SSO_SUBMIT] == 1
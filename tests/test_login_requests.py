@@ -0,0 +1,26 @@
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+# 默认登录流程的请求：状态查询、重定向链、CAS-SSO（取页面+提交）、认证成功页、选择服务、登录服务、确认上线
+DEFAULT_LOGIN_REQUESTS = 10
+
+
+def login_requests(portal, **options):
+    client = RuijieClient(portal_base=portal.base_url, **options)
+    try:
+        assert client.login('alice', 'secret')
+    finally:
+        client.client.close()
+    return portal.state.request_counts
+
+
+def test_default_login_does_not_query_workflow_nodes(portal):
+    counts = login_requests(portal)
+    assert sum(counts.values()) == DEFAULT_LOGIN_REQUESTS
+    assert counts['POST /eportal/workFlow/getCurrentNode'] == 0
+
+
+def test_debug_nodes_adds_two_node_queries(portal):
+    counts = login_requests(portal, debug_nodes=True)
+    assert counts['POST /eportal/workFlow/getCurrentNode'] == 2
+    assert sum(counts.values()) == DEFAULT_LOGIN_REQUESTS + 2
@@ -0,0 +1,104 @@
+import multiprocessing
+import sys
+
+import pytest
+
+from ysu_net_login import metrics
+from ysu_net_login.metrics import MetricsStore, create_registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """进程内的指标是全局的，每个测试前后清空"""
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+def test_render_prometheus_text():
+    registry = create_registry()
+    registry.get('ysunetlogin_login_attempts_total').inc(service='校园网')
+    registry.get('ysunetlogin_login_duration_seconds').observe(0.3, result='success')
+    text = registry.render()
+    assert '# TYPE ysunetlogin_login_attempts_total counter' in text
+    assert 'ysunetlogin_login_attempts_total{service="校园网"} 1' in text
+    assert 'ysunetlogin_login_duration_seconds_count{result="success"} 1' in text
+    assert 'ysunetlogin_login_duration_seconds_bucket{result="success",le="+Inf"} 1' in text
+
+
+def test_flush_accumulates_and_drains(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.json'))
+    registry = create_registry()
+    registry.get('ysunetlogin_login_attempts_total').inc(service='校园网')
+    store.flush(registry)
+    assert registry.empty
+    registry.get('ysunetlogin_login_attempts_total').inc(2, service='校园网')
+    total = store.flush(registry)
+    assert total.get('ysunetlogin_login_attempts_total').to_dict() == store.load().get(
+        'ysunetlogin_login_attempts_total').to_dict()
+    assert 'ysunetlogin_login_attempts_total{service="校园网"} 3' in store.load().render()
+
+
+def _flush_many(path, count):
+    for _ in range(count):
+        registry = create_registry()
+        registry.get('ysunetlogin_login_attempts_total').inc(service='校园网')
+        MetricsStore(path).flush(registry)
+
+
+@pytest.mark.skipif(metrics.fcntl is None or sys.platform == 'win32', reason='needs fcntl and fork')
+def test_concurrent_processes_do_not_lose_samples(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_flush_many, args=(path, 20)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    assert 'ysunetlogin_login_attempts_total{service="校园网"} 80' in MetricsStore(path).load().render()
+
+
+def test_cli_login_writes_metrics(portal, monkeypatch, capsys, tmp_path):
+    from ysu_net_login import ruijie_cli
+
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', portal.base_url)
+    monkeypatch.setenv('RUIJIE_AGENT', '0')
+    monkeypatch.setattr(sys, 'argv', ['ysunetlogin', 'login', '-u', '20230001', '-p', 'secret', '-s', 'campus'])
+    assert ruijie_cli.main() == 0
+
+    text = MetricsStore().load().render()
+    assert 'ysunetlogin_login_attempts_total{service="校园网"} 1' in text
+    assert 'ysunetlogin_online 1' in text
+    assert 'ysunetlogin_step_duration_seconds_count{step="service_login"}' in text
+
+
+def test_cli_status_updates_online_gauge(portal, monkeypatch, capsys):
+    from ysu_net_login import ruijie_cli
+    from ysu_net_login.ruijie_client import RuijieClient
+
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', portal.base_url)
+    monkeypatch.setenv('RUIJIE_AGENT', '0')
+    monkeypatch.setattr(sys, 'argv', ['ysunetlogin', 'status'])
+
+    assert RuijieClient(portal_base=portal.base_url).login('alice', 'secret')
+    metrics.REGISTRY.clear()
+    assert ruijie_cli.main() == 0
+    assert 'ysunetlogin_online 1' in MetricsStore().load().render()
+
+    # 在其他地方下线后，下一次 status 更新在线状态
+    with portal.state.lock:
+        portal.state.online = None
+    assert ruijie_cli.main() == 0
+    assert 'ysunetlogin_online 0' in MetricsStore().load().render()
+
+
+def test_cli_batch_status_writes_step_durations(portal, tmp_path, monkeypatch, capsys):
+    from ysu_net_login import ruijie_cli
+
+    hosts = tmp_path / 'hosts.txt'
+    hosts.write_text("lab-101\nlab-102\n", encoding='utf-8')
+    monkeypatch.setenv('RUIJIE_PORTAL_BASE', portal.base_url)
+    monkeypatch.setattr(sys, 'argv', ['ysunetlogin', 'status', '--batch', str(hosts)])
+    assert ruijie_cli.main() == 0
+    assert 'ysunetlogin_step_duration_seconds_count{step="get_online_user_info"} 2' in MetricsStore().load().render()
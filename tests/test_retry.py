@@ -0,0 +1,64 @@
+import pytest
+import requests
+
+from ysu_net_login.retry import RetryConfig, RetryPolicy
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+def fast_client(portal):
+    # 不退避，避免测试等待
+    return RuijieClient(portal_base=portal.base_url,
+                        retry=RetryConfig(RetryPolicy(max_attempts=3, backoff_base=0)))
+
+
+def logged_in_session(client):
+    session_info = client.redirect_to_portal()
+    client.cas_sso_login('alice', 'secret', session_info)
+    return session_info
+
+
+def test_idempotent_step_retries_on_server_error(portal):
+    client = fast_client(portal)
+    session_info = logged_in_session(client)
+    portal.state.inject_fault('POST', '/eportal/network/serviceSelection', count=2)
+
+    assert client.service_selection(session_info)
+    assert portal.state.request_counts['POST /eportal/network/serviceSelection'] == 3
+
+
+def test_service_login_is_not_replayed_after_server_error(portal):
+    client = fast_client(portal)
+    session_info = logged_in_session(client)
+    portal.state.inject_fault('POST', '/eportal/network/serviceLogin')
+
+    with pytest.raises(requests.HTTPError):
+        client.service_login(session_info, '校园网')
+    assert portal.state.request_counts['POST /eportal/network/serviceLogin'] == 1
+
+
+def test_step_overrides_apply_by_prefix():
+    config = RetryConfig()
+    assert not config.for_step('service_login').idempotent
+    assert not config.for_step('cas_sso_login.submit').idempotent
+    assert config.for_step('cas_sso_login.fetch_page').idempotent
+    assert config.for_step('get_online_user_info').read_timeout == 5.0
+
+
+def test_non_idempotent_retries_only_when_not_connected():
+    policy = RetryPolicy(max_attempts=3, backoff_base=0, idempotent=False)
+    attempts = []
+
+    def send(exception):
+        def attempt(timeout):
+            attempts.append(timeout)
+            raise exception
+        return attempt
+
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        policy.run(send(requests.exceptions.ConnectTimeout()), sleep=lambda _: None)
+    assert len(attempts) == 3
+
+    del attempts[:]
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        policy.run(send(requests.exceptions.ReadTimeout()), sleep=lambda _: None)
+    assert len(attempts) == 1
@@ -0,0 +1,68 @@
+import os
+import stat
+
+import requests
+
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.session_cache import SessionCache
+
+
+SESSION_INFO = {'sessionId': 'abc', 'nasIp': '10.0.0.1', 'userIp': '10.11.45.14'}
+REDIRECT = 'GET /eportal/redirect.jsp'
+
+
+def test_round_trip_with_cookies(tmp_path):
+    cache = SessionCache(str(tmp_path / 'session.json'))
+    cookies = requests.cookies.RequestsCookieJar()
+    cookies.set('JSESSIONID', 'xyz', domain='auth1.ysu.edu.cn', path='/eportal')
+    cache.save(SESSION_INFO, cookies)
+
+    data = cache.load()
+    assert data['session_info'] == SESSION_INFO
+    restored = requests.cookies.RequestsCookieJar()
+    SessionCache.restore_cookies(restored, data['cookies'])
+    assert restored.get('JSESSIONID', domain='auth1.ysu.edu.cn', path='/eportal') == 'xyz'
+
+
+def test_file_is_private(tmp_path):
+    cache = SessionCache(str(tmp_path / 'cache' / 'session.json'))
+    cache.save(SESSION_INFO)
+    if os.name == 'posix':
+        assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+
+
+def test_expired_or_corrupt_cache_is_ignored(tmp_path):
+    cache = SessionCache(str(tmp_path / 'session.json'), ttl=-1)
+    cache.save(SESSION_INFO)
+    assert cache.load() is None
+    # 过期的缓存被删除
+    assert not os.path.exists(cache.path)
+
+    with open(cache.path, 'w') as f:
+        f.write('{not json')
+    assert cache.load() is None
+
+
+def test_new_client_reuses_cached_session(portal, tmp_path):
+    path = str(tmp_path / 'session.json')
+    assert RuijieClient(portal_base=portal.base_url, session_cache=SessionCache(path)).login('alice', 'secret')
+    redirects = portal.state.request_counts[REDIRECT]
+
+    client = RuijieClient(portal_base=portal.base_url, session_cache=SessionCache(path))
+    account_info, _ = client.call_with_session(client.get_account_info)
+    assert account_info['name'] == 'alice'
+    assert client.logout()
+    assert portal.state.request_counts[REDIRECT] == redirects
+    assert portal.state.online is None
+
+
+def test_rejected_cached_session_falls_back_to_redirect(portal, tmp_path):
+    path = str(tmp_path / 'session.json')
+    assert RuijieClient(portal_base=portal.base_url).login('alice', 'secret')
+    SessionCache(path).save(dict(SESSION_INFO, sessionId='stale'))
+
+    client = RuijieClient(portal_base=portal.base_url, session_cache=SessionCache(path))
+    account_info, session_info = client.call_with_session(client.get_account_info)
+    assert account_info['name'] == 'alice'
+    assert session_info['sessionId'] != 'stale'
+    assert SessionCache(path).load()['session_info']['sessionId'] == session_info['sessionId']
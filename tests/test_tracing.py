@@ -0,0 +1,58 @@
+import json
+
+from ysu_net_login.ruijie_client import RuijieClient
+from ysu_net_login.tracing import Span, Tracer
+
+
+def traced_login(portal):
+    tracer = Tracer()
+    client = RuijieClient(portal_base=portal.base_url, tracer=tracer)
+    try:
+        assert client.login('alice', 'secret')
+    finally:
+        client.client.close()
+    return tracer
+
+
+def test_every_portal_request_is_recorded(portal):
+    tracer = traced_login(portal)
+    assert len(tracer.spans) == sum(portal.state.request_counts.values())
+    steps = [span.step for span in tracer.spans]
+    assert 'service_login' in steps and 'cas_sso_login.submit' in steps
+    assert all(span.status == 200 or 300 <= span.status < 400 for span in tracer.spans)
+
+
+def test_connection_phases_only_on_new_connections(portal):
+    tracer = traced_login(portal)
+    first, *rest = tracer.spans
+    assert first.timings['connect'] is not None
+    assert first.timings['tls'] is None  # 模拟门户为HTTP
+    # 同一主机的后续请求复用连接
+    assert any(span.timings['connect'] is None for span in rest)
+    for span in tracer.spans:
+        assert span.timings['ttfb'] is not None
+        assert span.total >= span.timings['ttfb']
+
+
+def test_step_totals_follow_request_order(portal):
+    tracer = traced_login(portal)
+    totals = tracer.step_totals()
+    assert sum(entry['requests'] for entry in totals.values()) == len(tracer.spans)
+    assert list(totals)[0] == tracer.spans[0].step
+
+
+def test_export_formats(portal, tmp_path):
+    tracer = traced_login(portal)
+
+    jsonl = tmp_path / 'trace.jsonl'
+    tracer.export(str(jsonl))
+    lines = [json.loads(line) for line in jsonl.read_text(encoding='utf-8').splitlines()]
+    assert [line['step'] for line in lines] == [span.step for span in tracer.spans]
+    assert all(f'{phase}_ms' in lines[0] for phase in Span.PHASES)
+
+    chrome = tmp_path / 'trace.json'
+    tracer.export(str(chrome))
+    events = json.loads(chrome.read_text(encoding='utf-8'))['traceEvents']
+    requests = [event for event in events if event['cat'] == 'http']
+    assert len(requests) == len(tracer.spans)
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
@@ -0,0 +1,74 @@
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+
+from ysu_net_login import transport
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ruijie_client import RuijieClient
+
+
+def addrinfo(port, host='127.0.0.1'):
+    return (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (host, port))
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    yield server
+    server.close()
+
+
+def test_refused_address_fails_over_without_waiting(listener):
+    port = listener.getsockname()[1]
+    started = time.perf_counter()
+    sock, sa = transport._happy_eyeballs_connect(
+        [addrinfo(unused_port()), addrinfo(port)], timeout=5, delay=2)
+    sock.close()
+    assert sa == ('127.0.0.1', port)
+    assert time.perf_counter() - started < 1
+
+
+def test_all_addresses_refused_raises():
+    with pytest.raises(OSError):
+        transport._happy_eyeballs_connect([addrinfo(unused_port())], timeout=5)
+
+
+@pytest.fixture
+def https_portal(tmp_path, monkeypatch):
+    """使用自签名证书的HTTPS模拟门户"""
+    if not shutil.which('openssl'):
+        pytest.skip('openssl command not found')
+    cert, key = str(tmp_path / 'cert.pem'), str(tmp_path / 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+         '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    # requests 通过该环境变量信任自签名证书
+    monkeypatch.setenv('REQUESTS_CA_BUNDLE', cert)
+    with MockPortalServer(certfile=cert, keyfile=key) as server:
+        yield server
+    transport.TLS_SESSIONS.clear()
+
+
+def test_https_login_resumes_tls_sessions(https_portal):
+    # 覆盖 pyproject.toml 支持的最低版本 urllib3 1.26 与 2.x 的连接参数差异
+    transport.TLS_SESSIONS.clear()
+    assert RuijieClient(portal_base=https_portal.base_url).login('alice', 'secret')
+
+    client = RuijieClient(portal_base=https_portal.base_url)
+    assert client.check_login_status()[0] is True
+    assert transport.TLS_SESSIONS.full >= 1
+    assert transport.TLS_SESSIONS.resumed >= 1
@@ -0,0 +1,74 @@
+import json
+import os
+import stat
+
+import pytest
+
+from ysu_net_login.vault import CredentialVault, VaultError
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    return str(tmp_path / 'credentials.vault')
+
+
+def saved_vault(path, accounts, passphrase='correct horse'):
+    vault = CredentialVault(path)
+    vault.create(passphrase)
+    for username, password in accounts.items():
+        vault.set(username, password)
+    vault.save()
+    return vault
+
+
+def test_round_trip(vault_path):
+    saved_vault(vault_path, {'alice': 'secret', 'bob': '密码'})
+
+    vault = CredentialVault(vault_path)
+    # 列出账户不需要解锁
+    assert vault.usernames() == ['alice', 'bob']
+    vault.unlock('correct horse')
+    assert vault.get('alice') == 'secret'
+    assert vault.get('bob') == '密码'
+    assert vault.get('carol') is None
+
+
+def test_file_is_private_and_encrypted(vault_path):
+    saved_vault(vault_path, {'alice': 'secret'})
+    with open(vault_path, encoding='utf-8') as f:
+        assert 'secret' not in f.read()
+    if os.name == 'posix':
+        assert stat.S_IMODE(os.stat(vault_path).st_mode) == 0o600
+
+
+def test_wrong_passphrase_raises(vault_path):
+    saved_vault(vault_path, {'alice': 'secret'})
+    vault = CredentialVault(vault_path)
+    with pytest.raises(VaultError, match='Wrong vault passphrase'):
+        vault.unlock('wrong')
+    with pytest.raises(VaultError, match='locked'):
+        vault.get('alice')
+
+
+def test_swapped_entries_are_rejected(vault_path):
+    saved_vault(vault_path, {'alice': 'secret', 'bob': 'other'})
+    with open(vault_path, encoding='utf-8') as f:
+        data = json.load(f)
+    accounts = data['accounts']
+    accounts['alice'], accounts['bob'] = accounts['bob'], accounts['alice']
+    with open(vault_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    with pytest.raises(VaultError):
+        CredentialVault(vault_path).unlock('correct horse')
+
+
+def test_remove_and_missing_vault(vault_path):
+    with pytest.raises(VaultError, match='No credential vault'):
+        CredentialVault(vault_path).unlock('correct horse')
+
+    vault = saved_vault(vault_path, {'alice': 'secret', 'bob': 'other'})
+    assert vault.remove('alice')
+    assert not vault.remove('alice')
+    vault.save()
+    assert CredentialVault(vault_path).usernames() == ['bob']
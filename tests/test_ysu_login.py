@@ -0,0 +1,99 @@
+import os
+import stat
+
+import pytest
+
+from ysu_net_login.captcha import CaptchaSolver
+from ysu_net_login.mock_portal import MockPortalServer
+from ysu_net_login.ysu_login import YSULogin, _cleanup_spill_files, remove_captcha_file, spill_captcha
+
+
+@pytest.fixture
+def captcha_portal():
+    with MockPortalServer(need_captcha=True) as server:
+        yield server
+
+
+def current_captcha(server):
+    with server.state.lock:
+        return next(iter(server.state.cas_forms.values()))['captcha']
+
+
+class BrokenSolver(CaptchaSolver):
+    def solve(self, image_data):
+        raise RuntimeError("model not loaded")
+
+
+def test_solver_error_falls_back_to_manual_input(captcha_portal, monkeypatch):
+    monkeypatch.setattr('builtins.input', lambda prompt='': current_captcha(captcha_portal))
+    with YSULogin('alice', 'secret', cas_base=captcha_portal.base_url, display_mode='ascii',
+                  captcha_solver=BrokenSolver()) as client:
+        assert client.login()
+
+
+def test_solver_error_without_manual_input_fails_cleanly(captcha_portal):
+    with YSULogin('alice', 'secret', cas_base=captcha_portal.base_url, display_mode='ascii',
+                  captcha_solver=BrokenSolver(), manual_captcha=False) as client:
+        assert client.login() is False
+
+
+def test_spilled_captcha_is_private_and_removed():
+    path = spill_captcha(b'captcha')
+    try:
+        assert os.path.dirname(path) == os.environ['XDG_RUNTIME_DIR']
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        with open(path, 'rb') as f:
+            assert f.read() == b'captcha'
+    finally:
+        remove_captcha_file(path)
+    assert not os.path.exists(path)
+    # 重复删除不报错
+    remove_captcha_file(path)
+
+
+def test_exit_cleanup_removes_leftover_spill_files():
+    paths = [spill_captcha(b'a'), spill_captcha(b'b')]
+    _cleanup_spill_files()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_file_display_mode_removes_captcha_after_login(captcha_portal, monkeypatch):
+    seen = []
+
+    def answer(prompt=''):
+        seen.extend(os.listdir(os.environ['XDG_RUNTIME_DIR']))
+        return current_captcha(captcha_portal)
+
+    monkeypatch.setattr('builtins.input', answer)
+    assert YSULogin('alice', 'secret', cas_base=captcha_portal.base_url, display_mode='file').login()
+    assert any(name.startswith('captcha_') for name in seen)
+    assert not os.listdir(os.environ['XDG_RUNTIME_DIR'])
+
+
+def test_same_client_logs_in_twice(portal):
+    with YSULogin('alice', 'secret', cas_base=portal.base_url) as client:
+        assert client.login()
+        first_execution = client.execution
+        assert client.login()
+        assert client.execution != first_execution
+    assert portal.state.request_counts['POST /authserver/login'] == 2
+
+
+def test_reset_clears_form_state(portal):
+    with YSULogin('alice', 'secret', cas_base=portal.base_url) as client:
+        assert client.login()
+        client.session.cookies.set('CASTGC', 'TGT-1')
+        client.reset(clear_cookies=True)
+        assert client.execution is None and client.salt is None and client.captcha is None
+        assert not client.session.cookies
+
+
+def test_cancelled_manual_input_removes_captcha_file(captcha_portal, monkeypatch):
+    def cancel(prompt=''):
+        raise EOFError
+
+    monkeypatch.setattr('builtins.input', cancel)
+    with YSULogin('alice', 'secret', cas_base=captcha_portal.base_url, display_mode='file') as client:
+        with pytest.raises(KeyboardInterrupt):
+            client.login()
+    assert not os.listdir(os.environ['XDG_RUNTIME_DIR'])